@@ -1,26 +1,32 @@
 import os
+import subprocess
 import sys
 import chess
 import chess.engine
 import logging
 
-# Thiết lập logging để debug
-logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
+# Logger riêng của module; cấu hình logging do chương trình chính đảm nhận
+logger = logging.getLogger(__name__)
+
+def engine_path(exe_relative_path="bluefish\\engine.exe"):
+    """Đường dẫn đầy đủ tới file engine, tính từ thư mục chứa engine.py; báo lỗi nếu không có file."""
+    # Lấy thư mục chứa file engine.py
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    # Hỗ trợ PyInstaller
+    if getattr(sys, 'frozen', False):
+        current_dir = sys._MEIPASS
+    # Tạo đường dẫn đầy đủ đến engine.exe
+    exe_path = os.path.join(current_dir, exe_relative_path)
+
+    # Kiểm tra xem file engine.exe có tồn tại không
+    if not os.path.isfile(exe_path):
+        logger.error(f"Không tìm thấy {exe_path}")
+        raise FileNotFoundError(f"Engine file not found: {exe_path}")
+    return exe_path
 
 class Engine:
     def __init__(self, exe_relative_path="bluefish\\engine.exe"):
-        # Lấy thư mục chứa file engine.py
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        # Hỗ trợ PyInstaller
-        if getattr(sys, 'frozen', False):
-            current_dir = sys._MEIPASS
-        # Tạo đường dẫn đầy đủ đến engine.exe
-        self.exe_path = os.path.join(current_dir, exe_relative_path)
-
-        # Kiểm tra xem file engine.exe có tồn tại không
-        if not os.path.isfile(self.exe_path):
-            logging.error(f"Không tìm thấy {self.exe_path}")
-            raise FileNotFoundError(f"Engine file not found: {self.exe_path}")
+        self.exe_path = engine_path(exe_relative_path)
 
         try:
             # Khởi tạo UCI engine
@@ -29,12 +35,17 @@ class Engine:
             self.engine.configure({"Hash": 128})
             # Lưu trạng thái bàn cờ
             self.board = chess.Board()
-            logging.info("engine khởi tạo thành công")
+            logger.info("engine khởi tạo thành công")
         except chess.engine.EngineError as e:
-            logging.error(f"Lỗi khi khởi tạo engine: {e}")
+            logger.error(f"Lỗi khi khởi tạo engine: {e}")
+            # Engine đã chạy nhưng cấu hình lỗi: tắt tiến trình, nếu không chương trình bị treo khi thoát
+            if getattr(self, "engine", None) is not None:
+                self.close()
             raise
         except Exception as e:
-            logging.error(f"Lỗi không xác định khi khởi tạo engine: {e}")
+            logger.error(f"Lỗi không xác định khi khởi tạo engine: {e}")
+            if getattr(self, "engine", None) is not None:
+                self.close()
             raise
 
     def set_position(self, fen):
@@ -42,38 +53,38 @@ class Engine:
         try:
             # Cập nhật board với FEN
             self.board = chess.Board(fen)
-            logging.debug(f"Thiết lập FEN: {fen}")
+            logger.debug(f"Thiết lập FEN: {fen}")
             # Thiết lập vị trí cho engine
             self.engine.position(self.board)
-            logging.info("Vị trí bàn cờ được gửi tới engine")
+            logger.info("Vị trí bàn cờ được gửi tới engine")
         except ValueError as e:
-            logging.error(f"Lỗi khi thiết lập FEN: {e}")
+            logger.error(f"Lỗi khi thiết lập FEN: {e}")
         except chess.engine.EngineError as e:
-            logging.error(f"Lỗi khi gửi vị trí tới engine: {e}")
+            logger.error(f"Lỗi khi gửi vị trí tới engine: {e}")
         except Exception as e:
-            logging.error(f"Lỗi không xác định khi thiết lập vị trí: {e}")
+            logger.error(f"Lỗi không xác định khi thiết lập vị trí: {e}")
 
     def get_best_move(self):
         """Lấy nước đi tốt nhất từ engine ở định dạng UCI với độ sâu 10."""
         try:
             # Thiết lập giới hạn độ sâu 10
             limit = chess.engine.Limit(depth=10)
-            logging.debug(f"Tìm nước đi với độ sâu 10, FEN: {self.board.fen()}")
+            logger.debug(f"Tìm nước đi với độ sâu 10, FEN: {self.board.fen()}")
             # Tìm nước đi tốt nhất
             result = self.engine.play(self.board, limit)
             move = result.move
             if move is None:
-                logging.warning("engine không trả về nước đi hợp lệ")
+                logger.warning("engine không trả về nước đi hợp lệ")
                 return None
             # Cập nhật board với nước đi
             self.board.push(move)
-            logging.info(f"Nước đi từ Engine: {move.uci()}")
+            logger.info(f"Nước đi từ Engine: {move.uci()}")
             return move.uci()  # Trả về nước đi ở định dạng UCI (e.g., 'e2e4')
         except chess.engine.EngineError as e:
-            logging.error(f"Lỗi khi lấy nước đi từ engine: {e}")
+            logger.error(f"Lỗi khi lấy nước đi từ engine: {e}")
             return None
         except Exception as e:
-            logging.error(f"Lỗi không xác định khi lấy nước đi: {e}")
+            logger.error(f"Lỗi không xác định khi lấy nước đi: {e}")
             return None
 
     def get_best_move_with_stats(self):
@@ -81,12 +92,12 @@ class Engine:
         try:
             # Thiết lập giới hạn độ sâu 8
             limit = chess.engine.Limit(depth=8)
-            logging.debug(f"Tìm nước đi với độ sâu 8, FEN: {self.board.fen()}")
+            logger.debug(f"Tìm nước đi với độ sâu 8, FEN: {self.board.fen()}")
             # Tìm nước đi tốt nhất với thông tin bổ sung
             result = self.engine.play(self.board, limit, info=chess.engine.Info.ALL)
             move = result.move
             if move is None:
-                logging.warning("engine không trả về nước đi hợp lệ")
+                logger.warning("engine không trả về nước đi hợp lệ")
                 return {"move": None}
 
             # Lấy thông tin thống kê từ engine (nếu có)
@@ -108,23 +119,147 @@ class Engine:
                 "nodes": info.get("nodes", 390061),
                 "cutoffs": info.get("cutoffs", 2523),  # Không phải tất cả engine đều cung cấp "cutoffs"
                 "evals": info.get("pv", 35828),  # pv có thể được dùng để đếm số lần đánh giá
+                "pov_score": info.get("score"),  # PovScore gốc để lưu lịch sử đánh giá, None nếu engine không gửi
             }
 
             # Cập nhật board với nước đi
             self.board.push(move)
-            logging.info(f"Nước đi từ Engine: {move.uci()} với thống kê: {stats}")
+            logger.info(f"Nước đi từ Engine: {move.uci()} với thống kê: {stats}")
             return stats
         except chess.engine.EngineError as e:
-            logging.error(f"Lỗi khi lấy nước đi từ engine: {e}")
+            logger.error(f"Lỗi khi lấy nước đi từ engine: {e}")
             return {"move": None}
         except Exception as e:
-            logging.error(f"Lỗi không xác định khi lấy nước đi: {e}")
+            logger.error(f"Lỗi không xác định khi lấy nước đi: {e}")
             return {"move": None}
 
+    def analyse(self, board, depth=10, nodes=None):
+        """Phân tích một thế cờ mà không đi nước và không đổi self.board.
+
+        Trả về điểm (theo bên đang đi), độ sâu, số node và PV, hoặc None nếu lỗi.
+        """
+        try:
+            limit = chess.engine.Limit(depth=depth, nodes=nodes)
+            logger.debug(f"Phân tích với độ sâu {depth}, FEN: {board.fen()}")
+            info = self.engine.analyse(board, limit)
+            score = info.get("score")
+            return {
+                "score": score.relative if score is not None else None,
+                "depth": info.get("depth", depth),
+                "nodes": info.get("nodes"),
+                "pv": info.get("pv", []),
+            }
+        except chess.engine.EngineError as e:
+            logger.error(f"Lỗi khi phân tích thế cờ: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Lỗi không xác định khi phân tích: {e}")
+            return None
+
+    def analyse_multipv(self, board, depth=10, count=2):
+        """Phân tích ``count`` biến tốt nhất bằng MultiPV.
+
+        Trả về danh sách kết quả như analyse(), tốt nhất trước; None nếu engine
+        không có tùy chọn MultiPV hoặc bị lỗi.
+        """
+        if "MultiPV" not in self.engine.options:
+            return None
+        try:
+            limit = chess.engine.Limit(depth=depth)
+            logger.debug(f"Phân tích MultiPV {count} với độ sâu {depth}, FEN: {board.fen()}")
+            infos = self.engine.analyse(board, limit, multipv=count)
+            return [{
+                "score": info["score"].relative,
+                "depth": info.get("depth", depth),
+                "nodes": info.get("nodes"),
+                "pv": info.get("pv", []),
+            } for info in infos if "score" in info]
+        except chess.engine.EngineError as e:
+            logger.error(f"Lỗi khi phân tích MultiPV: {e}")
+            return None
+
+    def analysis(self, board, depth=None):
+        """Bắt đầu phân tích thế cờ ở luồng nền của python-chess.
+
+        Trả về AnalysisResult: duyệt để nhận từng dòng info, gọi stop() để dừng sớm.
+        """
+        limit = chess.engine.Limit(depth=depth) if depth else None
+        logger.debug(f"Bắt đầu phân tích (độ sâu {depth}), FEN: {board.fen()}")
+        return self.engine.analysis(board, limit)
+
+    def close(self):
+        """Đóng tiến trình engine ngay; gọi nhiều lần cũng không sao."""
+        engine = getattr(self, "engine", None)
+        if engine is None:
+            logger.warning("Không thể đóng engine, có thể đã đóng trước đó")
+            return
+        self.engine = None
+        try:
+            engine.quit()
+            logger.info("engine đã đóng")
+        except chess.engine.EngineError as e:
+            logger.error(f"Lỗi khi đóng engine: {e}")
+
     def __del__(self):
         """Đóng engine khi đối tượng bị hủy."""
-        try:
-            self.engine.quit()
-            logging.info("engine đã đóng")
-        except AttributeError:
-            logging.warning("Không thể đóng engine, có thể đã đóng trước đó")
\ No newline at end of file
+        if getattr(self, "engine", None) is not None:
+            self.close()
+
+class UciPipe:
+    """Client UCI tối giản qua pipe, không qua luồng nền của python-chess.
+
+    Mỗi lần chỉ một lượt tìm; trả về điểm và nước đi tốt nhất đọc từ output
+    của engine. Dùng cho các công cụ chạy hàng nghìn lượt tìm nhỏ (selfplay,
+    bench_engine), nơi chi phí chuyển luồng của SimpleEngine là đáng kể.
+    """
+
+    def __init__(self, path, hash_mb=16):
+        self.process = subprocess.Popen([path], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL, text=True, bufsize=1)
+        self._send("uci")
+        self._wait("uciok")
+        self._send(f"setoption name Hash value {hash_mb}")
+        self.new_game()
+
+    def _send(self, command):
+        self.process.stdin.write(command + "\n")
+
+    def _wait(self, token):
+        for line in self.process.stdout:
+            if line.startswith(token):
+                return line
+        raise EOFError("engine exited")
+
+    def new_game(self):
+        self._send("ucinewgame")
+        self._send("isready")
+        self._wait("readyok")
+
+    def search(self, board, nodes=None, depth=None):
+        """(điểm theo bên đi, nước tốt nhất) của ``board``, hoặc None nếu engine không trả lời được."""
+        moves = " ".join(move.uci() for move in board.move_stack)
+        root = board.root()
+        position = "startpos" if root.fen() == chess.STARTING_FEN else f"fen {root.fen()}"
+        go = "go" + (f" nodes {nodes}" if nodes else "") + (f" depth {depth}" if depth else "")
+        self._send(f"position {position} moves {moves}\n{go}" if moves else f"position {position}\n{go}")
+        score = None
+        for line in self.process.stdout:
+            if line.startswith("bestmove"):
+                parts = line.split()
+                if score is None or len(parts) < 2 or parts[1] == "(none)":
+                    return None
+                return score, chess.Move.from_uci(parts[1])
+            if line.startswith("info") and " score " in line and "bound" not in line:
+                tokens = line.split()
+                kind, value = tokens[tokens.index("score") + 1:tokens.index("score") + 3]
+                score = chess.engine.Cp(int(value)) if kind == "cp" else chess.engine.Mate(int(value))
+        return None
+
+    def close(self):
+        if self.process.poll() is None:
+            try:
+                self._send("quit")
+                self.process.stdin.close()
+                self.process.wait(timeout=2)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.kill()
@@ -0,0 +1,241 @@
+import logging
+import threading
+import time
+from collections import deque
+
+import chess
+import chess.engine
+
+from eval_timeline import winning_chances
+
+MAX_DEPTH = 18
+PUBLISH_INTERVAL = 0.1  # Seconds between snapshots the UI gets to see
+PV_MOVES = 6
+BACKGROUND_DEPTH = 8  # Shallow on purpose: background positions only feed the eval graph
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisSnapshot:
+    """What the engine currently thinks of one position (immutable once published)."""
+
+    def __init__(self, key, score, depth, pv, pv_san, final):
+        self.key = key
+        self.score = score  # chess.engine.PovScore
+        self.depth = depth
+        self.pv = pv
+        self.pv_san = pv_san
+        self.final = final  # True once the search reached the service's max depth
+        self.white_chances = winning_chances(score.white())
+
+    def score_text(self):
+        score = self.score.white()
+        if score.is_mate():
+            return f"#{score.mate()}"
+        return f"{score.score() / 100:+.2f}"
+
+
+class AnalysisService:
+    """Keeps one engine analysing whatever position is on the board.
+
+    ``update`` is called by the UI every frame and only compares keys; when
+    the position changed it bumps a generation counter and stops the running
+    search from the UI thread, so the engine drops a stale position at once
+    (engines that ignore ``stop`` finish the current depth first). The worker
+    thread deepens one depth at a time, and publishes a snapshot at most every
+    ``publish_interval`` seconds plus one per finished depth; ``snapshot``
+    is a plain attribute read and never blocks.
+
+    Positions passed to ``queue_background`` are searched to
+    ``background_depth`` only while the engine would otherwise sit idle: the
+    current position is done and the service is not paused. A new position
+    interrupts them and they are retried afterwards.
+    """
+
+    def __init__(self, engine_factory, max_depth=MAX_DEPTH, publish_interval=PUBLISH_INTERVAL,
+                 background_depth=BACKGROUND_DEPTH):
+        self.engine_factory = engine_factory
+        self.max_depth = max_depth
+        self.publish_interval = publish_interval
+        self.background_depth = background_depth
+        self.snapshot = None
+        self._background = deque()  # (tag, board) waiting for an idle engine
+        self._background_results = deque()  # (tag, PovScore, depth)
+        self._background_busy = False
+        self._key = None
+        self._board = None
+        self._generation = 0
+        self._search = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def update(self, board, key=None):
+        """Analyse ``board`` from now on; cheap when the position did not change.
+
+        ``key`` identifies the position (e.g. ChessGame.outcome_tracker.key);
+        without one the FEN is used, which costs more per frame.
+        """
+        if key is None:
+            key = board.fen()
+        if key != self._key:
+            self._restart(key, board.copy(stack=False))
+
+    def pause(self):
+        """Stop searching until the next update, e.g. while the opponent is to move."""
+        if self._key is not None:
+            self._restart(None, None)
+
+    def _restart(self, key, board):
+        with self._condition:
+            self._key = key
+            self._board = board
+            self._generation += 1
+            self.snapshot = None
+            if self._search is not None:
+                self._search.stop()
+            self._condition.notify()
+
+    def current(self):
+        """The snapshot for the position last passed to update, or None."""
+        snapshot = self.snapshot
+        return snapshot if snapshot is not None and snapshot.key == self._key else None
+
+    def best_move(self):
+        """First move of the current best line, or None while nothing is known yet."""
+        snapshot = self.current()
+        return snapshot.pv[0] if snapshot is not None else None
+
+    def queue_background(self, tag, board):
+        """Evaluate ``board`` when the engine is idle; the result comes back with ``tag``."""
+        with self._condition:
+            self._background.append((tag, board))
+            self._condition.notify()
+
+    def background_idle(self):
+        """True when no background position is queued or being searched."""
+        with self._condition:
+            return not self._background and not self._background_busy
+
+    def queue_depth(self):
+        """Background positions queued or being searched."""
+        with self._condition:
+            return len(self._background) + self._background_busy
+
+    def background_results(self):
+        """Drain finished background searches as (tag, PovScore, depth)."""
+        results = []
+        while self._background_results:
+            results.append(self._background_results.popleft())
+        return results
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            if self._search is not None:
+                self._search.stop()
+            self._condition.notify()
+
+    def _stale(self, generation):
+        return self._closed or generation != self._generation
+
+    def _run(self):
+        try:
+            engine = self.engine_factory()
+        except Exception as e:
+            logger.error(f"Analysis engine unavailable: {e}")
+            return
+        try:
+            self._serve(engine)
+        except (chess.engine.EngineError, OSError) as e:
+            # OSError: the engine's pipe broke (BrokenPipeError) without python-chess noticing first
+            logger.error(f"Analysis stopped: {e}")
+        finally:
+            # Quit explicitly: finished searches leave reference cycles (future -> traceback ->
+            # frames) that would keep the Engine, and its process, alive until the next gc pass
+            engine.close()
+
+    def _serve(self, engine):
+        searched = 0
+        while True:
+            task = None
+            with self._condition:
+                while not self._closed and self._generation == searched and not self._idle_task_ready():
+                    self._condition.wait()
+                if self._closed:
+                    return
+                board = self._board
+                key = self._key
+                if self._generation == searched:
+                    task = self._background.popleft()
+                    self._background_busy = True
+                generation = searched = self._generation
+            try:
+                if task is not None:
+                    self._search_background(engine, task, generation)
+                elif board is not None and not board.is_game_over():
+                    self._deepen(engine, board, key, generation)
+            finally:
+                with self._condition:
+                    self._background_busy = False
+
+    def _idle_task_ready(self):
+        # Paused (no position) means the opponent's engine is thinking: leave the CPU to it
+        return bool(self._background) and self._key is not None
+
+    def _search_background(self, engine, task, generation):
+        tag, board = task
+        latest = None
+        with self._condition:
+            if self._stale(generation):
+                self._background.appendleft(task)
+                return
+            self._search = search = engine.analysis(board, self.background_depth)
+        with search:
+            for info in search:
+                if self._stale(generation):
+                    break
+                if "score" in info:
+                    latest = info
+        with self._condition:
+            self._search = None
+            if self._stale(generation):
+                self._background.appendleft(task)  # Interrupted: try again when idle
+                return
+        if latest is not None:
+            self._background_results.append((tag, latest["score"], latest.get("depth", 0)))
+
+    def _deepen(self, engine, board, key, generation):
+        last_publish = 0.0
+        for depth in range(1, self.max_depth + 1):
+            latest = None
+            with self._condition:
+                if self._stale(generation):
+                    return
+                self._search = search = engine.analysis(board, depth)
+            with search:
+                for info in search:
+                    if self._stale(generation):
+                        break
+                    if "score" not in info or not info.get("pv"):
+                        continue
+                    latest = info
+                    now = time.perf_counter()
+                    if now - last_publish >= self.publish_interval:
+                        last_publish = now
+                        self._publish(key, board, latest, False, generation)
+            with self._condition:
+                self._search = None
+            if self._stale(generation):
+                return
+            if latest is not None:
+                self._publish(key, board, latest, depth == self.max_depth, generation)
+
+    def _publish(self, key, board, info, final, generation):
+        pv = info["pv"][:PV_MOVES]
+        pv_san = board.variation_san(pv)
+        snapshot = AnalysisSnapshot(key, info["score"], info.get("depth", 0), pv, pv_san, final)
+        with self._condition:
+            if not self._stale(generation):
+                self.snapshot = snapshot
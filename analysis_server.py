@@ -0,0 +1,529 @@
+"""Local analysis service over HTTP and WebSocket.
+
+    python analysis_server.py --port 8765 --engines 4
+
+    GET /analyse?fen=<FEN>&depth=12      -> score, pv, bestmove, depth, nodes
+    GET /bestmove?fen=<FEN>&nodes=50000  -> bestmove and score only
+    GET /stats                           -> pool, queue and cache counters
+    WebSocket /ws: send {"fen": ..., "depth": ...}, receive one {"type": "info"}
+    per finished depth and a final {"type": "result"}
+
+Everything runs on one asyncio loop, with the engines driven through
+python-chess's asyncio API, and the server only listens on 127.0.0.1.
+Requests for the same position and limit are coalesced: while one search
+runs, later requests wait for it (and WebSocket clients join its stream)
+instead of queueing another. Finished results go to an LRU cache, which
+also answers requests for a shallower depth. At most ``max_pending``
+searches may wait for a free engine; beyond that HTTP gets 503 with
+Retry-After and WebSocket an error message, so latency stays bounded
+instead of the queue growing without limit. Scores are relative to the
+side to move.
+"""
+import argparse
+import asyncio
+import base64
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import struct
+import sys
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlsplit
+
+import chess
+import chess.engine
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from Engine.engine import engine_path
+
+HOST = "127.0.0.1"
+PORT = 8765
+DEFAULT_DEPTH = 10
+MAX_DEPTH = 20
+MAX_NODES = 10_000_000
+CACHE_ENTRIES = 10000
+MAX_PENDING = 256
+RESTART_ATTEMPTS = 3
+RESTART_DELAY = 0.5  # Seconds before the first retry, doubled for each further one
+CLOSE_TIMEOUT = 2
+LISTENER_BACKLOG = 64  # Infos buffered per WebSocket client before old ones are dropped
+MAX_REQUEST_BYTES = 16384
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+logger = logging.getLogger(__name__)
+
+
+class Busy(Exception):
+    """Too many searches are already waiting for an engine."""
+
+
+class Unavailable(Exception):
+    """Every engine has died and none could be restarted."""
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _score_json(score):
+    if score.is_mate():
+        return {"mate": score.mate()}
+    return {"cp": score.score()}
+
+
+def _info_json(info):
+    return {
+        "depth": info.get("depth"),
+        "score": _score_json(info["score"].relative),
+        "nodes": info.get("nodes"),
+        "pv": [move.uci() for move in info.get("pv", [])],
+    }
+
+
+def parse_request(params):
+    """(board, limit kind, limit value) from query or message parameters."""
+    fen = params.get("fen")
+    try:
+        board = chess.Board(fen) if fen else chess.Board()
+    except ValueError as e:
+        raise BadRequest(f"bad fen: {e}")
+    if not board.is_valid():
+        raise BadRequest("illegal position")
+    try:
+        if params.get("nodes") is not None:
+            return board, "nodes", max(1, min(int(params["nodes"]), MAX_NODES))
+        return board, "depth", max(1, min(int(params.get("depth") or DEFAULT_DEPTH), MAX_DEPTH))
+    except (TypeError, ValueError):
+        raise BadRequest("depth and nodes must be integers")
+
+
+def _game_over_json(board):
+    # Nothing to search: engines answer a finished position with no score or no move
+    return {"fen": board.fen(), "bestmove": None, "result": board.result()}
+
+
+class EnginePool:
+    """A fixed set of UCI engine processes handed out first come, first served.
+
+    A crashed engine is closed and replaced, retrying with backoff. If the
+    replacement cannot be started the pool runs degraded with one engine
+    fewer; once none are left, ``acquire`` raises Unavailable instead of
+    waiting for an engine that will never come back.
+    """
+
+    def __init__(self, path, size, hash_mb=64):
+        self.path = path
+        self.size = size
+        self.hash_mb = hash_mb
+        self._idle = asyncio.Queue()
+        self._engines = []
+        self._restarting = 0
+
+    async def start(self):
+        for _ in range(self.size):
+            await self._idle.put(await self._spawn())
+
+    async def _spawn(self):
+        _, engine = await chess.engine.popen_uci(self.path)
+        try:
+            if "Hash" in engine.options:
+                await engine.configure({"Hash": self.hash_mb})
+        except BaseException:
+            await self._close_engine(engine)
+            raise
+        self._engines.append(engine)
+        return engine
+
+    async def _respawn(self):
+        delay = RESTART_DELAY
+        for attempt in range(1, RESTART_ATTEMPTS + 1):
+            try:
+                return await self._spawn()
+            except (OSError, chess.engine.EngineError) as e:
+                logger.error(f"Could not restart engine (attempt {attempt}/{RESTART_ATTEMPTS}): {e}")
+            if attempt < RESTART_ATTEMPTS:
+                await asyncio.sleep(delay)
+                delay *= 2
+        return None
+
+    async def _close_engine(self, engine):
+        if not engine.returncode.done():
+            try:
+                await asyncio.wait_for(engine.quit(), CLOSE_TIMEOUT)
+            except (asyncio.TimeoutError, chess.engine.EngineError):
+                pass
+        if engine.transport is not None:
+            engine.transport.close()  # Kills the process if quit did not end it
+
+    @property
+    def available(self):
+        # An engine being restarted still counts: requests wait for it
+        return bool(self._engines) or self._restarting > 0
+
+    async def acquire(self):
+        if not self.available:
+            raise Unavailable()
+        engine = await self._idle.get()
+        if engine is None:
+            # The last engine died while we waited: pass the wake-up on to the next waiter
+            self._idle.put_nowait(None)
+            raise Unavailable()
+        return engine
+
+    async def release(self, engine, broken=False):
+        if broken:
+            # Replace a crashed engine so the pool keeps its size
+            self._engines.remove(engine)
+            self._restarting += 1
+            try:
+                await self._close_engine(engine)
+                engine = await self._respawn()
+            finally:
+                self._restarting -= 1
+            if engine is None:
+                logger.error(f"Running degraded with {len(self._engines)} of {self.size} engines")
+                if not self.available:
+                    self._idle.put_nowait(None)
+                return
+        await self._idle.put(engine)
+
+    @property
+    def idle(self):
+        return self._idle.qsize() if self._engines else 0
+
+    async def close(self):
+        for engine in self._engines:
+            await self._close_engine(engine)
+
+
+class Search:
+    """One running search, shared by every request for the same position and limit."""
+
+    def __init__(self, key, board, limit):
+        self.key = key
+        self.board = board
+        self.limit = limit
+        self.result = asyncio.get_running_loop().create_future()
+        self.listeners = set()  # asyncio.Queues of WebSocket clients following the search
+        self.infos = []  # One per finished depth, replayed to clients that join late
+
+    def publish(self, message):
+        for queue in self.listeners:
+            if queue.full():
+                queue.get_nowait()  # Slow client: drop its oldest update, never block the search
+            queue.put_nowait(message)
+
+
+class AnalysisServer:
+    def __init__(self, pool, cache_entries=CACHE_ENTRIES, max_pending=MAX_PENDING):
+        self.pool = pool
+        self.cache_entries = cache_entries
+        self.max_pending = max_pending
+        self.cache = OrderedDict()  # (epd, limit kind) -> (limit value, result)
+        self.running = {}  # (epd, limit kind, limit value) -> Search
+        self.pending = 0
+        self.stats = {"requests": 0, "cache_hits": 0, "coalesced": 0, "searches": 0, "rejected": 0}
+
+    def cached(self, board, kind, value):
+        entry = self.cache.get((board.epd(), kind))
+        if entry is not None and entry[0] >= value:
+            self.cache.move_to_end((board.epd(), kind))
+            return entry[1]
+        return None
+
+    def submit(self, board, kind, value):
+        """A finished result dict, or the Search that will produce it."""
+        self.stats["requests"] += 1
+        result = self.cached(board, kind, value)
+        if result is not None:
+            self.stats["cache_hits"] += 1
+            return result
+        key = (board.epd(), kind, value)
+        search = self.running.get(key)
+        if search is not None:
+            self.stats["coalesced"] += 1
+            return search
+        if not self.pool.available:
+            self.stats["rejected"] += 1
+            raise Unavailable()
+        if self.pending >= self.max_pending:
+            self.stats["rejected"] += 1
+            raise Busy()
+        limit = chess.engine.Limit(**{kind: value})
+        search = Search(key, board.copy(stack=False), limit)
+        self.running[key] = search
+        self.pending += 1
+        asyncio.get_running_loop().create_task(self._run(search))
+        return search
+
+    async def _run(self, search):
+        try:
+            engine = await self.pool.acquire()
+        except Unavailable as e:
+            del self.running[search.key]
+            search.publish(None)
+            search.result.set_exception(e)
+            return
+        finally:
+            self.pending -= 1
+        broken = False
+        start = time.perf_counter()
+        latest = None
+        try:
+            with await engine.analysis(search.board, search.limit) as analysis:
+                async for info in analysis:
+                    if "score" not in info or not info.get("pv"):
+                        continue
+                    latest = info
+                    if "depth" in info and (not search.infos or search.infos[-1]["depth"] != info["depth"]):
+                        message = dict(_info_json(info), type="info")
+                        search.infos.append(message)
+                        search.publish(message)
+            self.stats["searches"] += 1
+            if latest is None:
+                raise chess.engine.EngineError("engine sent no score")
+            result = dict(_info_json(latest), fen=search.board.fen(), bestmove=latest["pv"][0].uci(),
+                          time=round(time.perf_counter() - start, 4))
+            self._store(search, result)
+            search.result.set_result(result)
+        except (chess.engine.EngineError, OSError) as e:
+            broken = isinstance(e, chess.engine.EngineTerminatedError)
+            logger.error(f"Search failed: {e}")
+            search.result.set_exception(e)
+        finally:
+            del self.running[search.key]
+            search.publish(None)  # End of stream
+            await self.pool.release(engine, broken)
+
+    def _store(self, search, result):
+        epd, kind, value = search.key
+        entry = self.cache.get((epd, kind))
+        if entry is None or entry[0] <= value:
+            self.cache[(epd, kind)] = (value, result)
+        self.cache.move_to_end((epd, kind))
+        if len(self.cache) > self.cache_entries:
+            self.cache.popitem(last=False)
+
+    async def analyse(self, board, kind, value):
+        found = self.submit(board, kind, value)
+        if isinstance(found, dict):
+            return dict(found, cached=True)
+        # shield: a client hanging up must not cancel a search others are waiting for
+        return dict(await asyncio.shield(found.result), cached=False)
+
+    def snapshot(self):
+        return dict(self.stats, engines=self.pool.size, idle_engines=self.pool.idle,
+                    running=len(self.running), pending=self.pending, cache_entries=len(self.cache))
+
+    # --- HTTP ---
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "bad request line"}, keep_alive=False)
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                url = urlsplit(target)
+                if url.path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                    await self._websocket(reader, writer, headers)
+                    return
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                status, body, extra = await self._route(method, url)
+                await self._respond(writer, status, body, keep_alive, extra)
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+
+    async def _route(self, method, url):
+        if method != "GET":
+            return 405, {"error": "only GET is supported"}, {}
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        if url.path == "/stats":
+            return 200, self.snapshot(), {}
+        if url.path not in ("/analyse", "/bestmove"):
+            return 404, {"error": "not found"}, {}
+        try:
+            board, kind, value = parse_request(params)
+            if board.is_game_over():
+                return 200, _game_over_json(board), {}
+            result = await self.analyse(board, kind, value)
+        except BadRequest as e:
+            return 400, {"error": str(e)}, {}
+        except Busy:
+            return 503, {"error": "busy, retry later"}, {"Retry-After": "1"}
+        except Unavailable:
+            return 503, {"error": "no engine available"}, {}
+        except (chess.engine.EngineError, OSError) as e:
+            return 500, {"error": f"engine failed: {e}"}, {}
+        if url.path == "/bestmove":
+            result = {key: result[key] for key in ("fen", "bestmove", "score", "depth", "cached")}
+        return 200, result, {}
+
+    async def _respond(self, writer, status, body, keep_alive, extra=None):
+        payload = json.dumps(body).encode()
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                  500: "Internal Server Error", 503: "Service Unavailable"}[status]
+        head = [f"HTTP/1.1 {status} {reason}", "Content-Type: application/json",
+                f"Content-Length: {len(payload)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        head += [f"{name}: {value}" for name, value in (extra or {}).items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + payload)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    # --- WebSocket (RFC 6455, text frames only) ---
+
+    async def _websocket(self, reader, writer, headers):
+        key = headers.get("sec-websocket-key", "")
+        accept = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+        queue = None
+        forwarder = None
+        try:
+            while True:
+                message = await _read_frame(reader, writer)
+                if message is None:
+                    return
+                # A new request replaces the one the client was following
+                if forwarder is not None:
+                    forwarder.cancel()
+                    await asyncio.gather(forwarder, return_exceptions=True)
+                try:
+                    board, kind, value = parse_request(json.loads(message))
+                    if board.is_game_over():
+                        await _send_frame(writer, dict(_game_over_json(board), type="result"))
+                        continue
+                    found = self.submit(board, kind, value)
+                except (BadRequest, ValueError) as e:
+                    await _send_frame(writer, {"type": "error", "error": str(e)})
+                    continue
+                except Busy:
+                    await _send_frame(writer, {"type": "error", "error": "busy, retry later"})
+                    continue
+                except Unavailable:
+                    await _send_frame(writer, {"type": "error", "error": "no engine available"})
+                    continue
+                queue = asyncio.Queue(LISTENER_BACKLOG)
+                forwarder = asyncio.get_running_loop().create_task(self._forward(found, queue, writer))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            return
+        finally:
+            if forwarder is not None:
+                forwarder.cancel()
+                with contextlib.suppress(asyncio.CancelledError, ConnectionError):
+                    await forwarder
+
+    async def _forward(self, found, queue, writer):
+        if isinstance(found, dict):
+            await _send_frame(writer, dict(found, type="result", cached=True))
+            return
+        found.listeners.add(queue)
+        try:
+            for message in found.infos[-LISTENER_BACKLOG:]:
+                await _send_frame(writer, message)
+            while (message := await queue.get()) is not None:
+                await _send_frame(writer, message)
+            try:
+                result = await found.result
+                await _send_frame(writer, dict(result, type="result", cached=False))
+            except (chess.engine.EngineError, OSError) as e:
+                await _send_frame(writer, {"type": "error", "error": f"engine failed: {e}"})
+            except Unavailable:
+                await _send_frame(writer, {"type": "error", "error": "no engine available"})
+        finally:
+            found.listeners.discard(queue)
+
+
+async def _read_frame(reader, writer):
+    """Next text message from the client, answering pings; None once the client closes."""
+    while True:
+        head = await reader.readexactly(2)
+        opcode = head[0] & 0x0F
+        length = head[1] & 0x7F
+        if length == 126:
+            length = struct.unpack(">H", await reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack(">Q", await reader.readexactly(8))[0]
+        if length > MAX_REQUEST_BYTES:
+            return None
+        mask = await reader.readexactly(4) if head[1] & 0x80 else bytes(4)
+        data = bytearray(await reader.readexactly(length))
+        for i in range(length):
+            data[i] ^= mask[i & 3]
+        if opcode == 0x8:
+            writer.write(b"\x88\x00")
+            return None
+        if opcode == 0x9:
+            writer.write(bytes([0x8A, len(data)]) + data)
+        elif opcode == 0x1:
+            return data.decode("utf-8", errors="replace")
+
+
+async def _send_frame(writer, message):
+    payload = json.dumps(message).encode()
+    if len(payload) < 126:
+        head = bytes([0x81, len(payload)])
+    elif len(payload) < 1 << 16:
+        head = bytes([0x81, 126]) + struct.pack(">H", len(payload))
+    else:
+        head = bytes([0x81, 127]) + struct.pack(">Q", len(payload))
+    writer.write(head + payload)
+    await writer.drain()
+
+
+async def serve(port=PORT, engines=2, engine_args=(), hash_mb=64, cache_entries=CACHE_ENTRIES,
+                max_pending=MAX_PENDING, ready=None):
+    pool = EnginePool(engine_path(*engine_args), engines, hash_mb)
+    await pool.start()
+    server = AnalysisServer(pool, cache_entries, max_pending)
+    listener = await asyncio.start_server(server.handle_connection, HOST, port,
+                                          limit=MAX_REQUEST_BYTES, backlog=1024)
+    logger.info(f"Listening on http://{HOST}:{port} with {engines} engines")
+    if ready is not None:
+        ready.set_result(listener.sockets[0].getsockname()[1])
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local engine analysis service (HTTP/WebSocket)")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--engines", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="engine processes (default: half the CPUs)")
+    parser.add_argument("--hash", type=int, default=64, help="hash table MB per engine")
+    parser.add_argument("--cache", type=int, default=CACHE_ENTRIES, help="results kept in the LRU cache")
+    parser.add_argument("--max-pending", type=int, default=MAX_PENDING,
+                        help="searches allowed to wait for an engine before requests get 503")
+    parser.add_argument("--engine", default=None, help="UCI engine executable (default: the bundled engine)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    engine_args = (args.engine,) if args.engine else ()
+    try:
+        asyncio.run(serve(args.port, args.engines, engine_args, args.hash, args.cache, args.max_pending))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import time
+
+import chess
+import pygame
+
+from board_renderer import board_layer
+
+ANIMATION_DURATION = 0.15  # Seconds for one move
+ANIMATION_STEP = 1 / 120  # Fixed simulation timestep
+MAX_STEPS_PER_FRAME = 4  # A late frame jumps ahead instead of replaying every missed step
+
+
+class MoveAnimator:
+    """Slides the last moved piece across a BoardRenderer's cached board.
+
+    The renderer surface already shows the position after the move; while an
+    animation runs, ``draw`` covers the destination square with its previous
+    contents and blits the moving sprite on top, so a frame costs a few
+    square-sized blits. Progress advances on a fixed timestep from the wall
+    clock: the game loop never waits for an animation, and a slow frame just
+    skips ahead.
+    """
+
+    def __init__(self, renderer, duration=ANIMATION_DURATION, step=ANIMATION_STEP):
+        self.renderer = renderer
+        self.duration = duration
+        self.step = step
+        self._plies = None
+        self._move = None
+        self._previous_rects = []
+
+    @property
+    def active(self):
+        return self._move is not None
+
+    def cancel(self):
+        """Stop at once; the next draw restores the squares the sprite covered."""
+        self._move = None
+
+    def sync(self, board, flipped=False):
+        """Start an animation when exactly one move was pushed since the last call."""
+        plies = len(board.move_stack)
+        if self._plies is not None and plies == self._plies + 1 and self.duration > 0:
+            self._start(board, board.peek(), flipped)
+        elif plies != self._plies:
+            self.cancel()
+        self._plies = plies
+
+    def _start(self, board, move, flipped):
+        renderer = self.renderer
+        piece = board.piece_at(move.to_square)
+        if piece is None:
+            return
+        self._move = move
+        self._flipped = flipped
+        self._image = renderer.images[('w' if piece.color == chess.WHITE else 'b') + piece.symbol().upper()]
+        self._from = pygame.Vector2(renderer.square_rect(move.from_square, flipped).topleft)
+        self._to_rect = renderer.square_rect(move.to_square, flipped)
+        # Whatever stood on the target square stays visible until the piece lands
+        self._captured = None
+        previous = board.copy(stack=1)
+        previous.pop()
+        captured = previous.piece_at(move.to_square)
+        if captured is not None:
+            self._captured = renderer.images[('w' if captured.color == chess.WHITE else 'b') + captured.symbol().upper()]
+        self._elapsed = 0.0
+        self._accumulator = 0.0
+        self._last_time = time.perf_counter()
+
+    def _advance(self, now):
+        frame_time = min(now - self._last_time, MAX_STEPS_PER_FRAME * self.step)
+        self._last_time = now
+        self._accumulator += frame_time
+        while self._accumulator >= self.step:
+            self._elapsed += self.step
+            self._accumulator -= self.step
+        return min(1.0, self._elapsed / self.duration)
+
+    def draw(self, target, offset=(0, 0), now=None):
+        """Draw this frame of the animation onto ``target``; returns the dirty rects in target coordinates.
+
+        Must be called after the renderer's own dirty squares were blitted.
+        """
+        rects = []
+        ox, oy = offset
+        # Put back what the sprite and the covered target square hid last frame
+        for rect in self._previous_rects:
+            target.blit(self.renderer.surface, rect.move(ox, oy), rect)
+            rects.append(rect.move(ox, oy))
+        self._previous_rects = []
+        if self._move is None:
+            return rects
+
+        t = self._advance(time.perf_counter() if now is None else now)
+        if t >= 1.0:
+            self._move = None
+            return rects
+
+        t = 1 - (1 - t) * (1 - t)  # Ease out
+        position = self._from.lerp(self._to_rect.topleft, t)
+        sprite_rect = pygame.Rect(round(position.x), round(position.y), self.renderer.square_size, self.renderer.square_size)
+
+        # The piece has not arrived yet: show the target square as it was before the move
+        layer = board_layer(self.renderer.square_size, self.renderer.colors, self.renderer.label_font,
+                            self.renderer.label_color, self._flipped, self.renderer.file_label_inset)
+        target_rect = self._to_rect.move(ox, oy)
+        target.blit(layer, target_rect, self._to_rect)
+        if self._captured is not None:
+            target.blit(self._captured, target_rect)
+        target.blit(self._image, sprite_rect.move(ox, oy))
+
+        self._previous_rects = [self._to_rect, sprite_rect]
+        rects.append(target_rect)
+        rects.append(sprite_rect.move(ox, oy))
+        return rects
@@ -0,0 +1,223 @@
+"""Batch game annotator.
+
+    python annotate.py game_records.pgn --out annotated.pgn --depth 12 --workers 8
+
+Every position of every game is analysed once at a fixed depth, spread over
+``workers`` engine processes (one Engine per thread; the threads only wait
+on the engines' pipes). Each move gets an ``[%eval]`` comment; inaccuracies,
+mistakes and blunders get ?!, ? and ?? plus the engine's line as a
+variation. Positions are keyed by EPD, so transpositions and repeated
+positions are analysed once, and every result is appended to a cache file
+as it arrives: rerunning an interrupted job only analyses what is missing.
+Games are written in input order as soon as all their positions are done.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from queue import Queue
+
+import chess
+import chess.engine
+import chess.pgn
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from Engine.engine import Engine
+from eval_timeline import BLUNDER, INACCURACY, MISTAKE, terminal_score, winning_chances
+
+VARIATION_PLIES = 6
+
+
+class AnalysisCache:
+    """EPD -> (depth, relative score, pv), backed by an append-only JSON lines file."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.entries = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Torn last line of an interrupted run
+                    self._load(entry)
+        self._file = open(path, "a", encoding="utf-8") if path else None
+
+    def _load(self, entry):
+        if "mate" in entry:
+            score = chess.engine.Mate(entry["mate"])
+        else:
+            score = chess.engine.Cp(entry["cp"])
+        pv = [chess.Move.from_uci(uci) for uci in entry["pv"].split()]
+        self.entries[entry["epd"]] = (entry["depth"], score, pv)
+
+    def get(self, epd, depth=0):
+        """(depth, score, pv) if ``epd`` was analysed at least ``depth`` deep, else None."""
+        entry = self.entries.get(epd)
+        if entry is not None and entry[0] >= depth:
+            return entry
+        return None
+
+    def put(self, epd, depth, score, pv):
+        self.entries[epd] = (depth, score, pv)
+        if self._file:
+            entry = {"epd": epd, "depth": depth, "pv": " ".join(move.uci() for move in pv)}
+            if score.is_mate():
+                entry["mate"] = score.mate()
+            else:
+                entry["cp"] = score.score()
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+
+
+class Annotator:
+    def __init__(self, engines, depth, cache):
+        self.engines = Queue()
+        for engine in engines:
+            self.engines.put(engine)
+        self.workers = len(engines)
+        self.depth = depth
+        self.cache = cache
+        self.analysed = 0  # Positions the engines were asked about in this run
+        self._in_flight = set()
+
+    def _analyse(self, board):
+        engine = self.engines.get()
+        try:
+            return engine.analyse(board, depth=self.depth)
+        finally:
+            self.engines.put(engine)
+
+    def annotate(self, games, out, progress=None):
+        """Annotate chess.pgn.Games from an iterable and print them to ``out`` in input order."""
+        waiting = deque()  # (game, EPDs of its positions)
+        running = {}  # future -> EPD
+        with ThreadPoolExecutor(self.workers) as pool:
+            for game in games:
+                epds = []
+                board = game.board()
+                for node in [game] + list(game.mainline()):
+                    if node is not game:
+                        board.push(node.move)
+                    epd = board.epd()
+                    epds.append(epd)
+                    if epd in self._in_flight or self.cache.get(epd, self.depth):
+                        continue
+                    score = terminal_score(board)
+                    if score is not None:
+                        self.cache.put(epd, self.depth, score, [])
+                        continue
+                    self._in_flight.add(epd)
+                    running[pool.submit(self._analyse, board.copy(stack=False))] = epd
+                waiting.append((game, epds))
+                # Bounded look-ahead: a few queued positions per engine, however many games are left
+                while len(running) > 4 * self.workers:
+                    self._collect(running)
+                    self._flush(waiting, out, progress)
+            while running:
+                self._collect(running)
+                self._flush(waiting, out, progress)
+        self._flush(waiting, out, progress)
+
+    def _collect(self, running):
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            epd = running.pop(future)
+            self._in_flight.discard(epd)
+            result = future.result()
+            self.analysed += 1
+            if result is None or result["score"] is None:
+                continue  # Engine failure; the moves around this position get no eval
+            self.cache.put(epd, result["depth"] or self.depth, result["score"], result["pv"])
+
+    def _flush(self, waiting, out, progress):
+        while waiting and not any(epd in self._in_flight for epd in waiting[0][1]):
+            game, epds = waiting.popleft()
+            self.annotate_game(game, epds)
+            print(game, file=out, end="\n\n")
+            out.flush()
+            if progress:
+                progress(game)
+
+    def annotate_game(self, game, epds):
+        """Add evals, NAGs and best-line variations to the mainline of ``game``."""
+        nodes = list(game.mainline())
+        for ply, node in enumerate(nodes):
+            before = self.cache.get(epds[ply])
+            after = self.cache.get(epds[ply + 1])
+            if after is not None:
+                # ``after`` is relative to the opponent; set_eval wants a PovScore
+                node.set_eval(chess.engine.PovScore(after[1], not node.parent.turn()), after[0])
+            if before is None or after is None or not before[2]:
+                continue
+            best = before[2][0]
+            if best == node.move:
+                continue
+            loss = winning_chances(before[1]) - winning_chances(-after[1])
+            if loss >= BLUNDER:
+                nag, label = chess.pgn.NAG_BLUNDER, "Blunder"
+            elif loss >= MISTAKE:
+                nag, label = chess.pgn.NAG_MISTAKE, "Mistake"
+            elif loss >= INACCURACY:
+                nag, label = chess.pgn.NAG_DUBIOUS_MOVE, "Inaccuracy"
+            else:
+                continue
+            node.nags.add(nag)
+            board = node.parent.board()
+            node.comment = f"{label}. {board.san(best)} was best. {node.comment}".strip()
+            variation = node.parent.add_variation(best)
+            variation.add_line(before[2][1:VARIATION_PLIES])
+            variation.set_eval(chess.engine.PovScore(before[1], board.turn), before[0])
+
+
+def read_games(paths):
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            while (game := chess.pgn.read_game(f)) is not None:
+                yield game
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Annotate PGN games with engine evaluations")
+    parser.add_argument("pgn", nargs="+")
+    parser.add_argument("--out", default="annotated.pgn")
+    parser.add_argument("--depth", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="engine processes")
+    parser.add_argument("--cache", default="annotate_cache.jsonl",
+                        help="analysis cache, reused to resume interrupted runs ('' to disable)")
+    parser.add_argument("--engine", default=None, help="UCI engine executable (default: the bundled engine)")
+    args = parser.parse_args()
+
+    engine_args = (args.engine,) if args.engine else ()
+    engines = [Engine(*engine_args) for _ in range(args.workers)]
+    cache = AnalysisCache(args.cache or None)
+    annotator = Annotator(engines, args.depth, cache)
+    start = time.perf_counter()
+    games = 0
+
+    def progress(game):
+        nonlocal games
+        games += 1
+        print(f"\r{games} games, {annotator.analysed} positions analysed "
+              f"({time.perf_counter() - start:.0f} s)", end="", file=sys.stderr, flush=True)
+
+    try:
+        with open(args.out, "w", encoding="utf-8") as out:
+            annotator.annotate(read_games(args.pgn), out, progress)
+    finally:
+        print(file=sys.stderr)
+        cache.close()
+        engines.clear()  # Engine.__del__ quits each process
+    print(f"{games} games -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+import io
+import os
+import struct
+import sys
+
+import pygame
+
+# Handle resource paths for bundled executable
+if getattr(sys, 'frozen', False):
+    bundle_dir = sys._MEIPASS
+    # The bundle is unpacked to a temporary directory that is deleted on exit
+    data_dir = os.path.join(os.path.expanduser("~"), ".chess_group7")
+else:
+    bundle_dir = os.path.dirname(os.path.abspath(__file__))
+    data_dir = bundle_dir
+
+music_path = os.path.join(bundle_dir, "Music")
+image_path = os.path.join(bundle_dir, "Image")
+font_path = os.path.join(bundle_dir, "Font")
+
+
+def data_path(name):
+    """Where to keep ``name`` (game records, database, caches, profiles) so it outlives the process."""
+    os.makedirs(data_dir, exist_ok=True)
+    return os.path.join(data_dir, name)
+
+
+# Pre-scaled sprite atlases and decoded sound banks, shared by every front-end
+cache_dir = os.environ.get("CHESS_ASSET_CACHE") or os.path.join(data_dir, ".asset_cache")
+
+PIECE_NAMES = [color + p for color in ["w", "b"] for p in ["P", "N", "B", "R", "Q", "K"]]
+SOUND_NAMES = ["Move", "Capture", "Check", "Checkmate"]
+# Square sizes used by game.py, bot_vs_bot.py and bot_vs_stockfish.py
+DEFAULT_SQUARE_SIZES = [80, 50, 37]
+
+ATLAS_MAGIC = b"CGA1"
+ATLAS_HEADER = struct.Struct("<4sHH")  # magic, square size, sprite count
+BANK_MAGIC = b"CGS1"
+BANK_HEADER = struct.Struct("<4siiiH")  # magic, frequency, format, channels, sound count
+BANK_ENTRY = struct.Struct("<16sQQ")  # name, offset, length
+
+_images = {}
+_fonts = {}
+_piece_images = {}
+
+
+def load_image(filename, size=None):
+    """Load (and optionally scale) an image from Image/, once per size."""
+    key = (filename, size)
+    image = _images.get(key)
+    if image is None:
+        image = pygame.image.load(os.path.join(image_path, filename))
+        if size is not None:
+            image = pygame.transform.scale(image, size)
+        _images[key] = image
+    return image
+
+
+def load_font(name, size):
+    """Return a font from Font/, or a system font when ``name`` has no extension."""
+    key = (name, size)
+    font = _fonts.get(key)
+    if font is None:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        if os.path.splitext(name)[1]:
+            font = pygame.font.Font(os.path.join(font_path, name), size)
+        else:
+            font = pygame.font.SysFont(name, size)
+        _fonts[key] = font
+    return font
+
+
+def _atlas_path(square_size):
+    return os.path.join(cache_dir, f"pieces_{square_size}.atlas")
+
+
+def rasterize_piece(name, square_size):
+    """Render one piece from its SVG source at the exact square size (PNG fallback)."""
+    svg_file = os.path.join(image_path, f"{name}.svg")
+    if os.path.isfile(svg_file):
+        with open(svg_file, "rb") as f:
+            data = f.read()
+        data = data.replace(b"<svg ", f'<svg width="{square_size}" height="{square_size}" '.encode(), 1)
+        try:
+            return pygame.image.load(io.BytesIO(data), f"{name}.svg")
+        except pygame.error:
+            pass  # SDL_image built without SVG support
+    return pygame.transform.scale(
+        pygame.image.load(os.path.join(image_path, f"{name}.png")), (square_size, square_size)
+    )
+
+
+def build_atlas(square_size):
+    """Rasterise all 12 pieces into one strip and write it to the cache directory."""
+    strip = pygame.Surface((square_size * len(PIECE_NAMES), square_size), pygame.SRCALPHA)
+    for i, name in enumerate(PIECE_NAMES):
+        strip.blit(rasterize_piece(name, square_size), (i * square_size, 0))
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = _atlas_path(square_size) + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(ATLAS_HEADER.pack(ATLAS_MAGIC, square_size, len(PIECE_NAMES)))
+        f.write(pygame.image.tobytes(strip, "RGBA"))
+    os.replace(tmp_path, _atlas_path(square_size))
+    return strip
+
+
+def load_atlas(square_size):
+    """Return the sprite strip for ``square_size``: one file read, built on first use."""
+    try:
+        with open(_atlas_path(square_size), "rb") as f:
+            data = f.read()
+        magic, size, count = ATLAS_HEADER.unpack_from(data)
+        if magic == ATLAS_MAGIC and size == square_size and count == len(PIECE_NAMES):
+            strip = pygame.image.frombytes(data[ATLAS_HEADER.size:], (square_size * count, square_size), "RGBA")
+            return strip.convert_alpha() if pygame.display.get_surface() else strip
+    except (OSError, struct.error, ValueError):
+        pass
+    try:
+        return build_atlas(square_size)
+    except OSError:
+        # Read-only install: rasterise in memory without caching
+        strip = pygame.Surface((square_size * len(PIECE_NAMES), square_size), pygame.SRCALPHA)
+        for i, name in enumerate(PIECE_NAMES):
+            strip.blit(rasterize_piece(name, square_size), (i * square_size, 0))
+        return strip
+
+
+class PieceImages(dict):
+    """Piece sprites for one square size, cut from the cached atlas on first draw."""
+
+    def __init__(self, square_size):
+        super().__init__()
+        self.square_size = square_size
+
+    def __missing__(self, name):
+        strip = load_atlas(self.square_size)
+        for i, piece_name in enumerate(PIECE_NAMES):
+            self[piece_name] = strip.subsurface((i * self.square_size, 0, self.square_size, self.square_size))
+        return self[name]
+
+
+def piece_images(square_size):
+    images = _piece_images.get(square_size)
+    if images is None:
+        images = _piece_images[square_size] = PieceImages(square_size)
+    return images
+
+
+def init_mixer():
+    if not pygame.mixer.get_init():
+        pygame.mixer.init()
+
+
+def play_music(filename="chessmusic.mp3", volume=None):
+    init_mixer()
+    pygame.mixer.music.load(os.path.join(music_path, filename))
+    if volume is not None:
+        pygame.mixer.music.set_volume(volume)
+    pygame.mixer.music.play(-1)
+
+
+def _bank_path(mixer_format):
+    frequency, sample_format, channels = mixer_format
+    return os.path.join(cache_dir, f"sounds_{frequency}_{sample_format}_{channels}.bank")
+
+
+def build_sound_bank():
+    """Decode the sound effects once into raw PCM for the current mixer format."""
+    init_mixer()
+    mixer_format = pygame.mixer.get_init()
+    buffers = [(name, pygame.mixer.Sound(os.path.join(music_path, f"{name}.mp3")).get_raw())
+               for name in SOUND_NAMES]
+    os.makedirs(cache_dir, exist_ok=True)
+    offset = BANK_HEADER.size + BANK_ENTRY.size * len(buffers)
+    tmp_path = _bank_path(mixer_format) + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(BANK_HEADER.pack(BANK_MAGIC, *mixer_format, len(buffers)))
+        for name, raw in buffers:
+            f.write(BANK_ENTRY.pack(name.encode(), offset, len(raw)))
+            offset += len(raw)
+        for _, raw in buffers:
+            f.write(raw)
+    os.replace(tmp_path, _bank_path(mixer_format))
+    return {name: pygame.mixer.Sound(buffer=raw) for name, raw in buffers}
+
+
+def load_sound_bank():
+    """Return {name: Sound} from the cached PCM bank, decoding the MP3s only if it is missing."""
+    init_mixer()
+    mixer_format = pygame.mixer.get_init()
+    try:
+        with open(_bank_path(mixer_format), "rb") as f:
+            data = f.read()
+        magic, frequency, sample_format, channels, count = BANK_HEADER.unpack_from(data)
+        if magic == BANK_MAGIC and (frequency, sample_format, channels) == mixer_format:
+            sounds = {}
+            for i in range(count):
+                name, offset, length = BANK_ENTRY.unpack_from(data, BANK_HEADER.size + i * BANK_ENTRY.size)
+                sounds[name.rstrip(b"\0").decode()] = pygame.mixer.Sound(buffer=data[offset:offset + length])
+            return sounds
+    except (OSError, struct.error, ValueError):
+        pass
+    try:
+        return build_sound_bank()
+    except OSError:
+        return {name: pygame.mixer.Sound(os.path.join(music_path, f"{name}.mp3")) for name in SOUND_NAMES}
+
+
+class SoundBank:
+    """Sound effects, loaded from the decoded PCM bank on first play.
+
+    A muted bank never touches the mixer, so scripts that run silent pay
+    nothing for audio.
+    """
+
+    def __init__(self, muted=False):
+        self.muted = muted
+        self._sounds = None
+
+    def play(self, name):
+        if self.muted:
+            return
+        if self._sounds is None:
+            self._sounds = load_sound_bank()
+        self._sounds[name].play()
+
+
+def build(square_sizes=DEFAULT_SQUARE_SIZES, sounds=True):
+    """Asset build step: pre-render every atlas and the sound bank into ``cache_dir``."""
+    for square_size in square_sizes:
+        build_atlas(square_size)
+        print(f"atlas {square_size}px -> {_atlas_path(square_size)}")
+    if sounds:
+        build_sound_bank()
+        print(f"sounds -> {_bank_path(pygame.mixer.get_init())}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the sprite atlas and sound cache")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SQUARE_SIZES)
+    parser.add_argument("--no-sounds", action="store_true", help="skip decoding the sound effects")
+    args = parser.parse_args()
+    build(args.sizes, sounds=not args.no_sounds)
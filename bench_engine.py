@@ -0,0 +1,264 @@
+"""Engine benchmark: nps and time-to-depth over a fixed position suite.
+
+    python bench_engine.py --depth 8 --output bench.json
+    python bench_engine.py --depth 8 --baseline bench_baseline.json --threshold 0.05
+    python bench_engine.py --nodes 200000 --engine path/to/other/engine
+
+Every position in SUITE is searched ``--warmup`` times untimed and then
+``--repeat`` times timed, each search after ``ucinewgame`` so repetitions
+see an empty hash. The hash is also resized before every search: that
+clears it even in engines whose ucinewgame does nothing, like the bundled
+one. Two paths are timed:
+
+- raw: a bare UCI pipe, timed from ``ucinewgame`` to ``bestmove``. The time
+  each ``info depth N`` line arrives gives time-to-depth; the last info line
+  gives nodes, and nodes per raw second gives nps.
+- wrapper: the same search through Engine and python-chess's ``play``,
+  timed on the Python side.
+
+Search times vary by a few percent between runs, more than the wrapper
+adds, so the wrapper overhead per search is measured on its own. Both
+paths run OVERHEAD_REPEAT depth-1 searches per position, where engine
+time is next to nothing, and the overhead is the difference of the
+medians.
+
+Results are written as JSON. With ``--baseline`` the run is compared to a
+stored result: the exit status is 1 when total nps, total search time or
+wrapper overhead is worse than the baseline by more than ``--threshold``,
+and 2 when the two runs are not comparable.
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import chess
+import chess.engine
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from Engine.engine import Engine, UciPipe, engine_path
+
+DEPTH = 8
+WARMUP = 1
+REPEAT = 5
+THRESHOLD = 0.05
+OVERHEAD_REPEAT = 30
+OVERHEAD_FLOOR_MS = 0.1  # Overhead changes smaller than this are noise, whatever the ratio
+HASH_MB = 128  # Engine's size; searches alternate between HASH_MB - 1 and HASH_MB - 2 to clear it
+
+# Fixed suite: opening, middlegames with tactics, endgames and a mate
+SUITE = [
+    ("startpos", chess.STARTING_FEN),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"),
+    ("italian", "r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/2PP1N2/PP3PPP/RNBQK2R b KQkq - 0 5"),
+    ("sicilian", "r1bqkb1r/pp2pppp/2np1n2/8/3NP3/2N5/PPP2PPP/R1BQKB1R w KQkq - 2 6"),
+    ("queens_gambit", "rnbqkb1r/ppp2ppp/4pn2/3p2B1/2PP4/2N5/PP2PPPP/R2QKBNR b KQkq - 3 4"),
+    ("middlegame", "r2q1rk1/pb1nbppp/1p2pn2/2pp4/2PP4/1PN1PN2/PB2BPPP/R2Q1RK1 w - - 0 10"),
+    ("tactics", "r1b1k2r/ppppnppp/2n2q2/2b5/3NP3/2P1B3/PP3PPP/RN1QKB1R w KQkq - 1 7"),
+    ("rook_endgame", "8/8/5k2/3p4/3K4/8/4R3/6r1 w - - 0 50"),
+    ("pawn_endgame", "8/5k2/3p4/1p1Pp2p/pP2Pp1P/P4P1K/8/8 b - - 0 50"),
+    ("mate_in_3", "r1b1kb1r/pppp1ppp/5q2/4n3/3KP3/2N3PN/PPP4P/R1BQ1B1R b kq - 0 1"),
+]
+
+
+def hash_size(i):
+    # python-chess skips setting an option to its current value, so alternate between two sizes
+    return HASH_MB - 1 - i % 2
+
+
+class TimedPipe(UciPipe):
+    def clear_hash(self, i):
+        self._send(f"setoption name Hash value {hash_size(i)}")
+
+    def timed_search(self, board, limit):
+        """Raw search timings: wall seconds, nodes, engine-reported ms and seconds to reach each depth."""
+        position = "startpos" if board.fen() == chess.STARTING_FEN else f"fen {board.fen()}"
+        go = "go" + (f" depth {limit.depth}" if limit.depth else "") + (f" nodes {limit.nodes}" if limit.nodes else "")
+        start = time.perf_counter()
+        self.new_game()
+        self._send(f"position {position}\n{go}")
+        depth_times = {}
+        nodes = engine_ms = None
+        for line in self.process.stdout:
+            if line.startswith("bestmove"):
+                return {"wall": time.perf_counter() - start, "nodes": nodes, "engine_ms": engine_ms,
+                        "depths": depth_times, "bestmove": line.split()[1]}
+            if line.startswith("info"):
+                tokens = line.split()
+                for name in ("depth", "nodes", "time"):
+                    if name not in tokens:
+                        continue
+                    value = int(tokens[tokens.index(name) + 1])
+                    if name == "depth":
+                        depth_times.setdefault(value, time.perf_counter() - start)
+                    elif name == "nodes":
+                        nodes = value
+                    else:
+                        engine_ms = value
+        raise EOFError("engine exited")
+
+
+def summarize(seconds):
+    """Median, mean, standard deviation and minimum of ``seconds``, in milliseconds."""
+    ms = [s * 1000 for s in seconds]
+    return {"median": round(statistics.median(ms), 3), "mean": round(statistics.fmean(ms), 3),
+            "stdev": round(statistics.stdev(ms), 3) if len(ms) > 1 else 0.0, "min": round(min(ms), 3)}
+
+
+def file_digest(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def wrapper_overhead(pipe, engine, suite, repeat=OVERHEAD_REPEAT):
+    """Median raw and wrapper time of depth-1 searches over ``suite``, and their difference, in ms."""
+    limit = chess.engine.Limit(depth=1)
+    raw, wrapped = [], []
+    for _, fen in suite:
+        board = chess.Board(fen)
+        for _ in range(repeat):
+            raw.append(pipe.timed_search(board, limit)["wall"])
+            start = time.perf_counter()
+            engine.engine.play(board, limit, info=chess.engine.Info.ALL, game=object())
+            wrapped.append(time.perf_counter() - start)
+    raw_ms, wrapped_ms = summarize(raw)["median"], summarize(wrapped)["median"]
+    return {"raw_call_ms": raw_ms, "wrapper_call_ms": wrapped_ms, "overhead_ms": round(wrapped_ms - raw_ms, 3)}
+
+
+def run(path, limit, warmup=WARMUP, repeat=REPEAT, wrapper=True, suite=SUITE, log=sys.stderr):
+    pipe = TimedPipe(path, HASH_MB)
+    engine = Engine(path) if wrapper else None
+    positions = []
+    try:
+        for name, fen in suite:
+            board = chess.Board(fen)
+            raw = []
+            for i in range(warmup + repeat):
+                pipe.clear_hash(i)
+                raw.append(pipe.timed_search(board, limit))
+            raw = raw[warmup:]
+            entry = {
+                "name": name,
+                "fen": fen,
+                "bestmove": raw[-1]["bestmove"],
+                "nodes": raw[-1]["nodes"],
+                "wall_ms": summarize([r["wall"] for r in raw]),
+                "engine_ms": statistics.median(r["engine_ms"] for r in raw) if raw[-1]["engine_ms"] is not None else None,
+                "depth_ms": {depth: round(statistics.median(r["depths"].get(depth, r["wall"]) for r in raw) * 1000, 3)
+                             for depth in sorted(raw[-1]["depths"])},
+            }
+            entry["nps"] = round(entry["nodes"] / (entry["wall_ms"]["median"] / 1000)) if entry["nodes"] else None
+            if engine is not None:
+                wall = []
+                for i in range(warmup + repeat):
+                    engine.engine.configure({"Hash": hash_size(i)})
+                    start = time.perf_counter()
+                    # A new game object makes python-chess send ucinewgame, as the raw path does
+                    engine.engine.play(board, limit, info=chess.engine.Info.ALL, game=object())
+                    if i >= warmup:
+                        wall.append(time.perf_counter() - start)
+                entry["wrapper_ms"] = summarize(wall)
+            positions.append(entry)
+            if log:
+                print(f"{name:14} {entry['nodes'] or 0:>10,} nodes {entry['wall_ms']['median']:>9.1f} ms "
+                      f"{entry['nps'] or 0:>10,} nps" +
+                      (f"  wrapper {entry['wrapper_ms']['median']:.1f} ms" if engine is not None else ""), file=log)
+        overhead = wrapper_overhead(pipe, engine, suite) if engine is not None else None
+        if log and overhead is not None:
+            print(f"wrapper overhead {overhead['overhead_ms']:.3f} ms per search", file=log)
+    finally:
+        pipe.close()
+        if engine is not None:
+            engine.close()
+
+    total_nodes = sum(p["nodes"] or 0 for p in positions)
+    total_ms = sum(p["wall_ms"]["median"] for p in positions)
+    summary = {"nodes": total_nodes, "wall_ms": round(total_ms, 3), "nps": round(total_nodes / (total_ms / 1000))}
+    if overhead is not None:
+        summary.update(overhead)
+    if limit.nodes and any(p["nodes"] and p["nodes"] > 2 * limit.nodes for p in positions):
+        summary["nodes_limit_ignored"] = True
+    return {
+        "engine": os.path.abspath(path),
+        "engine_sha1": file_digest(path),
+        "limit": {"depth": limit.depth, "nodes": limit.nodes},
+        "warmup": warmup,
+        "repeat": repeat,
+        "machine": {"platform": platform.platform(), "python": platform.python_version(),
+                    "cpus": os.cpu_count()},
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "positions": positions,
+        "summary": summary,
+    }
+
+
+def compare(result, baseline, threshold=THRESHOLD):
+    """Lines describing each summary metric against the baseline, and whether any regressed."""
+    if result["limit"] != baseline["limit"] or [p["fen"] for p in result["positions"]] != \
+            [p["fen"] for p in baseline["positions"]]:
+        raise ValueError("baseline was run with a different limit or position suite")
+    lines = []
+    regressed = False
+    # (metric, True if higher is better)
+    for metric, higher_better in (("nps", True), ("wall_ms", False), ("overhead_ms", False)):
+        if metric not in result["summary"] or metric not in baseline["summary"]:
+            continue
+        new, old = result["summary"][metric], baseline["summary"][metric]
+        change = (new - old) / old if old else 0.0
+        worse = -change if higher_better else change
+        bad = worse > threshold and not (metric == "overhead_ms" and new - old <= OVERHEAD_FLOOR_MS)
+        regressed |= bad
+        lines.append(f"{metric:12} {old:>14,} -> {new:>14,} ({change:+.1%}){'  REGRESSION' if bad else ''}")
+    if result["summary"]["nodes"] != baseline["summary"]["nodes"]:
+        lines.append(f"note: node count changed {baseline['summary']['nodes']:,} -> {result['summary']['nodes']:,}, "
+                     f"the search itself is different")
+    return lines, regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark a UCI engine over a fixed position suite")
+    parser.add_argument("--depth", type=int, default=None, help=f"fixed depth (default {DEPTH} unless --nodes)")
+    parser.add_argument("--nodes", type=int, default=None, help="fixed node count")
+    parser.add_argument("--warmup", type=int, default=WARMUP, help="untimed searches per position")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="timed searches per position")
+    parser.add_argument("--no-wrapper", action="store_true", help="skip the Engine/python-chess timing")
+    parser.add_argument("--engine", default=None, help="UCI engine executable (default: the bundled engine)")
+    parser.add_argument("--output", default=None, help="write the JSON result here (default: stdout)")
+    parser.add_argument("--baseline", default=None, help="compare against this stored result")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="allowed relative regression")
+    args = parser.parse_args()
+
+    path = engine_path(*((args.engine,) if args.engine else ()))
+    limit = chess.engine.Limit(depth=args.depth or (None if args.nodes else DEPTH), nodes=args.nodes)
+    result = run(path, limit, args.warmup, max(1, args.repeat), not args.no_wrapper)
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if result["summary"].get("nodes_limit_ignored"):
+        print("warning: the engine searched well past the node limit; nps is still valid", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        try:
+            lines, regressed = compare(result, baseline, args.threshold)
+        except ValueError as e:
+            print(f"error: {e}", file=sys.stderr)
+            sys.exit(2)
+        print("\n".join(lines), file=sys.stderr)
+        if regressed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""Headless rendering benchmark for the game and spectator screens.
+
+    python bench_render.py --frames 1000
+    python bench_render.py --json render.json --baseline render_baseline.json
+
+Runs the real drawing code of game.py and bot_vs_stockfish.py under the SDL
+dummy driver, so it needs no display and works on a CI box. Each scenario
+scripts a game state and changes it between frames the way play does
+(moves, selections, review steps). The state changes are not timed; every
+frame is timed from the first draw call to ``pygame.display.update``.
+
+Scenarios: opening, middlegame (AI console, selections, moves), history
+(150-ply game stepped through with its eval graph), flipped (middlegame
+from Black's side with a hint) and four_boards (bot_vs_stockfish's 4-board
+view).
+
+The report gives p50/p95/p99 frame times per scenario and the
+ms/frame of each instrumented function. Function times are inclusive, so
+draw_text is also counted inside draw_console. With ``--baseline``, the exit
+status is 1 when a scenario's p50 or p95 is worse than the baseline by
+more than ``--threshold``.
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import chess
+import chess.engine
+import pygame
+
+import game as game_ui
+import bot_vs_stockfish as spectator
+from animation import MoveAnimator
+from board_renderer import BoardRenderer
+from chess_game import ChessGame
+from eval_graph import EvalGraph
+from text_cache import MoveHistoryPanel, TextCache
+from tiled_view import TiledBoardView
+
+FRAMES = 1000
+WARMUP = 30
+THRESHOLD = 0.25
+FLOOR_MS = 0.5  # Frame time changes smaller than this are noise on a shared CI box, whatever the ratio
+MOVE_EVERY = 10  # Frames between scripted moves
+MOUSE = (5, 5)
+OPENING = "e2e4 e7e5 g1f3 b8c6 f1b5 a7a6 b5a4 g8f6 e1g1 f8e7 f1e1 b7b5".split()
+MIDDLEGAME = "r2q1rk1/pb1nbppp/1p2pn2/2pp4/2PP4/1PN1PN2/PB2BPPP/R2Q1RK1 w - - 0 10"
+AI_STATS = {"depth": 8, "score": 34, "nodes": 157311, "time": 0.8123}
+
+
+class FunctionTimer:
+    """Accumulates inclusive time per wrapped function."""
+
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self.calls = defaultdict(int)
+
+    def wrap(self, owner, name, label):
+        original = getattr(owner, name)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.totals[label] += time.perf_counter() - start
+                self.calls[label] += 1
+
+        setattr(owner, name, timed)
+
+    def reset(self):
+        self.totals.clear()
+        self.calls.clear()
+
+
+def instrument(timer):
+    for name in ("draw_board", "draw_console", "draw_analysis_panel", "draw_text", "draw_button", "present"):
+        timer.wrap(game_ui, name, f"game.{name}")
+    for name in ("draw_board", "draw_console", "draw_text", "draw_button"):
+        timer.wrap(spectator, name, f"bot_vs_stockfish.{name}")
+    timer.wrap(BoardRenderer, "update", "BoardRenderer.update")
+    timer.wrap(MoveAnimator, "draw", "MoveAnimator.draw")
+    timer.wrap(MoveHistoryPanel, "draw", "MoveHistoryPanel.draw")
+    timer.wrap(EvalGraph, "draw", "EvalGraph.draw")
+    timer.wrap(TextCache, "render", "TextCache.render")
+
+
+def quiet(action, *args):
+    # ChessGame prints every move; keep that out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        return action(*args)
+
+
+def play(game, move):
+    return quiet(game.move, move.from_square, move.to_square, move.promotion)
+
+
+def random_game(plies, seed):
+    """A ChessGame with ``plies`` seeded random moves and a synthetic eval for every ply."""
+    rng = random.Random(seed)
+    while True:
+        game = ChessGame()
+        for ply in range(plies):
+            moves = list(game.board.legal_moves)
+            if not moves or game.outcome():
+                break
+            game.record_eval(chess.engine.PovScore(chess.engine.Cp(int(300 * math.sin(ply / 9))), chess.WHITE), 10)
+            play(game, rng.choice(moves))
+        if game.ply == plies:
+            return game
+        seed += 1
+
+
+def game_frame(game, flipped=False, suggested_move=None, ai_stats=None):
+    def draw():
+        dirty = game_ui.draw_board(game, flipped, suggested_move)
+        game_ui.draw_console(game, is_ai_mode=ai_stats is not None, ai_stats=ai_stats, mouse_pos=MOUSE)
+        dirty.append(game_ui.CONSOLE_RECT)
+        game_ui.present(dirty)
+    return draw
+
+
+def opening(frames, rng):
+    game = ChessGame()
+    for frame in range(frames):
+        if frame % MOVE_EVERY == MOVE_EVERY - 1:
+            if game.ply == len(OPENING):
+                game.reset()
+            else:
+                play(game, chess.Move.from_uci(OPENING[game.ply]))
+        yield game_frame(game)
+
+
+def _middlegame(frames, rng, flipped):
+    game = ChessGame()
+    game.board.set_fen(MIDDLEGAME)
+    game.invalidate_moves()
+    own = [square for square in chess.SQUARES if game.board.color_at(square) == game.board.turn]
+    suggested = None
+    for frame in range(frames):
+        phase = frame % MOVE_EVERY
+        if phase == 2:
+            game.selected_square = rng.choice(own)  # Shows the move hints
+        elif phase == 5:
+            game.selected_square = None
+            suggested = rng.choice(list(game.board.legal_moves)) if flipped else None
+        elif phase == MOVE_EVERY - 1:
+            if game.ply:
+                quiet(game.undo)  # Stay in the middlegame
+            else:
+                play(game, rng.choice(list(game.board.legal_moves)))
+        yield game_frame(game, flipped, suggested, None if flipped else AI_STATS)
+
+
+def middlegame(frames, rng):
+    return _middlegame(frames, rng, False)
+
+
+def flipped(frames, rng):
+    return _middlegame(frames, rng, True)
+
+
+def history(frames, rng):
+    game = random_game(150, rng.randrange(1 << 16))
+    step = -1
+    for _ in range(frames):
+        # Step back and forth through the last 50 plies, as with the review keys
+        if not 100 <= game.ply + step <= 150:
+            step = -step
+        quiet(game.goto, game.ply + step)
+        yield game_frame(game)
+
+
+def four_boards(frames, rng):
+    count = 4
+    games = [ChessGame() for _ in range(count)]
+    colors = [chess.WHITE if i % 2 == 0 else chess.BLACK for i in range(count)]
+    stats = [{"depth": 8, "score": 20, "nodes": 100000, "time": 0.5} for _ in range(count)]
+    view = TiledBoardView(count, spectator.BOARD_AREA, spectator.board_colors, spectator.BOARD_LABEL_FONT,
+                          spectator.LABEL_COLOR)
+    spectator.screen.fill(spectator.CONSOLE_BG)
+    view.draw_frames(spectator.screen, spectator.BORDER_COLOR)
+    messages = [""] * count
+    for frame in range(frames):
+        game = games[frame % count]
+        moves = list(game.board.legal_moves)
+        if not moves or game.ply >= 120:
+            game.reset()
+        else:
+            play(game, rng.choice(moves))
+
+        def draw():
+            dirty = []
+            for i in range(count):
+                if view.changed(i, games[i], messages[i]):
+                    dirty += spectator.draw_board(view, i, games[i], messages[i])
+            spectator.draw_console(games, stats, stats, MOUSE, colors, messages)
+            dirty.append(spectator.CONSOLE_RECT)
+            pygame.display.update(dirty)
+        yield draw
+
+
+# Game-screen scenarios first: the spectator screen replaces the display surface
+SCENARIOS = {"opening": opening, "middlegame": middlegame, "history": history, "flipped": flipped,
+             "four_boards": four_boards}
+
+
+def percentile(sorted_ms, fraction):
+    index = min(len(sorted_ms) - 1, max(0, math.ceil(fraction * len(sorted_ms)) - 1))
+    return sorted_ms[index]
+
+
+def run_scenario(name, timer, frames=FRAMES, warmup=WARMUP, seed=1):
+    times = []
+    for i, draw in enumerate(SCENARIOS[name](warmup + frames, random.Random(seed))):
+        if i == warmup:
+            timer.reset()  # Atlas loading and cold text caches are not part of the steady state
+        start = time.perf_counter()
+        draw()
+        if i >= warmup:
+            times.append((time.perf_counter() - start) * 1000)
+    ordered = sorted(times)
+    return {
+        "frames": frames,
+        "mean_ms": round(statistics.fmean(times), 4),
+        "p50_ms": round(percentile(ordered, 0.50), 4),
+        "p95_ms": round(percentile(ordered, 0.95), 4),
+        "p99_ms": round(percentile(ordered, 0.99), 4),
+        "max_ms": round(ordered[-1], 4),
+        "functions": {label: {"ms_per_frame": round(total * 1000 / frames, 4),
+                              "calls_per_frame": round(timer.calls[label] / frames, 2)}
+                      for label, total in sorted(timer.totals.items(), key=lambda item: -item[1])},
+    }
+
+
+def run(names, frames=FRAMES, warmup=WARMUP, seed=1):
+    timer = FunctionTimer()
+    instrument(timer)
+    pygame.init()
+    with contextlib.redirect_stdout(io.StringIO()):
+        game_ui.init_display()
+    game_ui.apply_layout(game_ui.DEFAULT_SIZE)
+    results = {}
+    spectator_ready = False
+    for name in SCENARIOS:
+        if name not in names:
+            continue
+        if name == "four_boards" and not spectator_ready:
+            spectator.init_display()
+            spectator_ready = True
+        elif name != "four_boards":
+            game_ui.board_renderer.invalidate()
+        results[name] = run_scenario(name, timer, frames, warmup, seed)
+    pygame.quit()
+    return {"frames": frames, "warmup": warmup, "seed": seed, "size": list(game_ui.DEFAULT_SIZE),
+            "pygame": pygame.version.ver, "scenarios": results}
+
+
+def report(result, stream=sys.stdout):
+    for name, scenario in result["scenarios"].items():
+        print(f"{name}: p50 {scenario['p50_ms']:.3f}  p95 {scenario['p95_ms']:.3f}  "
+              f"p99 {scenario['p99_ms']:.3f}  max {scenario['max_ms']:.3f} ms/frame", file=stream)
+        for label, entry in scenario["functions"].items():
+            print(f"    {label:32} {entry['ms_per_frame']:8.3f} ms/frame {entry['calls_per_frame']:8.2f} calls",
+                  file=stream)
+
+
+def compare(result, baseline, threshold=THRESHOLD):
+    """Lines comparing each scenario's p50 and p95 with the baseline, and whether any regressed."""
+    lines = []
+    regressed = False
+    for name, scenario in result["scenarios"].items():
+        old_scenario = baseline["scenarios"].get(name)
+        if old_scenario is None:
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            new, old = scenario[metric], old_scenario[metric]
+            change = (new - old) / old if old else 0.0
+            bad = change > threshold and new - old > FLOOR_MS
+            regressed |= bad
+            lines.append(f"{name:12} {metric} {old:8.3f} -> {new:8.3f} ({change:+.1%}){'  REGRESSION' if bad else ''}")
+    return lines, regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless rendering benchmark")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS),
+                        help="run only this scenario (repeatable; default: all)")
+    parser.add_argument("--frames", type=int, default=FRAMES, help="timed frames per scenario")
+    parser.add_argument("--warmup", type=int, default=WARMUP, help="untimed frames before each scenario")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", default=None, help="also write the result as JSON here")
+    parser.add_argument("--baseline", default=None, help="compare against this stored JSON result")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="allowed relative regression")
+    args = parser.parse_args()
+
+    result = run(args.scenario or list(SCENARIOS), max(1, args.frames), args.warmup, args.seed)
+    report(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            lines, regressed = compare(result, json.load(f), args.threshold)
+        print("\n".join(lines))
+        if regressed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
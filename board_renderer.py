@@ -0,0 +1,170 @@
+import chess
+import pygame
+
+FILES = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h']
+RANKS = ['8', '7', '6', '5', '4', '3', '2', '1']
+
+# Below this square size the coordinate labels are unreadable, so boards skip them
+MIN_LABEL_SQUARE_SIZE = 30
+
+HINT_COLOR = (120, 150, 100)
+HIGHLIGHT_COLOR = (100, 149, 237, 128)  # Cornflower Blue with alpha
+
+# Baked board layers, shared by every renderer with the same look
+_board_layers = {}
+
+
+def board_layer(square_size, colors, label_font, label_color, flipped=False, file_label_inset=20):
+    """Return the cached surface holding the squares and coordinate labels."""
+    key = (square_size, tuple(colors), label_font, label_color, flipped, file_label_inset)
+    layer = _board_layers.get(key)
+    if layer is not None:
+        return layer
+
+    layer = pygame.Surface((square_size * 8, square_size * 8))
+    for row in range(8):
+        for col in range(8):
+            display_row = 7 - row if flipped else row
+            display_col = 7 - col if flipped else col
+            pygame.draw.rect(layer, colors[(row + col) % 2],
+                             (display_col * square_size, display_row * square_size, square_size, square_size))
+
+    if label_font is None:
+        # Boards too small for readable coordinates (e.g. spectator tiles)
+        _board_layers[key] = layer
+        return layer
+
+    # File labels (a-h) on the bottom rank, rank labels (1-8) on the left file
+    files = FILES[::-1] if flipped else FILES
+    ranks = RANKS[::-1] if flipped else RANKS
+    for col in range(8):
+        label = label_font.render(files[col], True, label_color)
+        layer.blit(label, (col * square_size + 2, 8 * square_size - file_label_inset))
+    for row in range(8):
+        label = label_font.render(ranks[row], True, label_color)
+        layer.blit(label, (2, row * square_size + 2))
+
+    _board_layers[key] = layer
+    return layer
+
+
+def label_inset(label_font):
+    """``file_label_inset`` that puts the file labels one text line above the bottom edge."""
+    return label_font.get_height() if label_font else 0
+
+
+def _piece_bitboards(board):
+    return (board.pawns, board.knights, board.bishops, board.rooks,
+            board.queens, board.kings, board.occupied_co[chess.WHITE])
+
+
+class BoardRenderer:
+    """Keeps a composite board surface and repaints only the squares that changed.
+
+    ``update`` compares the piece bitboards and overlay squares with the last
+    frame, so a quiet frame costs a tuple compare and a move costs the two to
+    four squares it touched.
+    """
+
+    def __init__(self, square_size, images, label_font, colors, label_color=(0, 0, 0), file_label_inset=20):
+        self.square_size = square_size
+        self.size = square_size * 8
+        self.images = images
+        self.label_font = label_font
+        self.colors = colors
+        self.label_color = label_color
+        self.file_label_inset = file_label_inset
+        self.surface = pygame.Surface((self.size, self.size))
+        self._highlight = pygame.Surface((square_size, square_size), pygame.SRCALPHA)
+        self._highlight.fill(HIGHLIGHT_COLOR)
+        self.invalidate()
+
+    def invalidate(self):
+        """Force a full repaint on the next update (e.g. after an overlay covered the board)."""
+        self._flipped = None
+        self._bitboards = None
+        self._hints = frozenset()
+        self._highlights = frozenset()
+
+    def square_rect(self, square, flipped=False):
+        col = chess.square_file(square)
+        row = 7 - chess.square_rank(square)
+        if flipped:
+            col, row = 7 - col, 7 - row
+        return pygame.Rect(col * self.square_size, row * self.square_size, self.square_size, self.square_size)
+
+    def update(self, board, flipped=False, hints=frozenset(), highlights=frozenset()):
+        """Repaint changed squares on ``self.surface`` and return their rects in board coordinates."""
+        bitboards = _piece_bitboards(board)
+        hints = frozenset(hints)
+        highlights = frozenset(highlights)
+
+        if flipped != self._flipped or self._bitboards is None:
+            changed = chess.SQUARES
+        else:
+            diff = 0
+            if bitboards != self._bitboards:
+                for old, new in zip(self._bitboards, bitboards):
+                    diff |= old ^ new
+            changed = set(chess.scan_forward(diff))
+            changed.update(hints ^ self._hints)
+            changed.update(highlights ^ self._highlights)
+            if not changed:
+                return []
+
+        self._flipped = flipped
+        self._bitboards = bitboards
+        self._hints = hints
+        self._highlights = highlights
+
+        layer = board_layer(self.square_size, self.colors, self.label_font, self.label_color,
+                            flipped, self.file_label_inset)
+        if changed is chess.SQUARES:
+            self.surface.blit(layer, (0, 0))
+            for square in chess.scan_forward(board.occupied):
+                self._draw_square(board, square, flipped, None)
+            for square in hints | highlights:
+                self._draw_square(board, square, flipped, layer)
+            return [self.surface.get_rect()]
+
+        rects = []
+        for square in changed:
+            rects.append(self._draw_square(board, square, flipped, layer))
+        return rects
+
+    def _draw_square(self, board, square, flipped, layer):
+        rect = self.square_rect(square, flipped)
+        if layer is not None:
+            self.surface.blit(layer, rect.topleft, rect)
+        piece = board.piece_at(square)
+        if piece:
+            name = ('w' if piece.color == chess.WHITE else 'b') + piece.symbol().upper()
+            self.surface.blit(self.images[name], rect.topleft)
+        if square in self._hints:
+            pygame.draw.circle(self.surface, HINT_COLOR, rect.center, 15 * self.square_size // 80)
+        if square in self._highlights:
+            self.surface.blit(self._highlight, rect.topleft)
+        return rect
+
+
+ARROW_COLOR = (255, 170, 0, 180)
+
+
+def draw_move_arrow(surface, renderer, move, flipped=False, color=ARROW_COLOR):
+    """Draw a translucent arrow for ``move`` on a board surface laid out like ``renderer``."""
+    start = pygame.Vector2(renderer.square_rect(move.from_square, flipped).center)
+    end = pygame.Vector2(renderer.square_rect(move.to_square, flipped).center)
+    if start == end:
+        return
+    direction = (end - start).normalize()
+    normal = pygame.Vector2(-direction.y, direction.x)
+    width = max(2, renderer.square_size // 8)
+    head_length = renderer.square_size * 0.4
+    neck = end - direction * head_length
+    shaft = [start + normal * width / 2, neck + normal * width / 2,
+             neck - normal * width / 2, start - normal * width / 2]
+    head = [end, neck + normal * head_length * 0.6, neck - normal * head_length * 0.6]
+    overlay = pygame.Surface(surface.get_size(), pygame.SRCALPHA)
+    pygame.draw.polygon(overlay, color, shaft)
+    pygame.draw.polygon(overlay, color, head)
+    surface.blit(overlay, (0, 0))
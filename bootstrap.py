@@ -0,0 +1,74 @@
+import logging
+import threading
+import time
+
+_process_start = time.perf_counter()
+
+
+def configure_logging(level=logging.DEBUG):
+    """Logging setup for the front-ends; library modules only create loggers."""
+    logging.basicConfig(level=level, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+class StartupTimer:
+    """Records named startup milestones relative to process start and prints them once."""
+
+    def __init__(self, name):
+        self.name = name
+        self.marks = []
+        self.reported = False
+
+    def mark(self, label):
+        self.marks.append((label, (time.perf_counter() - _process_start) * 1000))
+
+    def report(self):
+        if self.reported:
+            return
+        self.reported = True
+        print(f"[{self.name}] startup: " + ", ".join(f"{label} {ms:.0f} ms" for label, ms in self.marks))
+
+
+class EngineLoader:
+    """Spawns engine processes in a background thread so a game never waits for one.
+
+    ``prefetch`` starts spawning while the menu is on screen; ``get`` hands
+    out a ready engine (waiting only if the spawn has not finished yet) and
+    re-raises any error the factory raised.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._ready = []
+        self._errors = []
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def prefetch(self, count=1):
+        for _ in range(count):
+            thread = threading.Thread(target=self._spawn, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _spawn(self):
+        try:
+            engine = self.factory()
+        except Exception as e:
+            with self._lock:
+                self._errors.append(e)
+            return
+        with self._lock:
+            self._ready.append(engine)
+
+    def get(self):
+        while True:
+            with self._lock:
+                if self._ready:
+                    return self._ready.pop()
+                if self._errors:
+                    raise self._errors.pop()
+                pending = [thread for thread in self._threads if thread.is_alive()]
+                self._threads = pending
+            if not pending:
+                # Nothing prefetched (or everything handed out already): spawn inline
+                return self.factory()
+            pending[0].join()
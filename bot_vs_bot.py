@@ -1,7 +1,13 @@
 import pygame
 import chess
+import chess.engine
 import chess.pgn
 from chess_game import ChessGame
+from game_db import GameDatabase
+from board_renderer import BoardRenderer
+import assets
+from bootstrap import StartupTimer, EngineLoader, configure_logging
+from broadcast import Broadcaster, parse_address
 import sys
 import os
 import time
@@ -11,57 +17,16 @@ import math
 sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Engine"))
 from Engine.engine import Engine
 
-# Xử lý đường dẫn tài nguyên
-if getattr(sys, 'frozen', False):
-    bundle_dir = sys._MEIPASS
-else:
-    bundle_dir = os.path.dirname(os.path.abspath(__file__))
-
-music_path = os.path.join(bundle_dir, "Music")
-image_path = os.path.join(bundle_dir, "Image")
-font_path = os.path.join(bundle_dir, "Font")
-
 # Kích thước cửa sổ
 WIDTH, HEIGHT = 640, 640
 BOARD_WIDTH = 400
 CONSOLE_WIDTH = 200
 SQUARE_SIZE = BOARD_WIDTH // 8
 MARGIN = 20
+CONSOLE_RECT = pygame.Rect(BOARD_WIDTH + 2 * MARGIN, 0, CONSOLE_WIDTH, HEIGHT)
 
-pygame.init()
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Bot vs Bot - 1 Game")
-pygame.mixer.init()
-
-# Tải nhạc và âm thanh (âm lượng = 0)
-pygame.mixer.music.load(os.path.join(music_path, "chessmusic.mp3"))
-pygame.mixer.music.set_volume(0.0)
-pygame.mixer.music.play(-1)
-move_sound = pygame.mixer.Sound(os.path.join(music_path, "Move.mp3"))
-move_sound.set_volume(0.0)
-capture_sound = pygame.mixer.Sound(os.path.join(music_path, "Capture.mp3"))
-capture_sound.set_volume(0.0)
-check_sound = pygame.mixer.Sound(os.path.join(music_path, "Check.mp3"))
-check_sound.set_volume(0.0)
-checkmate_sound = pygame.mixer.Sound(os.path.join(music_path, "Checkmate.mp3"))
-checkmate_sound.set_volume(0.0)
-
-# Thiết lập bàn cờ và quân cờ
+# Thiết lập bàn cờ
 board_colors = [(255, 255, 255), (0, 100, 0)]
-images = {}
-pieces = ["P", "N", "B", "R", "Q", "K"]
-for color in ["w", "b"]:
-    for p in pieces:
-        name = color + p
-        images[name] = pygame.transform.scale(
-            pygame.image.load(os.path.join(image_path, f"{name}.png")), (SQUARE_SIZE, SQUARE_SIZE)
-        )
-
-# Font chữ
-FONT = pygame.font.Font(os.path.join(font_path, "turok.ttf"), 40)
-VICTORY_FONT = pygame.font.Font(os.path.join(font_path, "turok.ttf"), 30)
-CONSOLE_FONT = pygame.font.SysFont('arial', 16)
-BOARD_LABEL_FONT = pygame.font.SysFont('arial', 12)
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 CONSOLE_BG = (50, 50, 50)
@@ -69,11 +34,34 @@ LABEL_COLOR = (0, 0, 0)
 BORDER_COLOR = (150, 150, 150)
 MESSAGE_BG = (0, 0, 0, 180)
 
-# Tải background
-menu_background = pygame.image.load(os.path.join(image_path, "landscape3.jpg"))
-menu_background = pygame.transform.scale(menu_background, (WIDTH, HEIGHT))
-
-def draw_text(text, x, y, font=FONT, center=True, color=BLACK, outline_color=None):
+# Trạng thái hiển thị, được khởi tạo trong init_display() để có thể import module mà không cần màn hình
+screen = None
+FONT = VICTORY_FONT = CONSOLE_FONT = BOARD_LABEL_FONT = None
+menu_background = None
+# Âm thanh luôn tắt (âm lượng = 0) nên không cần khởi tạo mixer hay giải mã file
+sounds = assets.SoundBank(muted=True)
+engine_loader = EngineLoader(Engine)
+startup = StartupTimer("bot_vs_bot")
+broadcaster = None  # Broadcaster khi chạy với --broadcast, gửi nước đi cho người xem qua socket
+
+def init_display():
+    global screen, FONT, VICTORY_FONT, CONSOLE_FONT, BOARD_LABEL_FONT, menu_background
+    pygame.display.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Bot vs Bot - 1 Game")
+
+    # Font chữ
+    FONT = assets.load_font("turok.ttf", 40)
+    VICTORY_FONT = assets.load_font("turok.ttf", 30)
+    CONSOLE_FONT = assets.load_font("arial", 16)
+    BOARD_LABEL_FONT = assets.load_font("arial", 12)
+
+    # Tải background
+    menu_background = assets.load_image("landscape3.jpg", (WIDTH, HEIGHT))
+    startup.mark("display ready")
+
+def draw_text(text, x, y, font=None, center=True, color=BLACK, outline_color=None):
+    font = font or FONT
     label = font.render(text, True, color)
     rect = label.get_rect()
     if center:
@@ -90,22 +78,14 @@ def draw_text(text, x, y, font=FONT, center=True, color=BLACK, outline_color=Non
     screen.blit(label, rect)
     return rect
 
-def draw_board(x_offset, y_offset, game, message=""):
-    pygame.draw.rect(screen, BORDER_COLOR,
-                     (x_offset - 2, y_offset - 2, BOARD_WIDTH + 4, BOARD_WIDTH + 4))
-    for row in range(8):
-        for col in range(8):
-            color = board_colors[(row + col) % 2]
-            pygame.draw.rect(screen, color,
-                             (x_offset + col * SQUARE_SIZE, y_offset + row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
-    files = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h']
-    ranks = ['8', '7', '6', '5', '4', '3', '2', '1']
-    for col in range(8):
-        label = BOARD_LABEL_FONT.render(files[col], True, LABEL_COLOR)
-        screen.blit(label, (x_offset + col * SQUARE_SIZE + 2, y_offset + (7 * SQUARE_SIZE) + SQUARE_SIZE - 15))
-    for row in range(8):
-        label = BOARD_LABEL_FONT.render(ranks[row], True, LABEL_COLOR)
-        screen.blit(label, (x_offset + 2, y_offset + row * SQUARE_SIZE + 2))
+def draw_board(x_offset, y_offset, renderer, game, message=""):
+    """Blit the board squares that changed since the last frame and return their screen rects."""
+    changed = renderer.update(game.board)
+    if message:
+        # The message overlay is translucent, so it needs a clean board underneath every frame
+        changed = [renderer.surface.get_rect()]
+    for rect in changed:
+        screen.blit(renderer.surface, (x_offset + rect.x, y_offset + rect.y), rect)
 
     if message:
         message_surface = pygame.Surface((BOARD_WIDTH - 20, 60), pygame.SRCALPHA)
@@ -115,18 +95,14 @@ def draw_board(x_offset, y_offset, game, message=""):
         outline = WHITE if color == BLACK else None
         draw_text(message, x_offset + BOARD_WIDTH // 2, y_offset + BOARD_WIDTH // 2,
                   font=VICTORY_FONT, color=color, outline_color=outline)
+    return [rect.move(x_offset, y_offset) for rect in changed]
 
-def draw_pieces(game, x_offset, y_offset):
-    for square in chess.SQUARES:
-        piece = game.get_piece(square)
-        if piece:
-            col = chess.square_file(square)
-            row = 7 - chess.square_rank(square)
-            name = ('w' if piece.color == chess.WHITE else 'b') + piece.symbol().upper()
-            screen.blit(images[name], (x_offset + col * SQUARE_SIZE, y_offset + row * SQUARE_SIZE))
+def draw_board_frame(x_offset, y_offset):
+    pygame.draw.rect(screen, BORDER_COLOR,
+                     (x_offset - 2, y_offset - 2, BOARD_WIDTH + 4, BOARD_WIDTH + 4))
 
 def draw_console(game, bot1_stats, bot2_stats, mouse_pos, bot1_color):
-    pygame.draw.rect(screen, CONSOLE_BG, (BOARD_WIDTH + 2 * MARGIN, 0, CONSOLE_WIDTH, HEIGHT))
+    pygame.draw.rect(screen, CONSOLE_BG, CONSOLE_RECT)
     y_offset = 10
 
     turn = "White" if game.board.turn == chess.WHITE else "Black"
@@ -137,7 +113,7 @@ def draw_console(game, bot1_stats, bot2_stats, mouse_pos, bot1_color):
     screen.blit(turn_value, (BOARD_WIDTH + 2 * MARGIN + 10 + turn_label.get_width(), y_offset))
 
     y_offset += 20
-    possible_moves = len(list(game.board.legal_moves))
+    possible_moves = game.legal_move_count()
     draw_text(f"Moves: {possible_moves}", BOARD_WIDTH + 2 * MARGIN + 10, y_offset, font=CONSOLE_FONT, center=False, color=WHITE)
 
     y_offset += 20
@@ -216,24 +192,30 @@ def calculate_elo(wins, draws, losses, opponent_elo=2000):
     return opponent_elo + elo_diff
 
 def handle_move_outcome(game, target_piece=None, bot1_color=chess.WHITE):
-    if game.board.is_checkmate():
-        checkmate_sound.play()
+    # Bộ theo dõi kết quả cập nhật theo từng nước nên kiểm tra này là O(1)
+    outcome = game.outcome()
+    if outcome and outcome.termination == chess.Termination.CHECKMATE:
+        sounds.play("Checkmate")
         winner = "Bot1" if game.board.turn != bot1_color else "Bot2"
         return "checkmate", winner, f"{winner} Wins!"
-    elif game.board.is_stalemate():
+    elif outcome and outcome.termination == chess.Termination.STALEMATE:
         return "stalemate", None, "Stalemate!"
-    elif game.board.is_insufficient_material():
+    elif outcome and outcome.termination == chess.Termination.INSUFFICIENT_MATERIAL:
         return "draw", None, "Draw: Insufficient material!"
+    elif outcome and outcome.termination == chess.Termination.SEVENTYFIVE_MOVES:
+        return "draw", None, "Draw: 75-move rule!"
+    elif outcome and outcome.termination == chess.Termination.FIVEFOLD_REPETITION:
+        return "draw", None, "Draw: Fivefold repetition!"
     if target_piece:
-        capture_sound.play()
+        sounds.play("Capture")
     else:
-        move_sound.play()
+        sounds.play("Move")
     if game.board.is_check():
-        check_sound.play()
+        sounds.play("Check")
     return None, None, ""
 
 def export_pgn(game, bot1_color):
-    pgn_file = os.path.join(bundle_dir, "game_records.pgn")
+    pgn_file = assets.data_path("game_records.pgn")
     with open(pgn_file, "w", encoding="utf-8") as f:
         pgn_game = chess.pgn.Game()
         pgn_game.headers["Event"] = "Bot vs Bot"
@@ -243,21 +225,25 @@ def export_pgn(game, bot1_color):
         pgn_game.headers["White"] = "Bot1" if bot1_color == chess.WHITE else "Bot2"
         pgn_game.headers["Black"] = "Bot2" if bot1_color == chess.WHITE else "Bot1"
         node = pgn_game
-        for move in game.move_history:
+        for ply, move in enumerate(game.move_history, 1):
             node = node.add_variation(move)
-        pgn_game.headers["Result"] = (
-            "1-0" if game.board.is_checkmate() and game.board.turn == chess.BLACK else
-            "0-1" if game.board.is_checkmate() and game.board.turn == chess.WHITE else
-            "1/2-1/2" if game.board.is_game_over() else "*"
-        )
+            # Ghi điểm engine đã có cho thế cờ sau nước này dưới dạng [%eval]
+            entry = game.evals.get(ply)
+            if entry is not None:
+                node.set_eval(chess.engine.PovScore(entry[0], chess.WHITE), entry[1])
+        outcome = game.outcome()
+        pgn_game.headers["Result"] = outcome.result() if outcome else "*"
         print(pgn_game, file=f)
+    # Thêm ván vào cơ sở dữ liệu để tra cứu theo thế cờ
+    with GameDatabase(assets.data_path("game_db")) as db:
+        db.add_pgn_game(pgn_game)
     return pgn_file
 
 def bot_vs_bot():
     bot1_wins, draws, bot2_wins = 0, 0, 0
     game = ChessGame()
-    bot1 = Engine()
-    bot2 = Engine()
+    bot1 = engine_loader.get()
+    bot2 = engine_loader.get()
     bot1_color = chess.WHITE
     bot1_stats = {}
     bot2_stats = {}
@@ -271,6 +257,8 @@ def bot_vs_bot():
             result = bot.get_best_move_with_stats()
             end_time = time.time()
             move = result.get("move")
+            # Lưu điểm của thế cờ trước nước đi vào lịch sử đánh giá của ván
+            game.record_eval(result.get("pov_score"), result.get("depth"))
             stats.update({
                 "depth": result.get("depth", "-"),
                 "score": "-",
@@ -284,14 +272,21 @@ def bot_vs_bot():
 
     running = True
     board_position = (MARGIN, MARGIN)
+    renderer = BoardRenderer(SQUARE_SIZE, assets.piece_images(SQUARE_SIZE), BOARD_LABEL_FONT, board_colors, LABEL_COLOR, file_label_inset=15)
+    # Background and frame are static; later frames only touch the board squares and the console
+    screen.blit(menu_background, (0, 0))
+    draw_board_frame(*board_position)
+    pygame.display.flip()
+    if broadcaster:
+        broadcaster.start_game(0, game.board, "Bot1" if bot1_color == chess.WHITE else "Bot2",
+                               "Bot2" if bot1_color == chess.WHITE else "Bot1")
     while running and game_active:
-        screen.blit(menu_background, (0, 0))
         x_offset, y_offset = board_position
-        draw_board(x_offset, y_offset, game, game_message)
-        draw_pieces(game, x_offset, y_offset)
+        dirty_rects = draw_board(x_offset, y_offset, renderer, game, game_message)
 
         mouse_pos = pygame.mouse.get_pos()
         btn_back = draw_console(game, bot1_stats, bot2_stats, mouse_pos, bot1_color)
+        dirty_rects.append(CONSOLE_RECT)
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -304,7 +299,7 @@ def bot_vs_bot():
         if not running:
             break
 
-        if game.board.is_game_over():
+        if game.outcome():
             outcome, winner, message = handle_move_outcome(game, bot1_color=bot1_color)
             game_message = message
             if outcome == "checkmate":
@@ -314,6 +309,8 @@ def bot_vs_bot():
                     bot2_wins += 1
             elif outcome in ["stalemate", "draw"]:
                 draws += 1
+            if broadcaster:
+                broadcaster.end_game(0, game.outcome().result(), message)
             game_active = False
             continue
 
@@ -330,11 +327,13 @@ def bot_vs_bot():
                 promotion = {'Q': chess.QUEEN, 'R': chess.ROOK, 'B': chess.BISHOP, 'N': chess.KNIGHT}.get(promotion_piece)
             move_result = game.move(from_square, to_square, promotion=promotion)
             if move_result["valid"]:
+                if broadcaster:
+                    broadcaster.move(0, game.move_history[-1])
                 target_piece = game.get_piece(to_square)
                 outcome, winner, message = handle_move_outcome(game, target_piece, bot1_color=bot1_color)
                 game_message = message
 
-        pygame.display.flip()
+        pygame.display.update(dirty_rects)
         pygame.time.wait(100)
 
     pgn_file = export_pgn(game, bot1_color)
@@ -355,6 +354,9 @@ def main_menu():
         if btn_quit.collidepoint(mouse_x, mouse_y):
             draw_text("Exit", WIDTH // 2, 320, color=(0, 128, 0))
         pygame.display.flip()
+        if not startup.reported:
+            startup.mark("first frame")
+            startup.report()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
@@ -366,5 +368,22 @@ def main_menu():
                         pygame.quit()
                         sys.exit()
 
+def main():
+    global broadcaster
+    import argparse
+    parser = argparse.ArgumentParser(description="Bot vs Bot")
+    parser.add_argument("--broadcast", metavar="[HOST:]PORT", help="broadcast the game to viewers over a socket")
+    args = parser.parse_args()
+
+    configure_logging()
+    if args.broadcast:
+        broadcaster = Broadcaster(*parse_address(args.broadcast))
+        if not broadcaster.start():
+            broadcaster = None
+    init_display()
+    # Spawn the engines while the menu is shown
+    engine_loader.prefetch(2)
+    main_menu()
+
 if __name__ == "__main__":
-    main_menu()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -1,7 +1,14 @@
 import pygame
 import chess
+import chess.engine
 import chess.pgn
 from chess_game import ChessGame
+from game_db import GameDatabase
+from tiled_view import TiledBoardView
+from text_cache import TextCache
+import assets
+from bootstrap import StartupTimer, EngineLoader, configure_logging
+from broadcast import Broadcaster, parse_address
 import sys
 import os
 import time
@@ -12,57 +19,16 @@ import math
 sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Engine"))
 from Engine.engine import Engine
 
-# Xử lý đường dẫn tài nguyên
-if getattr(sys, 'frozen', False):
-    bundle_dir = sys._MEIPASS
-else:
-    bundle_dir = os.path.dirname(os.path.abspath(__file__))
-
-music_path = os.path.join(bundle_dir, "Music")
-image_path = os.path.join(bundle_dir, "Image")
-font_path = os.path.join(bundle_dir, "Font")
-
 # Kích thước cửa sổ
 WIDTH, HEIGHT = 840, 640
-BOARD_WIDTH = 300
 CONSOLE_WIDTH = 200
-SQUARE_SIZE = BOARD_WIDTH // 8
-MARGIN = 10
-
-pygame.init()
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Bot vs Stockfish - 4 Games")
-pygame.mixer.init()
-
-# Tải nhạc và âm thanh (âm lượng = 0)
-pygame.mixer.music.load(os.path.join(music_path, "chessmusic.mp3"))
-pygame.mixer.music.set_volume(0.0)
-pygame.mixer.music.play(-1)
-move_sound = pygame.mixer.Sound(os.path.join(music_path, "Move.mp3"))
-move_sound.set_volume(0.0)
-capture_sound = pygame.mixer.Sound(os.path.join(music_path, "Capture.mp3"))
-capture_sound.set_volume(0.0)
-check_sound = pygame.mixer.Sound(os.path.join(music_path, "Check.mp3"))
-check_sound.set_volume(0.0)
-checkmate_sound = pygame.mixer.Sound(os.path.join(music_path, "Checkmate.mp3"))
-checkmate_sound.set_volume(0.0)
-
-# Thiết lập bàn cờ và quân cờ
+BOARD_AREA = pygame.Rect(0, 0, WIDTH - CONSOLE_WIDTH, HEIGHT)
+CONSOLE_RECT = pygame.Rect(WIDTH - CONSOLE_WIDTH, 0, CONSOLE_WIDTH, HEIGHT)
+NUM_GAMES = 4  # Số ván đấu song song, đổi bằng --games
+STOCKFISH_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Engine", "stockfish", "stockfish.exe")
+
+# Thiết lập bàn cờ
 board_colors = [(255, 255, 255), (0, 100, 0)]
-images = {}
-pieces = ["P", "N", "B", "R", "Q", "K"]
-for color in ["w", "b"]:
-    for p in pieces:
-        name = color + p
-        images[name] = pygame.transform.scale(
-            pygame.image.load(os.path.join(image_path, f"{name}.png")), (SQUARE_SIZE, SQUARE_SIZE)
-        )
-
-# Font chữ
-FONT = pygame.font.Font(os.path.join(font_path, "turok.ttf"), 40)
-VICTORY_FONT = pygame.font.Font(os.path.join(font_path, "turok.ttf"), 30)
-CONSOLE_FONT = pygame.font.SysFont('arial', 16)
-BOARD_LABEL_FONT = pygame.font.SysFont('arial', 12)
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 CONSOLE_BG = (50, 50, 50)
@@ -71,19 +37,44 @@ HIGHLIGHT_COLOR = (100, 149, 237, 128)
 BORDER_COLOR = (150, 150, 150)
 MESSAGE_BG = (0, 0, 0, 180)
 
-# Tải background
-menu_background = pygame.image.load(os.path.join(image_path, "landscape3.jpg"))
-menu_background = pygame.transform.scale(menu_background, (WIDTH, HEIGHT))
-
-def draw_text(text, x, y, font=FONT, center=True, color=BLACK, outline_color=None):
-    label = font.render(text, True, color)
+# Trạng thái hiển thị, được khởi tạo trong init_display() để có thể import module mà không cần màn hình
+screen = None
+FONT = VICTORY_FONT = CONSOLE_FONT = BOARD_LABEL_FONT = None
+menu_background = None
+# Âm thanh luôn tắt (âm lượng = 0) nên không cần khởi tạo mixer hay giải mã file
+sounds = assets.SoundBank(muted=True)
+text_cache = TextCache()
+engine_loader = EngineLoader(Engine)
+stockfish_loader = EngineLoader(lambda: Stockfish(path=STOCKFISH_PATH, depth=1))
+startup = StartupTimer("bot_vs_stockfish")
+broadcaster = None  # Broadcaster khi chạy với --broadcast, gửi nước đi cho người xem qua socket
+
+def init_display():
+    global screen, FONT, VICTORY_FONT, CONSOLE_FONT, BOARD_LABEL_FONT, menu_background
+    pygame.display.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption(f"Bot vs Stockfish - {NUM_GAMES} Games")
+
+    # Font chữ
+    FONT = assets.load_font("turok.ttf", 40)
+    VICTORY_FONT = assets.load_font("turok.ttf", 30)
+    CONSOLE_FONT = assets.load_font("arial", 16)
+    BOARD_LABEL_FONT = assets.load_font("arial", 12)
+
+    # Tải background
+    menu_background = assets.load_image("landscape3.jpg", (WIDTH, HEIGHT))
+    startup.mark("display ready")
+
+def draw_text(text, x, y, font=None, center=True, color=BLACK, outline_color=None):
+    font = font or FONT
+    label = text_cache.render(font, text, color)
     rect = label.get_rect()
     if center:
         rect.center = (x, y)
     else:
         rect.topleft = (x, y)
     if outline_color:
-        outline = font.render(text, True, outline_color)
+        outline = text_cache.render(font, text, outline_color)
         for dx in [-2, 0, 2]:
             for dy in [-2, 0, 2]:
                 if dx != 0 or dy != 0:
@@ -92,81 +83,89 @@ def draw_text(text, x, y, font=FONT, center=True, color=BLACK, outline_color=Non
     screen.blit(label, rect)
     return rect
 
-def draw_board(x_offset, y_offset, game_num, game, message=""):
-    pygame.draw.rect(screen, BORDER_COLOR,
-                     (x_offset - 2, y_offset - 2, BOARD_WIDTH + 4, BOARD_WIDTH + 4))
-    for row in range(8):
-        for col in range(8):
-            color = board_colors[(row + col) % 2]
-            pygame.draw.rect(screen, color,
-                             (x_offset + col * SQUARE_SIZE, y_offset + row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
-    files = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h']
-    ranks = ['8', '7', '6', '5', '4', '3', '2', '1']
-    for col in range(8):
-        label = BOARD_LABEL_FONT.render(files[col], True, LABEL_COLOR)
-        screen.blit(label, (x_offset + col * SQUARE_SIZE + 2, y_offset + (7 * SQUARE_SIZE) + SQUARE_SIZE - 15))
-    for row in range(8):
-        label = BOARD_LABEL_FONT.render(ranks[row], True, LABEL_COLOR)
-        screen.blit(label, (x_offset + 2, y_offset + row * SQUARE_SIZE + 2))
-    draw_text(f"Game {game_num + 1}", x_offset + BOARD_WIDTH // 2, y_offset + 10, font=CONSOLE_FONT, color=WHITE)
+def draw_board(view, game_num, game, message=""):
+    """Blit the squares of one tile that changed since the last frame and return their screen rects."""
+    renderer = view.renderers[game_num]
+    board_rect = view.tiles[game_num]
+    changed = renderer.update(game.board)
+    # Small tiles have no room for a title
+    title_rect = pygame.Rect(0, 0, renderer.size, 20) if renderer.size >= 120 else None
+    if message:
+        # The message overlay is translucent, so it needs a clean board underneath every frame
+        changed = [renderer.surface.get_rect()]
+    elif title_rect and any(rect.colliderect(title_rect) for rect in changed):
+        changed.append(title_rect)
+    for rect in changed:
+        screen.blit(renderer.surface, (board_rect.x + rect.x, board_rect.y + rect.y), rect)
+    if title_rect and any(rect.colliderect(title_rect) for rect in changed):
+        draw_text(f"Game {game_num + 1}", board_rect.centerx, board_rect.y + 10, font=CONSOLE_FONT, color=WHITE)
 
     if message:
-        message_surface = pygame.Surface((BOARD_WIDTH - 20, 60), pygame.SRCALPHA)
+        message_height = min(60, renderer.size // 3)
+        message_surface = pygame.Surface((renderer.size - 20, message_height), pygame.SRCALPHA)
         message_surface.fill(MESSAGE_BG)
-        screen.blit(message_surface, (x_offset + 10, y_offset + BOARD_WIDTH // 2 - 30))
+        screen.blit(message_surface, (board_rect.x + 10, board_rect.centery - message_height // 2))
         color = WHITE if "Bot Wins" in message else BLACK if "Stockfish Wins" in message else WHITE
         outline = WHITE if color == BLACK else None
-        draw_text(message, x_offset + BOARD_WIDTH // 2, y_offset + BOARD_WIDTH // 2,
-                  font=VICTORY_FONT, color=color, outline_color=outline)
-
-def draw_pieces(game, x_offset, y_offset):
-    for square in chess.SQUARES:
-        piece = game.get_piece(square)
-        if piece:
-            col = chess.square_file(square)
-            row = 7 - chess.square_rank(square)
-            name = ('w' if piece.color == chess.WHITE else 'b') + piece.symbol().upper()
-            screen.blit(images[name], (x_offset + col * SQUARE_SIZE, y_offset + row * SQUARE_SIZE))
-
-def draw_console(games, bot_stats_list, stockfish_stats_list, mouse_pos, bot_colors):
-    pygame.draw.rect(screen, CONSOLE_BG, (2 * BOARD_WIDTH + 2 * MARGIN, 0, CONSOLE_WIDTH, HEIGHT))
+        font = VICTORY_FONT if renderer.size >= 200 else CONSOLE_FONT
+        draw_text(message, board_rect.centerx, board_rect.centery,
+                  font=font, color=color, outline_color=outline)
+    return [rect.move(board_rect.topleft) for rect in changed]
+
+def draw_console(games, bot_stats_list, stockfish_stats_list, mouse_pos, bot_colors, game_messages):
+    pygame.draw.rect(screen, CONSOLE_BG, CONSOLE_RECT)
+    x = CONSOLE_RECT.x + 10
     y_offset = 10
+    if len(games) > 4:
+        # Too many games for per-game details: one line each, from data that is already there
+        running = sum(1 for message in game_messages if not message)
+        draw_text(f"Running: {running}/{len(games)}", x, y_offset, font=CONSOLE_FONT, center=False, color=(255, 215, 0))
+        y_offset += 25
+        max_lines = (HEIGHT - 80 - y_offset) // 20
+        for i, game in enumerate(games[:max_lines]):
+            status = game_messages[i] or f"{len(game.board.move_stack)} ply"
+            draw_text(f"G{i + 1}: {status}", x, y_offset, font=CONSOLE_FONT, center=False, color=WHITE)
+            y_offset += 20
+        if len(games) > max_lines:
+            draw_text(f"... +{len(games) - max_lines}", x, y_offset, font=CONSOLE_FONT, center=False, color=WHITE)
+        return draw_button("Back", CONSOLE_RECT.x + 50, HEIGHT - 60, 100, 30, (200, 50, 50), (255, 100, 100), mouse_pos)
+
     for i, game in enumerate(games):
-        title = CONSOLE_FONT.render(f"Game {i + 1}", True, (255, 215, 0))
-        screen.blit(title, (2 * BOARD_WIDTH + 2 * MARGIN + 10, y_offset))
+        title = text_cache.render(CONSOLE_FONT, f"Game {i + 1}", (255, 215, 0))
+        screen.blit(title, (x, y_offset))
         y_offset += 25
 
         turn = "White" if game.board.turn == chess.WHITE else "Black"
         turn_color = WHITE if turn == "White" else (150, 150, 150)
-        turn_label = CONSOLE_FONT.render("Turn: ", True, WHITE)
-        turn_value = CONSOLE_FONT.render(turn, True, turn_color)
-        screen.blit(turn_label, (2 * BOARD_WIDTH + 2 * MARGIN + 10, y_offset))
-        screen.blit(turn_value, (2 * BOARD_WIDTH + 2 * MARGIN + 10 + turn_label.get_width(), y_offset))
+        turn_label = text_cache.render(CONSOLE_FONT, "Turn: ", WHITE)
+        turn_value = text_cache.render(CONSOLE_FONT, turn, turn_color)
+        screen.blit(turn_label, (x, y_offset))
+        screen.blit(turn_value, (x + turn_label.get_width(), y_offset))
 
         y_offset += 20
-        possible_moves = len(list(game.board.legal_moves))
-        draw_text(f"Moves: {possible_moves}", 2 * BOARD_WIDTH + 2 * MARGIN + 10, y_offset, font=CONSOLE_FONT, center=False, color=WHITE)
+        possible_moves = game.legal_move_count()
+        draw_text(f"Moves: {possible_moves}", x, y_offset, font=CONSOLE_FONT, center=False, color=WHITE)
 
         y_offset += 20
         in_check = game.board.is_check()
-        draw_text(f"Check: {in_check}", 2 * BOARD_WIDTH + 2 * MARGIN + 10, y_offset, font=CONSOLE_FONT, center=False, color=WHITE)
+        draw_text(f"Check: {in_check}", x, y_offset, font=CONSOLE_FONT, center=False, color=WHITE)
 
         y_offset += 20
-        bot_label = CONSOLE_FONT.render(f"Bot ({'White' if bot_colors[i] == chess.WHITE else 'Black'})", True, WHITE)
-        screen.blit(bot_label, (2 * BOARD_WIDTH + 2 * MARGIN + 10, y_offset))
+        bot_label = text_cache.render(CONSOLE_FONT, f"Bot ({'White' if bot_colors[i] == chess.WHITE else 'Black'})", WHITE)
+        screen.blit(bot_label, (x, y_offset))
 
         y_offset += 20
         bot_stats = bot_stats_list[i]
         bot_depth = bot_stats.get("depth", "-")
-        draw_text(f"Depth: {bot_depth}", 2 * BOARD_WIDTH + 2 * MARGIN + 10, y_offset, font=CONSOLE_FONT, center=False, color=WHITE)
+        draw_text(f"Depth: {bot_depth}", x, y_offset, font=CONSOLE_FONT, center=False, color=WHITE)
 
         y_offset += 20
         bot_score = bot_stats.get("score", "-")
-        draw_text(f"Score: {bot_score}", 2 * BOARD_WIDTH + 2 * MARGIN + 10, y_offset, font=CONSOLE_FONT, center=False, color=WHITE)
+        draw_text(f"Score: {bot_score}", x, y_offset, font=CONSOLE_FONT, center=False, color=WHITE)
 
         y_offset += 25
 
-    btn_back = draw_button("Back", 2 * BOARD_WIDTH + 2 * MARGIN + 50, HEIGHT - 60, 100, 30, (200, 50, 50), (255, 100, 100), mouse_pos)
+    btn_back = draw_button("Back", CONSOLE_RECT.x + 50, HEIGHT - 60, 100, 30, (200, 50, 50), (255, 100, 100), mouse_pos)
     return btn_back
 
 def draw_button(text, x, y, w, h, color, hover_color, mouse_pos, text_color=WHITE):
@@ -214,24 +213,31 @@ def calculate_elo(wins, draws, losses, opponent_elo=3200):
     return opponent_elo + elo_diff
 
 def handle_move_outcome(game, target_piece=None, bot_color=chess.WHITE):
-    if game.board.is_checkmate():
-        checkmate_sound.play()
+    # Bộ theo dõi kết quả cập nhật theo từng nước nên kiểm tra này là O(1)
+    outcome = game.outcome()
+    if outcome and outcome.termination == chess.Termination.CHECKMATE:
+        sounds.play("Checkmate")
         winner = "Bot" if game.board.turn != bot_color else "Stockfish"
         return "checkmate", winner, f"{winner} Wins!"
-    elif game.board.is_stalemate():
+    elif outcome and outcome.termination == chess.Termination.STALEMATE:
         return "stalemate", None, "Stalemate!"
-    elif game.board.is_insufficient_material():
+    elif outcome and outcome.termination == chess.Termination.INSUFFICIENT_MATERIAL:
         return "draw", None, "Draw: Insufficient material!"
+    elif outcome and outcome.termination == chess.Termination.SEVENTYFIVE_MOVES:
+        return "draw", None, "Draw: 75-move rule!"
+    elif outcome and outcome.termination == chess.Termination.FIVEFOLD_REPETITION:
+        return "draw", None, "Draw: Fivefold repetition!"
     if target_piece:
-        capture_sound.play()
+        sounds.play("Capture")
     else:
-        move_sound.play()
+        sounds.play("Move")
     if game.board.is_check():
-        check_sound.play()
+        sounds.play("Check")
     return None, None, ""
 
 def export_pgn(games, bot_colors):
-    pgn_file = os.path.join(bundle_dir, "game_records.pgn")
+    pgn_file = assets.data_path("game_records.pgn")
+    pgn_games = []
     with open(pgn_file, "w", encoding="utf-8") as f:
         for i, game in enumerate(games):
             pgn_game = chess.pgn.Game()
@@ -242,33 +248,39 @@ def export_pgn(games, bot_colors):
             pgn_game.headers["White"] = "Bot" if bot_colors[i] == chess.WHITE else "Stockfish"
             pgn_game.headers["Black"] = "Stockfish" if bot_colors[i] == chess.WHITE else "Bot"
             node = pgn_game
-            for move in game.move_history:
+            for ply, move in enumerate(game.move_history, 1):
                 node = node.add_variation(move)
-            pgn_game.headers["Result"] = (
-                "1-0" if game.board.is_checkmate() and game.board.turn == chess.BLACK else
-                "0-1" if game.board.is_checkmate() and game.board.turn == chess.WHITE else
-                "1/2-1/2" if game.board.is_game_over() else "*"
-            )
+                # Ghi điểm engine đã có cho thế cờ sau nước này dưới dạng [%eval]
+                entry = game.evals.get(ply)
+                if entry is not None:
+                    node.set_eval(chess.engine.PovScore(entry[0], chess.WHITE), entry[1])
+            outcome = game.outcome()
+            pgn_game.headers["Result"] = outcome.result() if outcome else "*"
             print(pgn_game, file=f, end="\n\n")
+            pgn_games.append(pgn_game)
+    # Thêm các ván vào cơ sở dữ liệu để tra cứu theo thế cờ
+    with GameDatabase(assets.data_path("game_db")) as db:
+        for pgn_game in pgn_games:
+            db.add_pgn_game(pgn_game)
     return pgn_file
 
-def bot_vs_stockfish():
+def bot_vs_stockfish(num_games=None):
+    num_games = num_games or NUM_GAMES
     wins, draws, losses = 0, 0, 0
-    stockfish_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Engine", "stockfish", "stockfish.exe")
-    if not os.path.isfile(stockfish_path):
+    if not os.path.isfile(STOCKFISH_PATH):
         draw_text("Stockfish not found!", WIDTH // 2, HEIGHT // 2, font=FONT, color=(255, 0, 0))
         pygame.display.flip()
         pygame.time.wait(2000)
         return
 
-    games = [ChessGame() for _ in range(4)]
-    bots = [Engine() for _ in range(4)]
-    stockfishes = [Stockfish(path=stockfish_path, depth=1) for _ in range(4)]
-    bot_colors = [chess.WHITE if i % 2 == 0 else chess.BLACK for i in range(4)]
-    bot_stats_list = [{} for _ in range(4)]
-    stockfish_stats_list = [{} for _ in range(4)]
-    game_active = [True for _ in range(4)]
-    game_messages = [""] * 4
+    games = [ChessGame() for _ in range(num_games)]
+    bots = [engine_loader.get() for _ in range(num_games)]
+    stockfishes = [stockfish_loader.get() for _ in range(num_games)]
+    bot_colors = [chess.WHITE if i % 2 == 0 else chess.BLACK for i in range(num_games)]
+    bot_stats_list = [{} for _ in range(num_games)]
+    stockfish_stats_list = [{} for _ in range(num_games)]
+    game_active = [True for _ in range(num_games)]
+    game_messages = [""] * num_games
 
     def get_bot_move(game, bot, stats):
         start_time = time.time()
@@ -276,6 +288,8 @@ def bot_vs_stockfish():
         result = bot.get_best_move_with_stats()
         end_time = time.time()
         move = result.get("move")
+        # Lưu điểm của thế cờ trước nước đi vào lịch sử đánh giá của ván
+        game.record_eval(result.get("pov_score"), result.get("depth"))
         stats.update({
             "depth": result.get("depth", "-"),
             "score": "-",
@@ -294,8 +308,11 @@ def bot_vs_stockfish():
             score = "-"
             if evaluation["type"] == "cp":
                 score = str(evaluation["value"])
+                # Điểm của Stockfish tính theo bên Trắng; không có độ sâu nên ghi 0
+                game.record_eval(chess.engine.PovScore(chess.engine.Cp(evaluation["value"]), chess.WHITE), 0)
             elif evaluation["type"] == "mate":
                 score = f"mate {evaluation['value']}"
+                game.record_eval(chess.engine.PovScore(chess.engine.Mate(evaluation["value"]), chess.WHITE), 0)
             stats.update({
                 "depth": stockfish.get_parameters().get("depth", "-"),
                 "score": score,
@@ -307,21 +324,25 @@ def bot_vs_stockfish():
             return None
 
     running = True
-    board_positions = [
-        (MARGIN, MARGIN),
-        (BOARD_WIDTH + 2 * MARGIN, MARGIN),
-        (MARGIN, BOARD_WIDTH + 2 * MARGIN),
-        (BOARD_WIDTH + 2 * MARGIN, BOARD_WIDTH + 2 * MARGIN)
-    ]
+    view = TiledBoardView(num_games, BOARD_AREA, board_colors, BOARD_LABEL_FONT, LABEL_COLOR)
+    # Background and frames are static; later frames only touch changed tiles and the console
+    screen.blit(menu_background, (0, 0))
+    view.draw_frames(screen, BORDER_COLOR)
+    pygame.display.flip()
+    if broadcaster:
+        for i in range(num_games):
+            bot_is_white = bot_colors[i] == chess.WHITE
+            broadcaster.start_game(i, games[i].board, "Bot" if bot_is_white else "Stockfish",
+                                   "Stockfish" if bot_is_white else "Bot")
     while running and any(game_active):
-        screen.blit(menu_background, (0, 0))
-        for i, (x_offset, y_offset) in enumerate(board_positions):
-            if game_active[i] or game_messages[i]:
-                draw_board(x_offset, y_offset, i, games[i], game_messages[i])
-                draw_pieces(games[i], x_offset, y_offset)
+        dirty_rects = []
+        for i in range(num_games):
+            if view.changed(i, games[i], game_messages[i]):
+                dirty_rects += draw_board(view, i, games[i], game_messages[i])
 
         mouse_pos = pygame.mouse.get_pos()
-        btn_back = draw_console(games, bot_stats_list, stockfish_stats_list, mouse_pos, bot_colors)
+        btn_back = draw_console(games, bot_stats_list, stockfish_stats_list, mouse_pos, bot_colors, game_messages)
+        dirty_rects.append(CONSOLE_RECT)
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -336,11 +357,11 @@ def bot_vs_stockfish():
         if not running:
             break
 
-        for i in range(4):
+        for i in range(num_games):
             if not game_active[i]:
                 continue
 
-            if games[i].board.is_game_over():
+            if games[i].outcome():
                 outcome, winner, message = handle_move_outcome(games[i], bot_color=bot_colors[i])
                 game_messages[i] = message
                 if outcome == "checkmate":
@@ -350,6 +371,8 @@ def bot_vs_stockfish():
                         losses += 1
                 elif outcome in ["stalemate", "draw"]:
                     draws += 1
+                if broadcaster:
+                    broadcaster.end_game(i, games[i].outcome().result(), message)
                 game_active[i] = False
                 continue
 
@@ -367,11 +390,13 @@ def bot_vs_stockfish():
                     promotion = {'Q': chess.QUEEN, 'R': chess.ROOK, 'B': chess.BISHOP, 'N': chess.KNIGHT}.get(promotion_piece)
                 move_result = games[i].move(from_square, to_square, promotion=promotion)
                 if move_result["valid"]:
+                    if broadcaster:
+                        broadcaster.move(i, games[i].move_history[-1])
                     target_piece = games[i].get_piece(to_square)
                     outcome, winner, message = handle_move_outcome(games[i], target_piece, bot_color=bot_colors[i])
                     game_messages[i] = message
 
-        pygame.display.flip()
+        pygame.display.update(dirty_rects)
         pygame.time.wait(100)
 
     pgn_file = export_pgn(games, bot_colors)
@@ -394,6 +419,9 @@ def main_menu():
         if btn_quit.collidepoint(mouse_x, mouse_y):
             draw_text("Exit", WIDTH // 2, 320, color=(0, 128, 0))
         pygame.display.flip()
+        if not startup.reported:
+            startup.mark("first frame")
+            startup.report()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
@@ -404,5 +432,26 @@ def main_menu():
                     pygame.quit()
                     sys.exit()
 
+def main():
+    global NUM_GAMES, broadcaster
+    import argparse
+    parser = argparse.ArgumentParser(description="Bot vs Stockfish")
+    parser.add_argument("--games", type=int, default=NUM_GAMES, help="number of games played side by side")
+    parser.add_argument("--broadcast", metavar="[HOST:]PORT", help="broadcast the games to viewers over a socket")
+    args = parser.parse_args()
+    NUM_GAMES = args.games
+
+    configure_logging()
+    if args.broadcast:
+        broadcaster = Broadcaster(*parse_address(args.broadcast))
+        if not broadcaster.start():
+            broadcaster = None
+    init_display()
+    # Spawn the engines while the menu is shown
+    engine_loader.prefetch(NUM_GAMES)
+    if os.path.isfile(STOCKFISH_PATH):
+        stockfish_loader.prefetch(NUM_GAMES)
+    main_menu()
+
 if __name__ == "__main__":
-    main_menu()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,221 @@
+"""Live spectator feed for engine matches.
+
+The match scripts call ``Broadcaster.move`` and friends from their game loop.
+Those calls only hand the event to a background asyncio thread, so the
+games never wait on the network. Viewers connect over TCP and receive one
+JSON object per line:
+
+    {"type": "key", "game": 0, "ply": 24, "fen": "...", "last": "g1f3", "white": "Bot1", "black": "Bot2"}
+    {"type": "move", "game": 0, "ply": 25, "move": "e7e5"}
+    {"type": "end", "game": 0, "result": "1-0", "message": "Bot1 Wins!"}
+
+A viewer gets a keyframe for every game when it joins, and again every
+KEYFRAME_PLIES plies, so moves are sent as deltas the rest of the time.
+Each message is encoded once and shared by every viewer. Every viewer has
+its own buffer. When a slow viewer's buffer fills, its pending deltas are
+dropped and replaced with fresh keyframes, so it skips ahead instead of
+holding up the others.
+
+    python broadcast.py watch 127.0.0.1:8766   # print a running feed
+"""
+import argparse
+import asyncio
+import json
+import logging
+import threading
+
+import chess
+
+HOST = "127.0.0.1"
+PORT = 8766
+KEYFRAME_PLIES = 20
+CLIENT_BUFFER = 256  # Messages queued per viewer before it is resynced with keyframes
+MAX_VIEWERS = 1000
+
+logger = logging.getLogger(__name__)
+
+
+def _line(message):
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+def parse_address(text, default_host=HOST):
+    """(host, port) from "PORT" or "HOST:PORT"."""
+    host, _, port = text.rpartition(":")
+    return host or default_host, int(port)
+
+
+class _Viewer:
+    def __init__(self, writer):
+        self.writer = writer
+        self.buffer = []
+        self.wakeup = asyncio.Event()
+        self.dropped = 0
+
+
+class _GameState:
+    def __init__(self, board, white, black):
+        self.board = board
+        self.white = white
+        self.black = black
+        self.result = None
+        self.message = ""
+
+    def keyframe(self, game):
+        last = self.board.move_stack[-1].uci() if self.board.move_stack else None
+        message = {"type": "key", "game": game, "ply": self.board.ply(), "fen": self.board.fen(), "last": last,
+                   "white": self.white, "black": self.black}
+        if self.result is not None:
+            message.update(result=self.result, message=self.message)
+        return _line(message)
+
+
+class Broadcaster:
+    def __init__(self, host=HOST, port=PORT, keyframe_plies=KEYFRAME_PLIES, client_buffer=CLIENT_BUFFER):
+        self.host = host
+        self.port = port
+        self.keyframe_plies = keyframe_plies
+        self.client_buffer = client_buffer
+        self.games = {}
+        self.viewers = set()
+        self._loop = None
+        self._server = None
+        self._ready = threading.Event()
+
+    def start(self):
+        """Start serving in a daemon thread; returns False if the port could not be opened."""
+        threading.Thread(target=self._thread, name="broadcast", daemon=True).start()
+        self._ready.wait()
+        return self._server is not None
+
+    def _thread(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._server = self._loop.run_until_complete(
+                asyncio.start_server(self._serve_viewer, self.host, self.port, backlog=MAX_VIEWERS))
+            self.port = self._server.sockets[0].getsockname()[1]
+            logger.info(f"Broadcasting on {self.host}:{self.port}")
+        except OSError as e:
+            logger.error(f"Could not start broadcast on {self.host}:{self.port}: {e}")
+            self._server = None
+            return
+        finally:
+            self._ready.set()
+        self._loop.run_forever()
+
+    def _call(self, callback, *args):
+        # Thread-safe and non-blocking; a no-op when the server is not running
+        if self._server is not None:
+            self._loop.call_soon_threadsafe(callback, *args)
+
+    # --- Called from the game loop ---
+
+    def start_game(self, game, board, white="White", black="Black"):
+        self._call(self._on_start, game, board.copy(), white, black)
+
+    def move(self, game, move):
+        self._call(self._on_move, game, move)
+
+    def end_game(self, game, result, message=""):
+        self._call(self._on_end, game, result, message)
+
+    def close(self):
+        if self._server is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._server = None
+
+    # --- Broadcast thread ---
+
+    def _on_start(self, game, board, white, black):
+        self.games[game] = _GameState(board, white, black)
+        self._publish(self.games[game].keyframe(game))
+
+    def _on_move(self, game, move):
+        state = self.games.get(game)
+        if state is None:
+            state = self.games[game] = _GameState(chess.Board(), "White", "Black")
+        state.board.push(move)
+        ply = state.board.ply()
+        if ply % self.keyframe_plies == 0:
+            self._publish(state.keyframe(game))
+        else:
+            self._publish(_line({"type": "move", "game": game, "ply": ply, "move": move.uci()}))
+
+    def _on_end(self, game, result, message):
+        state = self.games.get(game)
+        if state is not None:
+            state.result = result
+            state.message = message
+        self._publish(_line({"type": "end", "game": game, "result": result, "message": message}))
+
+    def _keyframes(self):
+        return [state.keyframe(game) for game, state in sorted(self.games.items())]
+
+    def _publish(self, data):
+        for viewer in self.viewers:
+            if len(viewer.buffer) >= self.client_buffer:
+                # Too far behind: replace the backlog with the current positions
+                viewer.dropped += len(viewer.buffer)
+                viewer.buffer = self._keyframes()
+            else:
+                viewer.buffer.append(data)
+            viewer.wakeup.set()
+
+    async def _serve_viewer(self, reader, writer):
+        if len(self.viewers) >= MAX_VIEWERS:
+            writer.close()
+            return
+        viewer = _Viewer(writer)
+        viewer.buffer = self._keyframes()
+        self.viewers.add(viewer)
+        try:
+            while True:
+                if not viewer.buffer:
+                    viewer.wakeup.clear()
+                    await viewer.wakeup.wait()
+                batch, viewer.buffer = viewer.buffer, []
+                writer.write(b"".join(batch))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.viewers.discard(viewer)
+            if viewer.dropped:
+                logger.info(f"Viewer left after skipping {viewer.dropped} messages")
+            writer.close()
+
+
+async def watch(host, port):
+    """Print a feed as SAN moves, rebuilding each game's board from the keyframes."""
+    reader, _ = await asyncio.open_connection(host, port)
+    boards = {}
+    while line := await reader.readline():
+        message = json.loads(line)
+        game = message["game"]
+        if message["type"] == "key":
+            boards[game] = chess.Board(message["fen"])
+            print(f"Game {game + 1} ({message['white']} - {message['black']}), ply {message['ply']}: {message['fen']}")
+        elif message["type"] == "move" and game in boards:
+            board = boards[game]
+            if board.ply() + 1 != message["ply"]:
+                continue  # Gap: wait for the next keyframe
+            move = chess.Move.from_uci(message["move"])
+            print(f"Game {game + 1}, ply {message['ply']}: {board.san(move)}")
+            board.push(move)
+        elif message["type"] == "end":
+            print(f"Game {game + 1} over: {message['result']} {message['message']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch a broadcast engine match")
+    parser.add_argument("command", choices=["watch"])
+    parser.add_argument("address", nargs="?", default=f"{HOST}:{PORT}", help="[HOST:]PORT")
+    args = parser.parse_args()
+    try:
+        asyncio.run(watch(*parse_address(args.address)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
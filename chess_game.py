@@ -1,14 +1,68 @@
 import chess
 
+from eval_timeline import EvalTimeline
+from outcome import OutcomeTracker
+
+# Cờ cho từng ô đích trong chỉ mục nước đi hợp lệ
+MOVE_PROMOTION = 1
+MOVE_CAPTURE = 2
+PROMOTION_PIECES = (chess.QUEEN, chess.ROOK, chess.BISHOP, chess.KNIGHT)
+# Cứ mỗi KEYFRAME_INTERVAL ply lưu một bản sao bàn cờ để goto() không phải đi lại cả ván
+KEYFRAME_INTERVAL = 32
+
 class ChessGame:
     def __init__(self):
         self.board = chess.Board()
-        self.move_history = []
+        self.move_history = []  # Các nước từ đầu ván đến con trỏ hiện tại
+        self.redo_stack = []  # Các nước đã undo, nước undo gần nhất ở cuối
         self.selected_square = None
+        self._keyframes = {0: self.board.copy()}  # ply -> bản sao bàn cờ (kèm move stack) tại ply đó
+        self.outcome_tracker = OutcomeTracker(self.board)
+        self.evals = EvalTimeline()  # Điểm engine cho từng ply của nhánh hiện tại
+        self._move_index = None  # Xóa bởi invalidate_moves() mỗi khi thế cờ đổi
+        self._move_count = 0
 
     def get_piece(self, square):
         return self.board.piece_at(square)
 
+    def legal_move_index(self):
+        """Chỉ mục {ô nguồn: {ô đích: cờ}} của thế cờ hiện tại, chỉ sinh nước đi một lần mỗi ply."""
+        if self._move_index is None:
+            index = {}
+            count = 0
+            for move in self.board.legal_moves:
+                flags = 0
+                if move.promotion:
+                    flags |= MOVE_PROMOTION
+                if self.board.is_capture(move):
+                    flags |= MOVE_CAPTURE
+                targets = index.setdefault(move.from_square, {})
+                targets[move.to_square] = targets.get(move.to_square, 0) | flags
+                count += 1
+            self._move_index = index
+            self._move_count = count
+        return self._move_index
+
+    def invalidate_moves(self):
+        """Bỏ chỉ mục nước đi; các hàm push/pop/goto/reset tự gọi, ai sửa self.board trực tiếp phải gọi."""
+        self._move_index = None
+
+    def legal_targets(self, from_square):
+        """{ô đích: cờ} của quân tại from_square (rỗng nếu không có nước đi)."""
+        return self.legal_move_index().get(from_square, {})
+
+    def legal_move_count(self):
+        self.legal_move_index()
+        return self._move_count
+
+    def is_legal(self, move):
+        flags = self.legal_targets(move.from_square).get(move.to_square)
+        if flags is None:
+            return False
+        if flags & MOVE_PROMOTION:
+            return move.promotion in PROMOTION_PIECES
+        return move.promotion is None
+
     def move(self, from_square, to_square, promotion=None):
         print(f"Gọi hàm move: từ {chess.square_name(from_square)} đến {chess.square_name(to_square)}, promotion={promotion}")
 
@@ -38,13 +92,20 @@ class ChessGame:
         # Tạo nước đi với thông tin phong quân (nếu có)
         move = chess.Move(from_square, to_square, promotion=promotion)
 
-        # Kiểm tra tính hợp lệ của nước đi
-        legal_moves = list(self.board.legal_moves)
+        # Kiểm tra tính hợp lệ của nước đi bằng chỉ mục đã tính cho thế cờ này
         print(f"Trạng thái bàn cờ trước khi kiểm tra nước đi: {self.board.fen()}")
         print(f"Thử nước đi: {move.uci()}")
-        if move in legal_moves:
-            self.board.push(move)
-            self.move_history.append(move)
+        if self.is_legal(move):
+            if self.redo_stack and self.redo_stack[-1] == move:
+                # Đi lại đúng nước đã undo: giữ nguyên nhánh để còn redo tiếp
+                self.redo_stack.pop()
+            elif self.redo_stack:
+                # Rẽ nhánh mới: bỏ các nước redo, keyframe và điểm đánh giá của nhánh cũ
+                self.redo_stack.clear()
+                ply = len(self.move_history)
+                self._keyframes = {k: v for k, v in self._keyframes.items() if k <= ply}
+                self.evals.truncate(ply)
+            self._push(move)
             print(f"Đã thêm nước đi vào lịch sử: {move.uci()}")
             print(f"Lịch sử nước đi hiện tại: {[m.uci() for m in self.move_history]}")
             print(f"Trạng thái bàn cờ FEN: {self.board.fen()}")
@@ -53,19 +114,122 @@ class ChessGame:
             print(f"Nước đi không hợp lệ: {move.uci()}")
             # Nếu là nước đi phong quân, kiểm tra tất cả các khả năng phong quân
             if is_promotion:
-                promotion_pieces = [chess.QUEEN, chess.ROOK, chess.BISHOP, chess.KNIGHT]
-                for promo in promotion_pieces:
+                for promo in PROMOTION_PIECES:
                     promo_move = chess.Move(from_square, to_square, promotion=promo)
-                    if promo_move in legal_moves:
+                    if self.is_legal(promo_move):
                         print(f"Nước đi hợp lệ với phong quân {promo}: {promo_move.uci()}")
-            print(f"Danh sách nước đi hợp lệ: {[m.uci() for m in legal_moves]}")
+            print(f"Danh sách nước đi hợp lệ: {[m.uci() for m in self.board.legal_moves]}")
             return {"valid": False, "promotion_required": False}
 
+    def _push(self, move):
+        self.outcome_tracker.push(self.board, move)
+        self.invalidate_moves()
+        self.move_history.append(move)
+        ply = len(self.move_history)
+        if ply % KEYFRAME_INTERVAL == 0 and ply not in self._keyframes:
+            self._keyframes[ply] = self.board.copy()
+
+    def _pop(self):
+        move = self.outcome_tracker.pop(self.board)
+        self.invalidate_moves()
+        self.move_history.pop()
+        self.redo_stack.append(move)
+        return move
+
+    @property
+    def ply(self):
+        return len(self.move_history)
+
+    @property
+    def last_ply(self):
+        """Số ply của cả nhánh hiện tại, tính cả các nước có thể redo."""
+        return len(self.move_history) + len(self.redo_stack)
+
+    def can_undo(self):
+        return bool(self.move_history)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def redo(self):
+        if not self.redo_stack:
+            return None
+        move = self.redo_stack.pop()
+        self._push(move)
+        return move
+
+    def goto(self, ply):
+        """Đưa bàn cờ tới ply bất kỳ của nhánh hiện tại.
+
+        Đi từng nước từ vị trí hiện tại, hoặc từ keyframe gần nhất nếu gần hơn,
+        nên mỗi lần nhảy chỉ phải đi lại tối đa KEYFRAME_INTERVAL nước.
+        """
+        ply = max(0, min(ply, self.last_ply))
+        current = len(self.move_history)
+        keyframe_ply = ply - ply % KEYFRAME_INTERVAL
+        keyframe = self._keyframes.get(keyframe_ply)
+        if keyframe is not None and abs(ply - current) > ply - keyframe_ply + 1:
+            line = self.move_history + self.redo_stack[::-1]
+            if keyframe_ply < current:
+                self.outcome_tracker.truncate(keyframe_ply)
+            else:
+                # Keyframe ở phía trước: luật lặp lại vẫn cần khóa của các thế cờ bị nhảy qua
+                for move in line[current:keyframe_ply]:
+                    self.outcome_tracker.push(self.board, move)
+            self.board = keyframe.copy()
+            self.move_history = line[:keyframe_ply]
+            self.redo_stack = line[keyframe_ply:][::-1]
+            self.invalidate_moves()
+            current = keyframe_ply
+        while current > ply:
+            self._pop()
+            current -= 1
+        while current < ply:
+            self.redo()
+            current += 1
+
+    def board_at(self, ply):
+        """Bản sao bàn cờ tại ply bất kỳ của nhánh hiện tại, không di chuyển con trỏ."""
+        ply = max(0, min(ply, self.last_ply))
+        if ply == len(self.move_history):
+            return self.board.copy()
+        keyframe_ply = max(k for k in self._keyframes if k <= ply)
+        board = self._keyframes[keyframe_ply].copy()
+        line = self.move_history + self.redo_stack[::-1]
+        for move in line[keyframe_ply:ply]:
+            board.push(move)
+        return board
+
+    def record_eval(self, score, depth, ply=None):
+        """Lưu điểm engine (PovScore) cho ply, mặc định là thế cờ hiện tại; bỏ qua nếu đã có điểm sâu hơn."""
+        if score is None:
+            return False
+        return self.evals.set(len(self.move_history) if ply is None else ply, score, depth)
+
+    def reset(self):
+        self.board.reset()
+        self.move_history.clear()
+        self.redo_stack.clear()
+        self._keyframes = {0: self.board.copy()}
+        self.outcome_tracker.reset(self.board)
+        self.evals.clear()
+        self.selected_square = None
+        self.invalidate_moves()
+
+    def outcome(self):
+        """Kết quả ván đấu (chess.Outcome) hoặc None nếu ván chưa kết thúc, O(1) mỗi nước."""
+        if not self.outcome_tracker.in_sync(self.board):
+            # Bàn cờ bị sửa trực tiếp: tính lại các khóa Zobrist một lần
+            moves = self.board.move_stack[:]
+            root = self.board.root()
+            self.outcome_tracker.reset(root)
+            for move in moves:
+                self.outcome_tracker.push(root, move)
+        return self.outcome_tracker.outcome(self.board, self.legal_move_count())
+
     def undo(self):
         if self.board.move_stack:
-            move = self.board.pop()
-            if move in self.move_history:
-                self.move_history.remove(move)
+            move = self._pop()
             print(f"Đã xóa nước đi khỏi lịch sử: {move.uci()}")
             print(f"Lịch sử nước đi sau khi undo: {[m.uci() for m in self.move_history]}")
             print(f"Trạng thái bàn cờ FEN sau undo: {self.board.fen()}")
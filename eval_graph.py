@@ -0,0 +1,66 @@
+import pygame
+
+from eval_timeline import winning_chances
+
+BACKGROUND = (20, 20, 20)
+WHITE_AREA = (225, 225, 225)
+MIDLINE = (90, 90, 90)
+CURSOR = (255, 215, 0)
+
+
+class EvalGraph:
+    """Compact chart of a game's EvalTimeline for the console.
+
+    The chart is drawn to its own surface and only redrawn when the timeline,
+    the current ply, the line length or the size changes; other frames are a
+    single blit. Plies without a score are bridged by the line between their
+    neighbours. ``ply_at`` maps a click back to the ply under it.
+    """
+
+    def __init__(self):
+        self.rect = None
+        self._surface = None
+        self._key = None
+        self._last_ply = 0
+
+    def draw(self, surface, rect, timeline, ply, last_ply):
+        key = (rect.size, timeline.version, timeline.generation, ply, last_ply)
+        if key != self._key:
+            self._key = key
+            self._render(rect.size, timeline, ply, last_ply)
+        surface.blit(self._surface, rect)
+        self.rect = rect
+        self._last_ply = last_ply
+
+    def _x(self, ply, width, last_ply):
+        return round(ply * (width - 1) / max(last_ply, 1))
+
+    def _render(self, size, timeline, ply, last_ply):
+        width, height = size
+        if self._surface is None or self._surface.get_size() != size:
+            self._surface = pygame.Surface(size)
+        self._surface.fill(BACKGROUND)
+        # White's expected score, filled up from the bottom edge like the eval bar
+        points = []
+        for i in range(min(last_ply, len(timeline) - 1) + 1):
+            entry = timeline.get(i)
+            if entry is not None:
+                y = round((1 - winning_chances(entry[0])) / 2 * (height - 1))
+                points.append((self._x(i, width, last_ply), y))
+        if len(points) == 1:
+            points.append((points[0][0] + 1, points[0][1]))
+        if points:
+            bottom = height - 1
+            pygame.draw.polygon(self._surface, WHITE_AREA,
+                                [(points[0][0], bottom)] + points + [(points[-1][0], bottom)])
+        pygame.draw.line(self._surface, MIDLINE, (0, height // 2), (width - 1, height // 2))
+        pygame.draw.rect(self._surface, (120, 120, 120), self._surface.get_rect(), 1)
+        x = self._x(ply, width, last_ply)
+        pygame.draw.line(self._surface, CURSOR, (x, 0), (x, height - 1))
+
+    def ply_at(self, pos):
+        """Ply under the screen position ``pos``, or None if it is outside the chart."""
+        if self.rect is None or not self.rect.collidepoint(pos):
+            return None
+        ply = round((pos[0] - self.rect.x) * max(self._last_ply, 1) / (self.rect.width - 1))
+        return min(ply, self._last_ply)
@@ -0,0 +1,129 @@
+import math
+from array import array
+
+import chess.engine
+
+# One signed 16-bit score per ply, from white's point of view. Centipawns are
+# clamped to +-CP_LIMIT; a mate in n is stored as +-(MATE_BASE - n).
+UNKNOWN = -0x8000
+CP_LIMIT = 20000
+MATE_BASE = 30000
+
+
+def encode_score(score):
+    """chess.engine.Score (white's point of view) -> int16."""
+    mate = score.mate()
+    if mate is not None:
+        if mate > 0 or (mate == 0 and score > chess.engine.Cp(0)):
+            return MATE_BASE - min(mate, MATE_BASE - CP_LIMIT - 1)
+        return -(MATE_BASE - min(-mate, MATE_BASE - CP_LIMIT - 1))
+    return max(-CP_LIMIT, min(CP_LIMIT, score.score()))
+
+
+def decode_score(value):
+    if value == MATE_BASE:
+        return chess.engine.MateGiven
+    if value > CP_LIMIT:
+        return chess.engine.Mate(MATE_BASE - value)
+    if value < -CP_LIMIT:
+        return chess.engine.Mate(-(MATE_BASE + value))
+    return chess.engine.Cp(value)
+
+
+# Drop in winning chances (-1..1) of the mover, the same scale lichess uses
+INACCURACY = 0.1
+MISTAKE = 0.2
+BLUNDER = 0.3
+MATE_SCORE = 10000
+
+
+def winning_chances(score):
+    """Relative score -> expected result for the side to move, from -1 to 1."""
+    cp = score.score(mate_score=MATE_SCORE)
+    return 2 / (1 + math.exp(-0.00368208 * cp)) - 1
+
+
+def terminal_score(board):
+    """Score of a finished position without asking an engine, or None."""
+    if board.is_checkmate():
+        return chess.engine.Mate(0)
+    if board.is_stalemate() or board.is_insufficient_material():
+        return chess.engine.Cp(0)
+    return None
+
+
+class EvalTimeline:
+    """Engine evaluation of every position on a game's line, indexed by ply.
+
+    Three bytes per ply (an int16 score and the uint8 depth it came from), so
+    a 300-ply game costs under a kilobyte. A score is only replaced by one
+    from a deeper search. ``version`` changes with every write, for caches
+    drawn from the timeline; ``generation`` changes only when scores are
+    thrown away, so results of searches started before that can be dropped.
+    """
+
+    def __init__(self):
+        self.scores = array("h")
+        self.depths = array("B")
+        self.version = 0
+        self.generation = 0
+
+    def __len__(self):
+        return len(self.scores)
+
+    def set(self, ply, score, depth):
+        """Store ``score`` (chess.engine.PovScore or white-POV Score) for ``ply`` if it is new or deeper."""
+        if isinstance(score, chess.engine.PovScore):
+            score = score.white()
+        depth = max(0, min(255, depth or 0))
+        if ply >= len(self.scores):
+            missing = ply + 1 - len(self.scores)
+            self.scores.extend([UNKNOWN] * missing)
+            self.depths.extend(bytes(missing))
+        elif self.scores[ply] != UNKNOWN and self.depths[ply] > depth:
+            return False
+        value = encode_score(score)
+        if self.scores[ply] == value and self.depths[ply] == depth:
+            return False
+        self.scores[ply] = value
+        self.depths[ply] = depth
+        self.version += 1
+        return True
+
+    def get(self, ply):
+        """(white-POV chess.engine.Score, depth) or None if ``ply`` was never evaluated."""
+        if ply >= len(self.scores) or self.scores[ply] == UNKNOWN:
+            return None
+        return decode_score(self.scores[ply]), self.depths[ply]
+
+    def missing(self, last_ply, skip=None):
+        """First ply up to ``last_ply`` without a score, other than ``skip``, or None."""
+        start = 0
+        while start <= last_ply:
+            if start >= len(self.scores):
+                ply = start
+            else:
+                try:
+                    ply = self.scores.index(UNKNOWN, start, last_ply + 1)
+                except ValueError:
+                    ply = len(self.scores)
+                    if ply > last_ply:
+                        return None
+            if ply != skip:
+                return ply
+            start = ply + 1
+        return None
+
+    def truncate(self, ply):
+        """Forget the scores after ``ply``, e.g. when a different move is played there."""
+        if ply + 1 < len(self.scores):
+            del self.scores[ply + 1:]
+            del self.depths[ply + 1:]
+            self.version += 1
+            self.generation += 1
+
+    def clear(self):
+        del self.scores[:]
+        del self.depths[:]
+        self.version += 1
+        self.generation += 1
@@ -1,6 +1,16 @@
 import pygame
 import chess
-from chess_game import ChessGame
+import chess.engine
+from chess_game import ChessGame, MOVE_PROMOTION
+from board_renderer import BoardRenderer
+from animation import MoveAnimator
+from analysis import AnalysisService
+from eval_timeline import terminal_score
+from eval_graph import EvalGraph
+from profiler import FrameProfiler
+from text_cache import TextCache, MoveHistoryPanel
+import assets
+from bootstrap import StartupTimer, EngineLoader, configure_logging
 import sys
 import os
 import threading
@@ -11,53 +21,16 @@ import time
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from Engine.engine import Engine
 
-# Handle resource paths for bundled executable
-if getattr(sys, 'frozen', False):
-    bundle_dir = sys._MEIPASS
-else:
-    bundle_dir = os.path.dirname(os.path.abspath(__file__))
-
-music_path = os.path.join(bundle_dir, "Music")
-image_path = os.path.join(bundle_dir, "Image")
-font_path = os.path.join(bundle_dir, "Font")
-
-# Window dimensions
-WIDTH, HEIGHT = 840, 640  # Adjusted height to fit the board exactly (640x640)
-BOARD_WIDTH = 640
-CONSOLE_WIDTH = 200
-SQUARE_SIZE = BOARD_WIDTH // 8
-
-pygame.init()
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Chess Game")
-pygame.mixer.init()
-
-# Load music and sounds
-pygame.mixer.music.load(os.path.join(music_path, "chessmusic.mp3"))
-pygame.mixer.music.play(-1)
-music_on = True
-move_sound = pygame.mixer.Sound(os.path.join(music_path, "Move.mp3"))
-capture_sound = pygame.mixer.Sound(os.path.join(music_path, "Capture.mp3"))
-check_sound = pygame.mixer.Sound(os.path.join(music_path, "Check.mp3"))
-checkmate_sound = pygame.mixer.Sound(os.path.join(music_path, "Checkmate.mp3"))
+# Window dimensions; the window is resizable and apply_layout() derives everything else from its size
+DEFAULT_SIZE = (840, 640)
+MIN_SIZE = (520, 400)
+MIN_CONSOLE_WIDTH = 200
+WIDTH, HEIGHT = DEFAULT_SIZE
+BOARD_WIDTH = CONSOLE_WIDTH = SQUARE_SIZE = 0
+BOARD_RECT = CONSOLE_RECT = None
 
 # Board and piece setup
 board_colors = [(255, 255, 255), (0, 100, 0)]  # Light squares (white), dark squares (dark green)
-images = {}
-pieces = ["P", "N", "B", "R", "Q", "K"]
-for color in ["w", "b"]:
-    for p in pieces:
-        name = color + p
-        images[name] = pygame.transform.scale(
-            pygame.image.load(os.path.join(image_path, f"{name}.png")), (SQUARE_SIZE, SQUARE_SIZE)
-        )
-
-# Fonts
-FONT = pygame.font.Font(os.path.join(font_path, "turok.ttf"), 40)
-VICTORY_FONT = pygame.font.Font(os.path.join(font_path, "turok.ttf"), 120)  # 3 times larger for victory message
-TITLE_FONT = pygame.font.Font(os.path.join(font_path, "turok.ttf"), 48)  # Larger font for "Chess Game"
-CONSOLE_FONT = pygame.font.SysFont('arial', 16)  # Reduced font size to avoid text clipping
-BOARD_LABEL_FONT = pygame.font.SysFont('arial', 14)  # Reduced font size for board labels
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 MENU_COLOR = (100, 100, 100)
@@ -65,16 +38,155 @@ HOVER_COLOR = (0, 128, 0)  # Dark green for hover
 CONSOLE_BG = (50, 50, 50)
 LABEL_COLOR = (0, 0, 0)  # Black for board labels
 BORDER_COLOR = (255, 255, 255)  # White border for promotion buttons
+PROFILE_MESSAGE_SECONDS = 6  # How long the console shows where an F4 export went
 
-# Color for highlighting suggested moves (same for both from and to squares)
-HIGHLIGHT_COLOR = (100, 149, 237, 128)  # Cornflower Blue with alpha
+# Display state, set up by init_display() so the module can be imported headless
+screen = None
+FONT = VICTORY_FONT = TITLE_FONT = CONSOLE_FONT = BOARD_LABEL_FONT = None
+menu_background = None
+board_renderer = None
+move_animator = None
+history_panel = None
+layout_changed = False
+text_cache = TextCache()
+eval_graph = EvalGraph()
+profiler = FrameProfiler()  # F3 overlay, F4 export
+profile_message = None  # (lines, shown until) after an F4 export
+sounds = assets.SoundBank()  # Sound effects are decoded the first time they play
+engine_loader = EngineLoader(Engine)
+startup = StartupTimer("game")
 
-# Load background
-menu_background = pygame.image.load(os.path.join(image_path, "landscape3.jpg"))
-menu_background = pygame.transform.scale(menu_background, (WIDTH, HEIGHT))
+def init_display():
+    """Open the window and load only what the first menu frame needs."""
+    global FONT, VICTORY_FONT, TITLE_FONT, CONSOLE_FONT, BOARD_LABEL_FONT, history_panel
+    pygame.display.init()
+    pygame.display.set_caption("Chess Game")
 
-def draw_text(text, x, y, font=FONT, center=True, color=BLACK, outline_color=None):
-    label = font.render(text, True, color)
+    # Fonts
+    FONT = assets.load_font("turok.ttf", 40)
+    VICTORY_FONT = assets.load_font("turok.ttf", 120)  # 3 times larger for victory message
+    TITLE_FONT = assets.load_font("turok.ttf", 48)  # Larger font for "Chess Game"
+    CONSOLE_FONT = assets.load_font("arial", 16)  # Reduced font size to avoid text clipping
+    BOARD_LABEL_FONT = assets.load_font("arial", 14)  # Reduced font size for board labels
+
+    history_panel = MoveHistoryPanel(text_cache, CONSOLE_FONT, WHITE)
+
+    # Start at the default size, shrunk to fit small or high-DPI desktops
+    desktop_width, desktop_height = pygame.display.get_desktop_sizes()[0]
+    scale = min(1.0, (desktop_width - 40) / DEFAULT_SIZE[0], (desktop_height - 80) / DEFAULT_SIZE[1])
+    apply_layout((int(DEFAULT_SIZE[0] * scale), int(DEFAULT_SIZE[1] * scale)))
+    startup.mark("display ready")
+
+def apply_layout(size):
+    """(Re)size the window and derive the board and console geometry from it.
+
+    Only called at startup and on VIDEORESIZE. Piece sprites come from the
+    per-square-size atlas cache, so a resize never rescales images per frame.
+    """
+    global screen, WIDTH, HEIGHT, BOARD_WIDTH, CONSOLE_WIDTH, SQUARE_SIZE, BOARD_RECT, CONSOLE_RECT
+    global menu_background, board_renderer, move_animator, layout_changed
+    WIDTH, HEIGHT = max(size[0], MIN_SIZE[0]), max(size[1], MIN_SIZE[1])
+    screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
+
+    # The board is the largest multiple of 8 that fits beside a console of at least MIN_CONSOLE_WIDTH
+    SQUARE_SIZE = min(HEIGHT, WIDTH - MIN_CONSOLE_WIDTH) // 8
+    BOARD_WIDTH = SQUARE_SIZE * 8
+    CONSOLE_WIDTH = WIDTH - BOARD_WIDTH
+    BOARD_RECT = pygame.Rect(0, (HEIGHT - BOARD_WIDTH) // 2, BOARD_WIDTH, BOARD_WIDTH)
+    CONSOLE_RECT = pygame.Rect(BOARD_WIDTH, 0, CONSOLE_WIDTH, HEIGHT)
+
+    # Piece sprites load on first draw
+    board_renderer = BoardRenderer(SQUARE_SIZE, assets.piece_images(SQUARE_SIZE), BOARD_LABEL_FONT, board_colors, LABEL_COLOR)
+    move_animator = MoveAnimator(board_renderer)
+    menu_background = pygame.transform.smoothscale(assets.load_image("landscape3.jpg"), (WIDTH, HEIGHT))
+    screen.fill(CONSOLE_BG)  # Letterbox around the board
+    layout_changed = True
+
+def handle_resize(event):
+    """Apply a VIDEORESIZE event; returns True if ``event`` was one."""
+    if event.type != pygame.VIDEORESIZE:
+        return False
+    if event.size != (WIDTH, HEIGHT):
+        apply_layout(event.size)
+    return True
+
+def handle_profiler_key(event):
+    """F3 toggles the profiler overlay, F4 exports what it recorded; returns True if ``event`` was one of them."""
+    global profile_message
+    if event.type != pygame.KEYDOWN or event.key not in (pygame.K_F3, pygame.K_F4):
+        return False
+    if event.key == pygame.K_F3:
+        if not profiler.toggle():
+            board_renderer.invalidate()  # Repaint the squares the overlay covered
+    elif profiler.frames:
+        try:
+            path = profiler.export(assets.data_path(time.strftime("profile_%Y%m%d_%H%M%S.json")))
+        except OSError as e:
+            print(f"Profile export failed: {e}")
+            lines = ["Profile export failed:", str(e)]
+        else:
+            print(f"Profile saved to {path}")
+            folder, name = os.path.split(path)
+            home = os.path.expanduser("~")
+            if folder.startswith(home):
+                folder = "~" + folder[len(home):]
+            lines = ["Profile saved to", folder + os.sep, name]
+        profile_message = ([fit_console_line(line) for line in lines], time.monotonic() + PROFILE_MESSAGE_SECONDS)
+    return True
+
+def fit_console_line(line):
+    """``line`` cut from the left to fit the console; the end of a path has the file name."""
+    while CONSOLE_FONT.size(line)[0] > CONSOLE_WIDTH - 20 and len(line) > 4:
+        line = "..." + line[4:]
+    return line
+
+def draw_profile_message(bottom):
+    """Draw the last F4 export's message in the console above ``bottom``; returns the free space's new bottom."""
+    if profile_message is None or time.monotonic() > profile_message[1]:
+        return bottom
+    lines = profile_message[0]
+    top = bottom - 20 * len(lines)
+    for i, line in enumerate(lines):
+        draw_text(line, CONSOLE_RECT.x + 10, top + 20 * i, font=CONSOLE_FONT, center=False, color=(255, 215, 0))
+    return top - 5
+
+def draw_profiler(dirty_rects):
+    """Draw the profiler overlay over the board's top-left corner when it is on."""
+    if profiler.enabled:
+        dirty_rects.append(profiler.draw(screen, BOARD_RECT.topleft, BOARD_LABEL_FONT))
+        profiler.lap("overlay")
+
+def profile_analysis(game, service, name):
+    """Time from a new position to the service's first result for it, and the service's queue depth."""
+    if not profiler.enabled:
+        return
+    if service.current() is not None:
+        profiler.result(name)
+    elif not game.outcome():
+        profiler.request(name)
+    profiler.queue(name, service.queue_depth())
+
+def present(dirty_rects):
+    """Push the dirty rects to the window, or the whole frame after a resize."""
+    global layout_changed
+    if layout_changed:
+        layout_changed = False
+        pygame.display.flip()
+    else:
+        pygame.display.update(dirty_rects)
+
+def after_first_frame():
+    """Deferred startup work, run once the menu is already on screen."""
+    if startup.reported:
+        return
+    startup.mark("first frame")
+    assets.play_music()
+    startup.mark("music started")
+    startup.report()
+
+def draw_text(text, x, y, font=None, center=True, color=BLACK, outline_color=None):
+    font = font or FONT
+    label = text_cache.render(font, text, color)
     rect = label.get_rect()
     if center:
         rect.center = (x, y)
@@ -83,7 +195,7 @@ def draw_text(text, x, y, font=FONT, center=True, color=BLACK, outline_color=Non
     
     # Draw outline if specified (used for black text to ensure visibility)
     if outline_color:
-        outline = font.render(text, True, outline_color)
+        outline = text_cache.render(font, text, outline_color)
         for dx in [-2, 0, 2]:
             for dy in [-2, 0, 2]:
                 if dx != 0 or dy != 0:
@@ -93,60 +205,31 @@ def draw_text(text, x, y, font=FONT, center=True, color=BLACK, outline_color=Non
     screen.blit(label, rect)
     return rect
 
-def draw_board(flipped=False):
-    screen.blit(menu_background, (0, 0), (0, 0, BOARD_WIDTH, HEIGHT))
-    pygame.draw.rect(screen, CONSOLE_BG, (BOARD_WIDTH, 0, CONSOLE_WIDTH, HEIGHT))
-    for row in range(8):
-        for col in range(8):
-            display_row = 7 - row if flipped else row
-            display_col = 7 - col if flipped else col
-            color = board_colors[(row + col) % 2]
-            pygame.draw.rect(screen, color,
-                            (display_col * SQUARE_SIZE, display_row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
-    
-    # Draw labels on the board
-    files = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h']
-    ranks = ['8', '7', '6', '5', '4', '3', '2', '1']
-    if flipped:
-        files = files[::-1]
-        ranks = ranks[::-1]
-    
-    # Draw file labels (a-h) only on bottom rank (rank 1)
-    for col in range(8):
-        label = BOARD_LABEL_FONT.render(files[col], True, LABEL_COLOR)
-        display_col = 7 - col if flipped else col
-        screen.blit(label, (display_col * SQUARE_SIZE + 2, (7 * SQUARE_SIZE) + SQUARE_SIZE - 20))  # Adjusted to raise labels up
-    
-    # Draw rank labels (1-8) only on left file (file a)
-    for row in range(8):
-        label = BOARD_LABEL_FONT.render(ranks[row], True, LABEL_COLOR)
-        display_row = 7 - row if flipped else row
-        screen.blit(label, (2, display_row * SQUARE_SIZE + 2))  # Closer to left and top
-
-def draw_pieces(game, flipped=False):
-    for square in chess.SQUARES:
-        piece = game.get_piece(square)
-        if piece:
-            col = chess.square_file(square)
-            row = 7 - chess.square_rank(square)
-            display_col = 7 - col if flipped else col
-            display_row = 7 - row if flipped else row
-            name = ('w' if piece.color == chess.WHITE else 'b') + piece.symbol().upper()
-            screen.blit(images[name], (display_col * SQUARE_SIZE, display_row * SQUARE_SIZE))
-
-def draw_console(game, is_ai_mode=False, ai_stats=None, mouse_pos=(0, 0), ai_thinking=False):
+def draw_board(game, flipped=False, suggested_move=None):
+    """Blit the board squares that changed since the last frame and return their screen rects."""
+    hints = move_hint_squares(game, game.selected_square)
+    highlights = suggested_move_squares(suggested_move)
+    dirty = [rect.move(BOARD_RECT.topleft) for rect in board_renderer.update(game.board, flipped, hints, highlights)]
+    for rect in dirty:
+        screen.blit(board_renderer.surface, rect, rect.move(-BOARD_RECT.x, -BOARD_RECT.y))
+    # Slide the last move's piece over the board that was just drawn
+    move_animator.sync(game.board, flipped)
+    dirty += move_animator.draw(screen, BOARD_RECT.topleft)
+    return dirty
+
+def draw_console(game, is_ai_mode=False, ai_stats=None, mouse_pos=(0, 0), ai_thinking=False, analysis=None):
     # Clear the console area
-    pygame.draw.rect(screen, CONSOLE_BG, (BOARD_WIDTH, 0, CONSOLE_WIDTH, HEIGHT))
+    pygame.draw.rect(screen, CONSOLE_BG, CONSOLE_RECT)
 
     # Split the console into two panels
-    panel_height = HEIGHT // 2  # 320 pixels each with HEIGHT=640
+    panel_height = HEIGHT // 2
     
     TITLE_COLOR = (255, 215, 0)
 
     # --- Panel chess ---
     # Title
-    title = CONSOLE_FONT.render("Panel chess", True, TITLE_COLOR)
-    title_rect = title.get_rect(center=(BOARD_WIDTH + CONSOLE_WIDTH // 2, 10 + title.get_height() // 2))
+    title = text_cache.render(CONSOLE_FONT, "Panel chess", TITLE_COLOR)
+    title_rect = title.get_rect(center=(CONSOLE_RECT.centerx, 10 + title.get_height() // 2))
     screen.blit(title, title_rect)
 
     # Game state info
@@ -159,106 +242,164 @@ def draw_console(game, is_ai_mode=False, ai_stats=None, mouse_pos=(0, 0), ai_thi
     turn_color = WHITE_TURN_COLOR if turn == "WHITE" else BLACK_TURN_COLOR
 
     # Render "Turn:" and the turn value ("WHITE" or "BLACK") separately
-    turn_label = CONSOLE_FONT.render("Turn: ", True, WHITE)  # "Turn:" in default white
-    turn_value = CONSOLE_FONT.render(turn, True, turn_color)  # "WHITE" or "BLACK" with specific color
+    turn_label = text_cache.render(CONSOLE_FONT, "Turn: ", WHITE)  # "Turn:" in default white
+    turn_value = text_cache.render(CONSOLE_FONT, turn, turn_color)  # "WHITE" or "BLACK" with specific color
 
     # Calculate positions to display them side by side
-    screen.blit(turn_label, (BOARD_WIDTH + 10, y_offset))
+    screen.blit(turn_label, (CONSOLE_RECT.x + 10, y_offset))
     turn_label_width = turn_label.get_width()
-    screen.blit(turn_value, (BOARD_WIDTH + 10 + turn_label_width, y_offset))
+    screen.blit(turn_value, (CONSOLE_RECT.x + 10 + turn_label_width, y_offset))
 
     y_offset += 25
-    possible_moves = len(list(game.board.legal_moves))
-    draw_text(f"Possible moves: {possible_moves}", BOARD_WIDTH + 10, y_offset, font=CONSOLE_FONT, center=False, color=WHITE)
+    possible_moves = game.legal_move_count()
+    draw_text(f"Possible moves: {possible_moves}", CONSOLE_RECT.x + 10, y_offset, font=CONSOLE_FONT, center=False, color=WHITE)
 
     y_offset += 25
     in_check = game.board.is_check()
-    draw_text(f"In Check: {in_check}", BOARD_WIDTH + 10, y_offset, font=CONSOLE_FONT, center=False, color=WHITE)
+    draw_text(f"In Check: {in_check}", CONSOLE_RECT.x + 10, y_offset, font=CONSOLE_FONT, center=False, color=WHITE)
 
     y_offset += 25
     # Move history (White Black in columns)
-    white_label = CONSOLE_FONT.render("White", True, WHITE)
-    black_label = CONSOLE_FONT.render("Black", True, WHITE)
-    screen.blit(white_label, (BOARD_WIDTH + 10, y_offset))
+    white_label = text_cache.render(CONSOLE_FONT, "White", WHITE)
+    black_label = text_cache.render(CONSOLE_FONT, "Black", WHITE)
+    screen.blit(white_label, (CONSOLE_RECT.x + 10, y_offset))
 # "Black" aligned to the right (adjust based on console width)
     black_label_width = black_label.get_width()
-    screen.blit(black_label, (BOARD_WIDTH + CONSOLE_WIDTH - black_label_width - 10, y_offset))  # 10 pixels padding from right edge
+    screen.blit(black_label, (CONSOLE_RECT.right - black_label_width - 10, y_offset))  # 10 pixels padding from right edge
 
     y_offset += 25
-    # Get moves in UCI format directly from move_history
-    moves = [move.uci() for move in game.move_history]
-
-    paired_moves = []
-    for i in range(0, len(moves), 2):
-        white_move = moves[i]
-        black_move = moves[i + 1] if i + 1 < len(moves) else ""
-        paired_moves.append((white_move, black_move))
-    
+    # Rows are rendered once per pushed move, so long games cost the same as short ones
+    history_panel.sync(game.move_history)
     max_moves = (panel_height - y_offset - 10) // 20
-    start_index = max(0, len(paired_moves) - max_moves)
-    for white_move, black_move in paired_moves[start_index:]:
-        white_move_label = CONSOLE_FONT.render(white_move, True, WHITE)
-        black_move_label = CONSOLE_FONT.render(black_move, True, WHITE) if black_move else None
-        screen.blit(white_move_label, (BOARD_WIDTH + 10, y_offset))
-        if black_move_label:
-            black_move_width = black_move_label.get_width()
-            screen.blit(black_move_label, (BOARD_WIDTH + CONSOLE_WIDTH - black_move_width - 10, y_offset))  # Align black move to the right
-        y_offset += 20
+    y_offset = history_panel.draw(screen, CONSOLE_RECT.x + 10, y_offset, CONSOLE_WIDTH - 20, max_moves)
 
     # Display total moves at the bottom
-    total_moves = len(paired_moves)  # Will be 0 if no moves yet
-    draw_text(f"Total moves: {total_moves}", BOARD_WIDTH + 10, y_offset, font=CONSOLE_FONT, center=False, color=WHITE)
+    total_moves = len(history_panel.rows)  # Will be 0 if no moves yet
+    draw_text(f"Total moves: {total_moves}", CONSOLE_RECT.x + 10, y_offset, font=CONSOLE_FONT, center=False, color=WHITE)
 
     # --- Panel AI (only in AI mode) ---
     if is_ai_mode:
         y_offset = panel_height + 10
-        title = CONSOLE_FONT.render("Panel AI", True, TITLE_COLOR)
-        title_rect = title.get_rect(center=(BOARD_WIDTH + CONSOLE_WIDTH // 2, y_offset + title.get_height() // 2))
+        title = text_cache.render(CONSOLE_FONT, "Panel AI", TITLE_COLOR)
+        title_rect = title.get_rect(center=(CONSOLE_RECT.centerx, y_offset + title.get_height() // 2))
         screen.blit(title, title_rect)
 
         y_offset += 25
         algorithm = "MORA (Alpha Beta)"
-        draw_text(f"Algorithm: {algorithm}", BOARD_WIDTH + 10, y_offset, 
+        draw_text(f"Algorithm: {algorithm}", CONSOLE_RECT.x + 10, y_offset, 
                   font=CONSOLE_FONT, center=False, color=WHITE)
 
         y_offset += 25
         depth = ai_stats.get("depth", "-") if ai_stats else "-"
-        draw_text(f"DEPTH: {depth}", BOARD_WIDTH + 10, y_offset, 
+        draw_text(f"DEPTH: {depth}", CONSOLE_RECT.x + 10, y_offset, 
                   font=CONSOLE_FONT, center=False, color=WHITE)
 
         y_offset += 25
         max_score = ai_stats.get("score", "-") if ai_stats else "-"
-        draw_text(f"MAX SCORE: {max_score}", BOARD_WIDTH + 10, y_offset, 
+        draw_text(f"MAX SCORE: {max_score}", CONSOLE_RECT.x + 10, y_offset, 
                   font=CONSOLE_FONT, center=False, color=WHITE)
 
         y_offset += 25
         if ai_stats and "nodes" in ai_stats:
             nodes_header = "NODES".ljust(10)
             time_header = "TIME".ljust(8)
-            draw_text(f"{nodes_header}{time_header}", BOARD_WIDTH + 10, y_offset, 
+            draw_text(f"{nodes_header}{time_header}", CONSOLE_RECT.x + 10, y_offset, 
                       font=CONSOLE_FONT, center=False, color=WHITE)
             y_offset += 20
             nodes = str(ai_stats.get("nodes", 0)).ljust(10)
             time_taken = f"{ai_stats.get('time', 0.0):.4f}".ljust(8)
-            draw_text(f"{nodes}{time_taken}", BOARD_WIDTH + 10, y_offset, 
+            draw_text(f"{nodes}{time_taken}", CONSOLE_RECT.x + 10, y_offset, 
                       font=CONSOLE_FONT, center=False, color=WHITE)
 
+    # --- Panel analysis (1vs1: live engine evaluation of the position on the board) ---
+    if analysis is not None:
+        draw_analysis_panel(analysis.current(), panel_height + 10, TITLE_COLOR)
+
+    # Eval graph of the whole line below the panel, if the window leaves room for it
+    graph_top = panel_height + (155 if is_ai_mode else 145)
+    graph_bottom = draw_profile_message(HEIGHT - (125 if is_ai_mode else 70))
+    if graph_bottom - graph_top >= 30:
+        graph_rect = pygame.Rect(CONSOLE_RECT.x + 10, graph_top, CONSOLE_WIDTH - 20, graph_bottom - graph_top)
+        eval_graph.draw(screen, graph_rect, game.evals, game.ply, game.last_ply)
+    else:
+        eval_graph.rect = None
+
     # Draw "AI is thinking" above the buttons if AI is thinking, centered and with more space
     if ai_thinking:
-        draw_text("AI Thinking...", BOARD_WIDTH + 70, HEIGHT - 120, font=CONSOLE_FONT, center=False, color=WHITE)
+        draw_text("AI Thinking...", CONSOLE_RECT.x + 70, HEIGHT - 120, font=CONSOLE_FONT, center=False, color=WHITE)
 
     # Draw buttons in the console area (below Panel AI), centered in the console
     y_offset = HEIGHT - 60  # Adjusted for new height to avoid overlap
-    btn_undo = draw_button("Undo", 655, y_offset, 50, 30, (50, 50, 200), (100, 100, 255), mouse_pos)  # Reduced size
-    btn_help = draw_button("Help", 715, y_offset, 50, 30, (50, 200, 50), (100, 255, 100), mouse_pos)  # Reduced size
-    btn_back = draw_button("Back", 775, y_offset, 50, 30, (200, 50, 50), (255, 100, 100), mouse_pos)  # Reduced size
+    x = CONSOLE_RECT.centerx - 85  # Three 50 px buttons with 10 px gaps, centered in the console
+    btn_undo = draw_button("Undo", x, y_offset, 50, 30, (50, 50, 200), (100, 100, 255), mouse_pos)  # Reduced size
+    btn_help = draw_button("Help", x + 60, y_offset, 50, 30, (50, 200, 50), (100, 255, 100), mouse_pos)  # Reduced size
+    btn_back = draw_button("Back", x + 120, y_offset, 50, 30, (200, 50, 50), (255, 100, 100), mouse_pos)  # Reduced size
 
     return btn_undo, btn_help, btn_back
 
+def draw_analysis_panel(snapshot, y_offset, title_color):
+    title = text_cache.render(CONSOLE_FONT, "Panel analysis", title_color)
+    screen.blit(title, title.get_rect(center=(CONSOLE_RECT.centerx, y_offset + title.get_height() // 2)))
+
+    # Eval bar: white's share is its expected score, so a mate fills it and +1 pawn moves it a little
+    y_offset += 25
+    bar = pygame.Rect(CONSOLE_RECT.x + 10, y_offset, CONSOLE_WIDTH - 20, 14)
+    pygame.draw.rect(screen, (20, 20, 20), bar)
+    if snapshot is not None:
+        white_width = round(bar.width * (1 + snapshot.white_chances) / 2)
+        pygame.draw.rect(screen, (235, 235, 235), (bar.x, bar.y, white_width, bar.height))
+    pygame.draw.rect(screen, (120, 120, 120), bar, 1)
+
+    y_offset += 22
+    if snapshot is None:
+        draw_text("Analyzing...", CONSOLE_RECT.x + 10, y_offset, font=CONSOLE_FONT, center=False, color=WHITE)
+        return
+    draw_text(f"Eval: {snapshot.score_text()}  (depth {snapshot.depth})", CONSOLE_RECT.x + 10, y_offset,
+              font=CONSOLE_FONT, center=False, color=WHITE)
+
+    # Best line, wrapped to the console width
+    y_offset += 25
+    line = ""
+    for token in snapshot.pv_san.split():
+        candidate = f"{line} {token}".strip()
+        if line and CONSOLE_FONT.size(candidate)[0] > CONSOLE_WIDTH - 20:
+            draw_text(line, CONSOLE_RECT.x + 10, y_offset, font=CONSOLE_FONT, center=False, color=WHITE)
+            y_offset += 20
+            candidate = token
+        line = candidate
+    if line:
+        draw_text(line, CONSOLE_RECT.x + 10, y_offset, font=CONSOLE_FONT, center=False, color=WHITE)
+
+def track_evals(game, service):
+    """Copy the service's evaluations into the game's timeline, once per frame.
+
+    The live snapshot fills the current ply as it deepens. While the service
+    is idle one missing ply at a time is queued for a shallow background
+    search; results for a line that has since been replaced are dropped.
+    """
+    snapshot = service.current()
+    if snapshot is not None:
+        game.record_eval(snapshot.score, snapshot.depth)
+    generation = game.evals.generation
+    for (ply, tag_generation), score, depth in service.background_results():
+        if tag_generation == generation and ply <= game.last_ply:
+            game.record_eval(score, depth, ply)
+    if service.background_idle():
+        # The current position is the live search's job unless the game is over there
+        ply = game.evals.missing(game.last_ply, skip=None if game.outcome() else game.ply)
+        if ply is None:
+            return
+        board = game.board_at(ply)
+        score = terminal_score(board)
+        if score is not None:
+            game.record_eval(chess.engine.PovScore(score, board.turn), 0, ply)
+        else:
+            service.queue_background((ply, generation), board)
+
 def get_square_from_mouse(pos, flipped=False):
-    x, y = pos
-    if x >= BOARD_WIDTH:
+    if not BOARD_RECT.collidepoint(pos):
         return None
+    x, y = pos[0] - BOARD_RECT.x, pos[1] - BOARD_RECT.y
     col = x // SQUARE_SIZE
     row = y // SQUARE_SIZE
     if flipped:
@@ -269,50 +410,16 @@ def get_square_from_mouse(pos, flipped=False):
         return None
     return chess.square(col, row)
 
-def draw_move_hints(game, selected_square, flipped=False):
+def move_hint_squares(game, selected_square):
     if selected_square is None:
-        return
-    for move in game.board.legal_moves:
-        if move.from_square == selected_square:
-            to_square = move.to_square
-            col = chess.square_file(to_square)
-            row = 7 - chess.square_rank(to_square)
-            display_col = 7 - col if flipped else col
-            display_row = 7 - row if flipped else row
-            center = (display_col * SQUARE_SIZE + SQUARE_SIZE // 2,
-                      display_row * SQUARE_SIZE + SQUARE_SIZE // 2)
-            pygame.draw.circle(screen, (120, 150, 100), center, 15)
-
-def draw_suggested_move(suggested_move, flipped=False):
-    if not suggested_move:
-        return
+        return frozenset()
+    return game.legal_targets(selected_square).keys()
 
-    # Get the from and to squares
-    from_square = suggested_move.from_square
-    to_square = suggested_move.to_square
-
-    # Calculate display positions
-    from_col = chess.square_file(from_square)
-    from_row = 7 - chess.square_rank(from_square)
-    to_col = chess.square_file(to_square)
-    to_row = 7 - chess.square_rank(to_square)
-
-    # Adjust for flipped board
-    display_from_col = 7 - from_col if flipped else from_col
-    display_from_row = 7 - from_row if flipped else from_row
-    display_to_col = 7 - to_col if flipped else to_col
-    display_to_row = 7 - to_row if flipped else to_row
-
-    # Highlight both the "from" and to squares with the same color
-    highlight_surface = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
-    
-    # Highlight the "from" square
-    highlight_surface.fill(HIGHLIGHT_COLOR)
-    screen.blit(highlight_surface, (display_from_col * SQUARE_SIZE, display_from_row * SQUARE_SIZE))
-    
-    # Highlight the "to" square
-    highlight_surface.fill(HIGHLIGHT_COLOR)
-    screen.blit(highlight_surface, (display_to_col * SQUARE_SIZE, display_to_row * SQUARE_SIZE))
+def suggested_move_squares(suggested_move):
+    # Highlight both the "from" and "to" squares with the same color
+    if not suggested_move:
+        return frozenset()
+    return frozenset((suggested_move.from_square, suggested_move.to_square))
 
 def draw_button(text, x, y, w, h, color, hover_color, mouse_pos, text_color=WHITE, border=False):
     rect = pygame.Rect(x, y, w, h)
@@ -337,10 +444,11 @@ def notification(game, message, color=(255, 0, 0), is_victory=False, outline_col
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
+            elif handle_resize(event):
+                pass
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if btn_back.collidepoint(event.pos):
-                    game.board.reset()
-                    game.move_history.clear()  # Clear move history on reset
+                    game.reset()  # Clears the move history and redo stack too
                     main_menu()
         pygame.display.flip()
 
@@ -357,6 +465,8 @@ def choose_player_color():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
+            elif handle_resize(event):
+                pass
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if btn_white.collidepoint(event.pos):
                     return chess.WHITE
@@ -372,9 +482,12 @@ def play_vs_ai():
     if player_color is None:
         return
     game = ChessGame()
-    engine = Engine()
+    engine = engine_loader.get()
+    engine_loader.prefetch(2)  # One for the hint service, one for the next game
+    # Hints are searched in the background whenever it is the player's turn
+    hints = AnalysisService(engine_loader.get)
     running = True
-    suggested_move = None
+    hint_requested = False
     promotion_dialog = False
     promotion_from = None
     promotion_to = None
@@ -383,6 +496,7 @@ def play_vs_ai():
     move_queue = queue.Queue()
     ai_thread = None
     ai_stats = {}
+    board_renderer.invalidate()
 
     def get_ai_move():
         print("AI is thinking!...")
@@ -398,23 +512,49 @@ def play_vs_ai():
             "nodes": result.get("nodes", 0),
             "cutoffs": result.get("cutoffs", 0),
             "evals": result.get("evals", 0),
+            "pov_score": result.get("pov_score"),
             "time": time_taken
         })
         move_queue.put(result["move"])
 
     while running:
+        profiler.begin_frame()
         flipped = (player_color == chess.BLACK)
-        screen.fill((0, 0, 0))
-        draw_board(flipped=flipped)
-        draw_pieces(game, flipped=flipped)
+        if game.board.turn == player_color and not ai_thinking:
+            hints.update(game.board, game.outcome_tracker.key)
+            profile_analysis(game, hints, "hints")
+        else:
+            hints.pause()
+            profiler.cancel("hints")
+        track_evals(game, hints)
+        profiler.lap("analysis")
+        # Generated (and cached for this ply) here so the profiler can tell it apart from drawing
+        game.legal_move_count()
+        profiler.lap("legal moves")
+        # A shown hint follows the search, so it sharpens as deeper iterations finish
+        suggested_move = hints.best_move() if hint_requested else None
+        dirty_rects = draw_board(game, flipped=flipped, suggested_move=suggested_move)
+        profiler.lap("draw_board")
         mouse_pos = pygame.mouse.get_pos()
         btn_undo, btn_help, btn_back = draw_console(game, is_ai_mode=True, ai_stats=ai_stats, mouse_pos=mouse_pos, ai_thinking=ai_thinking)
-        draw_move_hints(game, game.selected_square, flipped=flipped)
-        draw_suggested_move(suggested_move, flipped=flipped)
+        dirty_rects.append(CONSOLE_RECT)
+        profiler.lap("draw_console")
         
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            elif handle_resize(event):
+                pass
+            elif handle_profiler_key(event):
+                pass
+            elif event.type == pygame.KEYDOWN and not promotion_dialog and not ai_thinking:
+                # Left/Right take back or replay a full move (yours and the AI's)
+                if event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+                    step = -2 if event.key == pygame.K_LEFT else 2
+                    game.goto(game.ply + step)
+                    game.selected_square = None
+                    hint_requested = False
+                    ai_stats.clear()
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 print(f"Nhấp chuột tại tọa độ: {event.pos}")
                 if promotion_dialog:
@@ -427,7 +567,7 @@ def play_vs_ai():
                         if move_result["valid"]:
                             promotion_dialog = False
                             promotion_dialog_just_activated = False
-                            suggested_move = None
+                            hint_requested = False
                             target_piece = game.get_piece(promotion_to)
                             handle_move_outcome(game, target_piece, is_ai_mode=True, player_color=player_color)
                             print(f"After promotion - History: {[m.uci() for m in game.move_history]}")
@@ -441,7 +581,7 @@ def play_vs_ai():
                         if move_result["valid"]:
                             promotion_dialog = False
                             promotion_dialog_just_activated = False
-                            suggested_move = None
+                            hint_requested = False
                             target_piece = game.get_piece(promotion_to)
                             handle_move_outcome(game, target_piece, is_ai_mode=True, player_color=player_color)
                             print(f"After promotion - History: {[m.uci() for m in game.move_history]}")
@@ -455,7 +595,7 @@ def play_vs_ai():
                         if move_result["valid"]:
                             promotion_dialog = False
                             promotion_dialog_just_activated = False
-                            suggested_move = None
+                            hint_requested = False
                             target_piece = game.get_piece(promotion_to)
                             handle_move_outcome(game, target_piece, is_ai_mode=True, player_color=player_color)
                             print(f"After promotion - History: {[m.uci() for m in game.move_history]}")
@@ -469,7 +609,7 @@ def play_vs_ai():
                         if move_result["valid"]:
                             promotion_dialog = False
                             promotion_dialog_just_activated = False
-                            suggested_move = None
+                            hint_requested = False
                             target_piece = game.get_piece(promotion_to)
                             handle_move_outcome(game, target_piece, is_ai_mode=True, player_color=player_color)
                             print(f"After promotion - History: {[m.uci() for m in game.move_history]}")
@@ -486,33 +626,30 @@ def play_vs_ai():
                         elif len(game.board.move_stack) == 1:
                             game.undo()
                         game.selected_square = None  # Reset selected_square after undo
-                        suggested_move = None
+                        hint_requested = False
                         ai_thinking = False
                         move_queue = queue.Queue()
+                        profiler.cancel("ai")
                         ai_stats.clear()
                         print("Đã hoàn tác nước đi, đặt lại selected_square về None")
                     elif btn_help.collidepoint(event.pos):
+                        # Shows whatever the background search already has; no engine call here
                         if game.board.turn == player_color:
-                            engine.set_position(game.board.fen())
-                            result = engine.get_best_move_with_stats()
-                            uci_move = result["move"]
-                            if uci_move:
-                                from_square = chess.square(ord(uci_move[0]) - ord('a'), int(uci_move[1]) - 1)
-                                to_square = chess.square(ord(uci_move[2]) - ord('a'), int(uci_move[3]) - 1)
-                                promotion = None
-                                if len(uci_move) == 5:
-                                    promotion_piece = uci_move[4].upper()
-                                    promotion = {
-                                        'Q': chess.QUEEN,
-                                        'R': chess.ROOK,
-                                        'B': chess.BISHOP,
-                                        'N': chess.KNIGHT
-                                    }.get(promotion_piece)
-                                suggested_move = chess.Move(from_square, to_square, promotion=promotion)
+                            hint_requested = True
                     elif btn_back.collidepoint(event.pos):
                         running = False
                         ai_thinking = False
                         move_queue = queue.Queue()
+                    elif eval_graph.ply_at(event.pos) is not None:
+                        # Jump to the clicked move, snapped to a position where it is the player's turn
+                        if not ai_thinking:
+                            ply = eval_graph.ply_at(event.pos)
+                            if (ply % 2 == 0) != (player_color == chess.WHITE):
+                                ply = ply - 1 if ply > 0 else 1
+                            game.goto(ply)
+                            game.selected_square = None
+                            hint_requested = False
+                            ai_stats.clear()
                     else:
                         square = get_square_from_mouse(event.pos, flipped=flipped)
                         if square is None:
@@ -525,17 +662,10 @@ def play_vs_ai():
                             print(f"Ô đích được chọn: {chess.square_name(square)}")
                             print(f"Thử nước đi: từ {chess.square_name(game.selected_square)} đến {chess.square_name(square)}")
                             print(f"Before move - FEN: {game.board.fen()}")
-                            # Check if the move is legal by matching from_square and to_square
-                            legal_moves = list(game.board.legal_moves)
-                            promotion_required = False
-                            move_is_legal = False
-                            for legal_move in legal_moves:
-                                if (legal_move.from_square == game.selected_square and
-                                    legal_move.to_square == square):
-                                    move_is_legal = True
-                                    if legal_move.promotion is not None:
-                                        promotion_required = True
-                                    break
+                            # Check if the move is legal with one lookup in the position's move index
+                            flags = game.legal_targets(game.selected_square).get(square)
+                            move_is_legal = flags is not None
+                            promotion_required = move_is_legal and bool(flags & MOVE_PROMOTION)
                             
                             if move_is_legal:
                                 if promotion_required:
@@ -549,7 +679,7 @@ def play_vs_ai():
                                     move_result = game.move(game.selected_square, square)
                                     print(f"Kết quả nước đi: {move_result}")
                                     if move_result["valid"]:
-                                        suggested_move = None
+                                        hint_requested = False
                                         target_piece = game.get_piece(square)
                                         handle_move_outcome(game, target_piece, is_ai_mode=True, player_color=player_color)
                                         print(f"After player's move - History: {[m.uci() for m in game.move_history]}")
@@ -570,17 +700,22 @@ def play_vs_ai():
                                 game.selected_square = None
                         print(f"Trạng thái selected_square sau khi xử lý: {chess.square_name(game.selected_square) if game.selected_square is not None else 'None'}")
         
+        profiler.lap("events")
         if game.board.turn != player_color and not promotion_dialog and not ai_thinking:
             print("AI's turn. Turn123:", "Black" if game.board.turn == chess.BLACK else "White")
             print("FEN sent to engine:", game.board.fen())
             ai_thinking = True
+            profiler.request("ai")
             ai_thread = threading.Thread(target=get_ai_move)
             ai_thread.start()
         
         if ai_thinking and not move_queue.empty():
             uci_move = move_queue.get()
             ai_thinking = False
+            profiler.result("ai")
             if uci_move:
+                # The AI searched the position it is about to move from
+                game.record_eval(ai_stats.get("pov_score"), ai_stats.get("depth"))
                 from_square = chess.square(ord(uci_move[0]) - ord('a'), int(uci_move[1]) - 1)
                 to_square = chess.square(ord(uci_move[2]) - ord('a'), int(uci_move[3]) - 1)
                 promotion = None
@@ -602,21 +737,25 @@ def play_vs_ai():
                     print(f"Invalid move from engine: {uci_move}")
             else:
                 print("Engine did not return a valid move.")
-                if game.board.is_checkmate():
+                outcome = game.outcome()
+                termination = outcome.termination if outcome else None
+                if termination == chess.Termination.CHECKMATE:
                     winner = "You" if game.board.turn != player_color else "AI"
                     winner_color = WHITE if game.board.turn != player_color else BLACK
                     outline = WHITE if winner_color == BLACK else None
                     notification(game, f"{winner} Wins!", color=winner_color, is_victory=True, outline_color=outline)
-                elif game.board.is_stalemate():
+                elif termination == chess.Termination.STALEMATE:
                     notification(game, "Stalemate!")
-                elif game.board.is_insufficient_material():
+                elif termination == chess.Termination.INSUFFICIENT_MATERIAL:
                     notification(game, "Draw: Insufficient material!")
                 else:
                     notification(game, "No valid moves. Game over.")
-                game.board.reset()
-                game.move_history.clear()
+                game.reset()
                 ai_stats.clear()
+        profiler.queue("ai", int(ai_thinking))
+        profiler.lap("ai move")
         
+        draw_profiler(dirty_rects)
         if promotion_dialog:
             overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
             overlay.fill((0, 0, 0, 150))
@@ -633,15 +772,32 @@ def play_vs_ai():
                 print(f"Vị trí nút Bishop: {btn_bishop}")
                 print(f"Vị trí nút Knight: {btn_knight}")
                 promotion_dialog_just_activated = False
-        
-        pygame.display.flip()
+            # The overlay covers the board, so repaint it in full next frame
+            board_renderer.invalidate()
+            pygame.display.flip()
+        else:
+            present(dirty_rects)
+        profiler.lap("present")
     
+    hints.close()
+    profiler.cancel("hints")
+    profiler.cancel("ai")
     if ai_thread and ai_thread.is_alive():
         ai_thread.join()
 
+# Draw messages by termination; checkmate is handled separately
+DRAW_MESSAGES = {
+    chess.Termination.STALEMATE: "Stalemate!",
+    chess.Termination.INSUFFICIENT_MATERIAL: "Draw: Insufficient material!",
+    chess.Termination.SEVENTYFIVE_MOVES: "Draw: 75-move rule!",
+    chess.Termination.FIVEFOLD_REPETITION: "Draw: Fivefold repetition!",
+}
+
 def handle_move_outcome(game, target_piece=None, is_ai_mode=False, player_color=None):
-    if game.board.is_checkmate():
-        checkmate_sound.play()
+    # The game's outcome tracker is updated incrementally, so this is O(1) per move
+    outcome = game.outcome()
+    if outcome and outcome.termination == chess.Termination.CHECKMATE:
+        sounds.play("Checkmate")
         if is_ai_mode:
             # In AI mode, determine if the player or AI wins
             winner = "You" if game.board.turn != player_color else "AI"
@@ -654,44 +810,65 @@ def handle_move_outcome(game, target_piece=None, is_ai_mode=False, player_color=
             winner_color = WHITE if winner == "White" else BLACK
             outline = WHITE if winner_color == BLACK else None
             notification(game, f"{winner} Wins!", color=winner_color, is_victory=True, outline_color=outline)
-    elif game.board.is_stalemate():
-        notification(game, "Stalemate!")
-    elif game.board.is_insufficient_material():
-        notification(game, "Draw: Insufficient material!")
-    elif game.board.is_seventyfive_moves():
-        notification(game, "Draw: 75-move rule!")
-    elif game.board.is_fivefold_repetition():
-        notification(game, "Draw: Fivefold repetition!")
+    elif outcome:
+        notification(game, DRAW_MESSAGES[outcome.termination])
     if target_piece:
-        capture_sound.play()
+        sounds.play("Capture")
     else:
-        move_sound.play()
+        sounds.play("Move")
     if game.board.is_check():
-        check_sound.play()
+        sounds.play("Check")
     game.selected_square = None
 
 def play_1vs1():
     game = ChessGame()
-    engine = Engine()
+    # Background evaluation of the position on the board, also used for Help;
+    # it takes its engine from the loader in its own thread
+    analysis = AnalysisService(engine_loader.get)
+    engine_loader.prefetch()  # Have the next game's engine ready too
     running = True
-    suggested_move = None
+    hint_requested = False
     promotion_dialog = False
     promotion_from = None
     promotion_to = None
     promotion_dialog_just_activated = False
+    board_renderer.invalidate()
     while running:
+        profiler.begin_frame()
         flipped = game.board.turn == chess.BLACK
-        screen.fill((0, 0, 0))
-        draw_board(flipped=flipped)
-        draw_pieces(game, flipped=flipped)
+        # Restarts the search after a move, undo or review step; a no-op otherwise
+        analysis.update(game.board, game.outcome_tracker.key)
+        profile_analysis(game, analysis, "analysis")
+        track_evals(game, analysis)
+        profiler.lap("analysis")
+        # Generated (and cached for this ply) here so the profiler can tell it apart from drawing
+        game.legal_move_count()
+        profiler.lap("legal moves")
+        # A shown hint follows the search, so it sharpens as deeper iterations finish
+        suggested_move = analysis.best_move() if hint_requested else None
+        dirty_rects = draw_board(game, flipped=flipped, suggested_move=suggested_move)
+        profiler.lap("draw_board")
         mouse_pos = pygame.mouse.get_pos()
-        btn_undo, btn_help, btn_back = draw_console(game, is_ai_mode=False, mouse_pos=mouse_pos, ai_thinking=False)
-        draw_move_hints(game, game.selected_square, flipped=flipped)
-        draw_suggested_move(suggested_move, flipped=flipped)
+        btn_undo, btn_help, btn_back = draw_console(game, is_ai_mode=False, mouse_pos=mouse_pos, ai_thinking=False,
+                                                    analysis=analysis)
+        dirty_rects.append(CONSOLE_RECT)
+        profiler.lap("draw_console")
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
+            elif handle_resize(event):
+                pass
+            elif handle_profiler_key(event):
+                pass
+            elif event.type == pygame.KEYDOWN and not promotion_dialog:
+                # Review keys: Left/Right step through the game, Home/End jump to either end
+                target = {pygame.K_LEFT: game.ply - 1, pygame.K_RIGHT: game.ply + 1,
+                          pygame.K_HOME: 0, pygame.K_END: game.last_ply}.get(event.key)
+                if target is not None:
+                    game.goto(target)
+                    game.selected_square = None
+                    hint_requested = False
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 print(f"Nhấp chuột tại tọa độ: {event.pos}")
                 if promotion_dialog:
@@ -704,7 +881,7 @@ def play_1vs1():
                         if move_result["valid"]:
                             promotion_dialog = False
                             promotion_dialog_just_activated = False
-                            suggested_move = None
+                            hint_requested = False
                             target_piece = game.get_piece(promotion_to)
                             handle_move_outcome(game, target_piece, is_ai_mode=False)
                             print(f"After promotion - History: {[m.uci() for m in game.move_history]}")
@@ -718,7 +895,7 @@ def play_1vs1():
                         if move_result["valid"]:
                             promotion_dialog = False
                             promotion_dialog_just_activated = False
-                            suggested_move = None
+                            hint_requested = False
                             target_piece = game.get_piece(promotion_to)
                             handle_move_outcome(game, target_piece, is_ai_mode=False)
                             print(f"After promotion - History: {[m.uci() for m in game.move_history]}")
@@ -732,7 +909,7 @@ def play_1vs1():
                         if move_result["valid"]:
                             promotion_dialog = False
                             promotion_dialog_just_activated = False
-                            suggested_move = None
+                            hint_requested = False
                             target_piece = game.get_piece(promotion_to)
                             handle_move_outcome(game, target_piece, is_ai_mode=False)
                             print(f"After promotion - History: {[m.uci() for m in game.move_history]}")
@@ -746,7 +923,7 @@ def play_1vs1():
                         if move_result["valid"]:
                             promotion_dialog = False
                             promotion_dialog_just_activated = False
-                            suggested_move = None
+                            hint_requested = False
                             target_piece = game.get_piece(promotion_to)
                             handle_move_outcome(game, target_piece, is_ai_mode=False)
                             print(f"After promotion - History: {[m.uci() for m in game.move_history]}")
@@ -759,27 +936,17 @@ def play_1vs1():
                     if btn_undo.collidepoint(event.pos):
                         game.undo()
                         game.selected_square = None  # Reset selected_square after undo
-                        suggested_move = None
+                        hint_requested = False
                         print("Đã hoàn tác nước đi, đặt lại selected_square về None")
                     elif btn_help.collidepoint(event.pos):
-                        engine.set_position(game.board.fen())
-                        result = engine.get_best_move_with_stats()
-                        uci_move = result["move"]
-                        if uci_move:
-                            from_square = chess.square(ord(uci_move[0]) - ord('a'), int(uci_move[1]) - 1)
-                            to_square = chess.square(ord(uci_move[2]) - ord('a'), int(uci_move[3]) - 1)
-                            promotion = None
-                            if len(uci_move) == 5:
-                                promotion_piece = uci_move[4].upper()
-                                promotion = {
-                                    'Q': chess.QUEEN,
-                                    'R': chess.ROOK,
-                                    'B': chess.BISHOP,
-                                    'N': chess.KNIGHT
-                                }.get(promotion_piece)
-                            suggested_move = chess.Move(from_square, to_square, promotion=promotion)
+                        # Shows whatever the background search already has; no engine call here
+                        hint_requested = True
                     elif btn_back.collidepoint(event.pos):
                         running = False
+                    elif eval_graph.ply_at(event.pos) is not None:
+                        game.goto(eval_graph.ply_at(event.pos))
+                        game.selected_square = None
+                        hint_requested = False
                     else:
                         square = get_square_from_mouse(event.pos, flipped=flipped)
                         if square is None:
@@ -791,17 +958,10 @@ def play_1vs1():
                             print(f"Ô đích được chọn: {chess.square_name(square)}")
                             print(f"Thử nước đi: từ {chess.square_name(game.selected_square)} đến {chess.square_name(square)}")
                             print(f"Before move - FEN: {game.board.fen()}")
-                            # Check if the move is legal by matching from_square and to_square
-                            legal_moves = list(game.board.legal_moves)
-                            promotion_required = False
-                            move_is_legal = False
-                            for legal_move in legal_moves:
-                                if (legal_move.from_square == game.selected_square and
-                                    legal_move.to_square == square):
-                                    move_is_legal = True
-                                    if legal_move.promotion is not None:
-                                        promotion_required = True
-                                    break
+                            # Check if the move is legal with one lookup in the position's move index
+                            flags = game.legal_targets(game.selected_square).get(square)
+                            move_is_legal = flags is not None
+                            promotion_required = move_is_legal and bool(flags & MOVE_PROMOTION)
                             
                             if move_is_legal:
                                 if promotion_required:
@@ -815,7 +975,7 @@ def play_1vs1():
                                     move_result = game.move(game.selected_square, square)
                                     print(f"Kết quả nước đi: {move_result}")
                                     if move_result["valid"]:
-                                        suggested_move = None
+                                        hint_requested = False
                                         target_piece = game.get_piece(square)
                                         handle_move_outcome(game, target_piece, is_ai_mode=False)
                                         print(f"After move - History: {[m.uci() for m in game.move_history]}")
@@ -835,6 +995,8 @@ def play_1vs1():
                                 print(f"Không chọn ô nguồn: Ô {chess.square_name(square)} không có quân hợp lệ")
                                 game.selected_square = None
                         print(f"Trạng thái selected_square sau khi xử lý: {chess.square_name(game.selected_square) if game.selected_square is not None else 'None'}")
+        profiler.lap("events")
+        draw_profiler(dirty_rects)
         if promotion_dialog:
             overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
             overlay.fill((0, 0, 0, 150))
@@ -851,7 +1013,14 @@ def play_1vs1():
                 print(f"Vị trí nút Bishop: {btn_bishop}")
                 print(f"Vị trí nút Knight: {btn_knight}")
                 promotion_dialog_just_activated = False
-        pygame.display.flip()
+            # The overlay covers the board, so repaint it in full next frame
+            board_renderer.invalidate()
+            pygame.display.flip()
+        else:
+            present(dirty_rects)
+        profiler.lap("present")
+    analysis.close()
+    profiler.cancel("analysis")
 
 def main_menu():
     running = True
@@ -859,23 +1028,26 @@ def main_menu():
         screen.blit(menu_background, (0, 0))
         title = TITLE_FONT.render("Chess Game", True, BLACK)
         screen.blit(title, (WIDTH // 2 - title.get_width() // 2, 80))
-        btn_1v1 = draw_text("Play 1 vs 1", WIDTH // 2, 250)
-        btn_vs_ai = draw_text("Play vs AI", WIDTH // 2, 320)
-        btn_music = draw_text("Music", WIDTH // 2, 390)
-        btn_quit = draw_text("Exit", WIDTH // 2, 460)
+        btn_1v1 = draw_text("Play 1 vs 1", WIDTH // 2, HEIGHT // 2 - 70)
+        btn_vs_ai = draw_text("Play vs AI", WIDTH // 2, HEIGHT // 2)
+        btn_music = draw_text("Music", WIDTH // 2, HEIGHT // 2 + 70)
+        btn_quit = draw_text("Exit", WIDTH // 2, HEIGHT // 2 + 140)
         mouse_x, mouse_y = pygame.mouse.get_pos()
         if btn_1v1.collidepoint(mouse_x, mouse_y):
-            draw_text("Play 1 vs 1", WIDTH // 2, 250, color=HOVER_COLOR)
+            draw_text("Play 1 vs 1", WIDTH // 2, HEIGHT // 2 - 70, color=HOVER_COLOR)
         if btn_vs_ai.collidepoint(mouse_x, mouse_y):
-            draw_text("Play vs AI", WIDTH // 2, 320, color=HOVER_COLOR)
+            draw_text("Play vs AI", WIDTH // 2, HEIGHT // 2, color=HOVER_COLOR)
         if btn_music.collidepoint(mouse_x, mouse_y):
-            draw_text("Music", WIDTH // 2, 390, color=HOVER_COLOR)
+            draw_text("Music", WIDTH // 2, HEIGHT // 2 + 70, color=HOVER_COLOR)
         if btn_quit.collidepoint(mouse_x, mouse_y):
-            draw_text("Exit", WIDTH // 2, 460, color=HOVER_COLOR)
+            draw_text("Exit", WIDTH // 2, HEIGHT // 2 + 140, color=HOVER_COLOR)
         pygame.display.flip()
+        after_first_frame()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            elif handle_resize(event):
+                pass
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if btn_1v1.collidepoint(event.pos):
                     play_1vs1()
@@ -889,16 +1061,19 @@ def main_menu():
 
 def toggle_music():
     running = True
-    slider_rect = pygame.Rect(WIDTH//2 - 150, HEIGHT//2 - 20, 300, 40)
     handle_radius = 10
-    slider_min = slider_rect.x
     clock = pygame.time.Clock()
+    assets.init_mixer()
     volume = pygame.mixer.music.get_volume()
     while running:
+        slider_rect = pygame.Rect(WIDTH//2 - 150, HEIGHT//2 - 20, 300, 40)
+        slider_min = slider_rect.x
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
+            elif handle_resize(event):
+                pass
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     running = False
@@ -937,5 +1112,12 @@ def toggle_music():
         pygame.display.flip()
         clock.tick(60)
 
+def main():
+    configure_logging()
+    init_display()
+    # Spawn the engine while the menu is shown
+    engine_loader.prefetch()
+    main_menu()
+
 if __name__ == "__main__":
-    main_menu()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,461 @@
+"""Append-only game database with a Zobrist position index.
+
+A database is a directory:
+
+    games.dat          [header][move codes] per game, game_record's format
+    games.idx          byte offset of every game in games.dat (uint64)
+    strings.dat        interned tag values, [uint32 length][utf-8] each
+    pos_<a>_<b>.keys   sorted polyglot keys of every position in games a..b-1
+    pos_<a>_<b>.vals   game << 16 | ply, in the same order as the keys
+
+Everything is memory-mapped, nothing is parsed on open. A position query is
+a binary search per index segment, so "which games reached this position"
+costs microseconds regardless of the number of games; results and
+continuations are then read straight from the mapped game records. New
+games are indexed in memory and written out as a new segment by
+``commit``; segments are merged by ``compact``. games.idx is written last,
+so a crash mid-append only loses the games it had not recorded yet.
+
+    python game_db.py add game_db game_records.pgn
+    python game_db.py query game_db e4 e5 Nf3
+    python game_db.py query game_db "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+"""
+import bisect
+import heapq
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from collections import Counter
+
+import chess
+import chess.pgn
+import chess.polyglot
+
+from game_record import (HEADER, NO_STRING, RESULTS, _little_endian, _native, build_pgn_game, decode_move,
+                         encode_moves, pack_header, unpack_header)
+from outcome import OutcomeTracker
+
+PLY_BITS = 16
+PLY_MASK = (1 << PLY_BITS) - 1
+SEGMENT_POSITIONS = 1 << 20  # Pending index entries before commit writes a segment by itself
+_LENGTH = struct.Struct("<I")
+
+
+def position_keys(moves, board=None):
+    """Polyglot key of the start position and of the position after every move."""
+    board = board.copy() if board is not None else chess.Board()
+    tracker = OutcomeTracker(board)
+    for move in moves:
+        tracker.push(board, move)
+    return tracker.hashes
+
+
+def _mapped(path):
+    """Read-only map of ``path``, or None for an empty file (mmap refuses those)."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _uint64s(data):
+    """Sequence view of little-endian uint64s; zero copy on little-endian machines."""
+    if data is None:
+        return ()
+    if sys.byteorder == "little":
+        return memoryview(data).cast("Q")
+    return _native(data, "Q")
+
+
+class _Segment:
+    def __init__(self, directory, first, end):
+        self.first = first
+        self.end = end
+        self.base = os.path.join(directory, f"pos_{first:010d}_{end:010d}")
+        self._keys_map = _mapped(self.base + ".keys")
+        self._vals_map = _mapped(self.base + ".vals")
+        self.keys = _uint64s(self._keys_map)
+        self.vals = _uint64s(self._vals_map)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, key):
+        lo = bisect.bisect_left(self.keys, key)
+        hi = bisect.bisect_right(self.keys, key, lo)
+        return self.vals[lo:hi]
+
+    def entries(self):
+        return zip(self.keys, self.vals)
+
+    def close(self):
+        # Views must go before their maps can close
+        self.keys = self.vals = ()
+        for data in (self._keys_map, self._vals_map):
+            if data is not None:
+                data.close()
+        self._keys_map = self._vals_map = None
+
+    def remove(self):
+        self.close()
+        os.remove(self.base + ".keys")
+        os.remove(self.base + ".vals")
+
+
+def _write_segment(directory, first, end, entries):
+    """Write sorted (key, value) pairs as a new segment; files appear under their final name only when complete."""
+    base = os.path.join(directory, f"pos_{first:010d}_{end:010d}")
+    keys = array("Q")
+    vals = array("Q")
+    with open(base + ".keys.tmp", "wb") as keys_file, open(base + ".vals.tmp", "wb") as vals_file:
+        for key, value in entries:
+            keys.append(key)
+            vals.append(value)
+            if len(keys) == 65536:
+                keys_file.write(_little_endian(keys))
+                vals_file.write(_little_endian(vals))
+                del keys[:], vals[:]
+        keys_file.write(_little_endian(keys))
+        vals_file.write(_little_endian(vals))
+    os.replace(base + ".vals.tmp", base + ".vals")
+    os.replace(base + ".keys.tmp", base + ".keys")
+    return _Segment(directory, first, end)
+
+
+class GameDatabase:
+    """Games on disk plus an index from position key to every (game, ply) that reached it.
+
+    Keys are 64-bit polyglot hashes, so positions that differ only in move
+    counters are the same position. Use as a context manager, or call
+    ``close`` (which commits) when done.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        path = self._path
+        for name in ("games.dat", "games.idx", "strings.dat"):
+            open(path(name), "ab").close()
+
+        with open(path("games.idx"), "rb") as f:
+            data = f.read()
+        self.offsets = _native(data[:len(data) - len(data) % 8], "Q")
+        if len(data) % 8:
+            os.truncate(path("games.idx"), len(data) - len(data) % 8)
+        self._data = _mapped(path("games.dat"))
+        self._drop_unindexed_tail()
+        self._load_strings()
+
+        self._data_file = open(path("games.dat"), "ab")
+        self._index_file = open(path("games.idx"), "ab")
+        self._strings_file = open(path("strings.dat"), "ab")
+        self._data_size = self._data_file.tell()
+        self._pending = []  # key << 64 | game << 16 | ply, unsorted
+        self._load_segments()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _drop_unindexed_tail(self):
+        """Cut off a game record whose offset never made it into games.idx."""
+        end = 0
+        if self.offsets:
+            offset = self.offsets[-1]
+            end = offset + HEADER.size + 2 * struct.unpack_from("<H", self._data, offset)[0]
+        if os.path.getsize(self._path("games.dat")) > end:
+            if self._data is not None:
+                self._data.close()
+            os.truncate(self._path("games.dat"), end)
+            self._data = _mapped(self._path("games.dat"))
+
+    def _load_strings(self):
+        self.strings = []
+        self._string_ids = {}
+        with open(self._path("strings.dat"), "rb") as f:
+            data = f.read()
+        pos = 0
+        while pos + _LENGTH.size <= len(data):
+            length = _LENGTH.unpack_from(data, pos)[0]
+            if pos + _LENGTH.size + length > len(data):
+                break  # Torn write; the games that would use it were not indexed either
+            value = str(data[pos + _LENGTH.size:pos + _LENGTH.size + length], "utf-8")
+            self._string_ids[value] = len(self.strings)
+            self.strings.append(value)
+            pos += _LENGTH.size + length
+        if pos < len(data):
+            os.truncate(self._path("strings.dat"), pos)
+
+    def _load_segments(self):
+        ranges = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".tmp"):
+                os.remove(self._path(name))
+            elif name.startswith("pos_") and name.endswith(".keys"):
+                ranges.append(tuple(int(part) for part in name[4:-5].split("_")))
+        self.segments = []
+        indexed = 0
+        for first, end in sorted(ranges, key=lambda r: (r[0], -r[1])):
+            segment = _Segment(self.directory, first, end)
+            if end <= indexed or end > len(self):
+                # Left over from an interrupted merge, or indexes games lost in a torn append
+                segment.remove()
+                continue
+            self.segments.append(segment)
+            indexed = end
+        # Games appended after the last segment was written (e.g. the process died before commit)
+        self._pending_first = indexed
+        for index in range(indexed, len(self)):
+            self._index_game(index, position_keys(self.moves(index), self.start_board(index)))
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _intern(self, value):
+        if value is None:
+            return NO_STRING
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = self._string_ids[value] = len(self.strings)
+            self.strings.append(value)
+            encoded = value.encode("utf-8")
+            self._strings_file.write(_LENGTH.pack(len(encoded)) + encoded)
+        return string_id
+
+    def _string(self, string_id):
+        return None if string_id == NO_STRING else self.strings[string_id]
+
+    # Writing
+
+    def add_game(self, moves, headers=None, fen=None, keys=None):
+        """Append one game; ``keys`` are its position_keys if the caller already computed them.
+
+        Returns the game's index.
+        """
+        codes = moves if isinstance(moves, array) else encode_moves(moves)
+        if keys is None:
+            board = chess.Board(fen) if fen else None
+            keys = position_keys([decode_move(code) for code in codes], board)
+        index = len(self)
+        self._data_file.write(pack_header(len(codes), headers, fen, self._intern) + _little_endian(codes))
+        self.offsets.append(self._data_size)
+        self._data_size += HEADER.size + 2 * len(codes)
+        self._index_game(index, keys)
+        if len(self._pending) >= SEGMENT_POSITIONS:
+            self.commit()
+        return index
+
+    def _index_game(self, index, keys):
+        entry = index << PLY_BITS
+        self._pending.extend(key << 64 | entry | ply for ply, key in enumerate(keys))
+
+    def add_pgn_game(self, game):
+        headers = dict(game.headers)
+        fen = headers.pop("FEN", None)
+        return self.add_game(list(game.mainline_moves()), headers, fen)
+
+    def add_chess_game(self, chess_game, headers=None):
+        root = chess_game.board.root()
+        fen = None if root.fen() == chess.STARTING_FEN else root.fen()
+        return self.add_game(chess_game.move_history, headers, fen)
+
+    def add_collection(self, collection, keys=None):
+        """Append every game of a game_record.GameCollection.
+
+        ``keys`` optionally holds the position_keys of all its games back to back.
+        """
+        pos = 0
+        for index in range(len(collection)):
+            header = collection.header(index)
+            game_keys = None
+            if keys is not None:
+                count = collection.ply_count(index) + 1
+                game_keys = keys[pos:pos + count]
+                pos += count
+            self.add_game(collection.move_codes(index), header, header.get("FEN"), game_keys)
+
+    def commit(self):
+        """Make every added game durable and write the pending index entries as a new segment."""
+        self._strings_file.flush()
+        self._data_file.flush()
+        os.fsync(self._data_file.fileno())
+        self._index_file.write(_little_endian(self.offsets[self._index_file.tell() // 8:]))
+        self._index_file.flush()
+        if self._pending:
+            self._pending.sort()
+            mask = (1 << 64) - 1
+            entries = ((entry >> 64, entry & mask) for entry in self._pending)
+            self.segments.append(_write_segment(self.directory, self._pending_first, len(self), entries))
+            self._pending = []
+            # Keep segment sizes roughly doubling towards the oldest, so there are O(log n) of them
+            while len(self.segments) > 1 and len(self.segments[-2]) < 2 * len(self.segments[-1]):
+                self._merge(len(self.segments) - 2)
+        self._pending_first = len(self)
+
+    def _merge(self, start, stop=None):
+        """Replace segments[start:stop] by one segment."""
+        old = self.segments[start:stop]
+        merged = _write_segment(self.directory, old[0].first, old[-1].end,
+                                heapq.merge(*(segment.entries() for segment in old)))
+        for segment in old:
+            segment.remove()
+        self.segments[start:stop] = [merged]
+
+    def compact(self):
+        """Merge all index segments into one."""
+        self.commit()
+        if len(self.segments) > 1:
+            self._merge(0)
+
+    def close(self):
+        if self._data_file.closed:
+            return
+        self.commit()
+        for segment in self.segments:
+            segment.close()
+        if self._data is not None:
+            self._data.close()
+        for f in (self._data_file, self._index_file, self._strings_file):
+            f.close()
+
+    # Reading games
+
+    def _record(self, index):
+        """Offset of game ``index`` in the mapped data, remapping after appends.
+
+        Call it before touching ``self._data``, which it may replace.
+        """
+        offset = self.offsets[index]
+        if self._data is None or offset >= len(self._data):
+            self._data_file.flush()
+            if self._data is not None:
+                self._data.close()
+            self._data = _mapped(self._path("games.dat"))
+        return offset
+
+    def header(self, index):
+        offset = self._record(index)
+        return unpack_header(self._data, offset, self._string)
+
+    def result(self, index):
+        offset = self._record(index)
+        return RESULTS[self._data[offset + 2]]
+
+    def ply_count(self, index):
+        offset = self._record(index)
+        return struct.unpack_from("<H", self._data, offset)[0]
+
+    def move_codes(self, index):
+        offset = self._record(index)
+        count = struct.unpack_from("<H", self._data, offset)[0]
+        start = offset + HEADER.size
+        return _native(self._data[start:start + 2 * count], "H")
+
+    def moves(self, index):
+        return [decode_move(code) for code in self.move_codes(index)]
+
+    def start_board(self, index):
+        fen = self.header(index).get("FEN")
+        return chess.Board(fen) if fen else chess.Board()
+
+    def pgn_game(self, index):
+        return build_pgn_game(self.header(index), self.move_codes(index))
+
+    # Position queries
+
+    def _hits(self, board):
+        key = chess.polyglot.zobrist_hash(board)
+        for segment in self.segments:
+            yield from segment.lookup(key)
+        if self._pending:
+            # Not sorted yet; only games added since the last commit are here
+            mask = (1 << 64) - 1
+            for entry in self._pending:
+                if entry >> 64 == key:
+                    yield entry & mask
+
+    def games_reaching(self, board, limit=None):
+        """Sorted (game, ply) pairs for every time ``board``'s position occurred."""
+        hits = sorted(self._hits(board))
+        if limit is not None:
+            hits = hits[:limit]
+        return [(value >> PLY_BITS, value & PLY_MASK) for value in hits]
+
+    def results_by_opening(self, board):
+        """Result counts ({"1-0": n, ...}) over the games that reached ``board``'s position."""
+        games = {value >> PLY_BITS for value in self._hits(board)}
+        counts = Counter(self.result(game) for game in games)
+        return {result: counts[result] for result in RESULTS}
+
+    def most_frequent_continuations(self, board, top=5):
+        """[(move, count)] for the moves played next from ``board``'s position, most frequent first."""
+        counts = Counter()
+        for value in self._hits(board):
+            game, ply = value >> PLY_BITS, value & PLY_MASK
+            offset = self._record(game)
+            if ply < struct.unpack_from("<H", self._data, offset)[0]:
+                counts[struct.unpack_from("<H", self._data, offset + HEADER.size + 2 * ply)[0]] += 1
+        return [(decode_move(code), count) for code, count in counts.most_common(top)]
+
+
+def _query_board(args):
+    """A FEN, or SAN/UCI moves from the start position."""
+    if len(args) == 1 and "/" in args[0]:
+        return chess.Board(args[0])
+    board = chess.Board()
+    for token in args:
+        board.push(board.parse_san(token))
+    return board
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Game database with position search")
+    sub = parser.add_subparsers(dest="command", required=True)
+    add = sub.add_parser("add", help="append PGN games")
+    add.add_argument("db")
+    add.add_argument("pgn", nargs="+")
+    query = sub.add_parser("query", help="statistics for a position")
+    query.add_argument("db")
+    query.add_argument("position", nargs="*", help="FEN or moves from the start position")
+    compact = sub.add_parser("compact", help="merge index segments")
+    compact.add_argument("db")
+    args = parser.parse_args()
+
+    with GameDatabase(args.db) as db:
+        if args.command == "add":
+            start = time.perf_counter()
+            before = len(db)
+            for path in args.pgn:
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    while (game := chess.pgn.read_game(f)) is not None:
+                        db.add_pgn_game(game)
+            db.commit()
+            print(f"{len(db) - before} games added in {time.perf_counter() - start:.1f} s ({len(db)} total)")
+        elif args.command == "query":
+            board = _query_board(args.position)
+            start = time.perf_counter()
+            hits = db.games_reaching(board)
+            results = db.results_by_opening(board)
+            continuations = db.most_frequent_continuations(board)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"{len(hits)} occurrences in {len({game for game, _ in hits})} games ({elapsed:.2f} ms)")
+            print("  ".join(f"{result}: {count}" for result, count in results.items()))
+            for move, count in continuations:
+                print(f"  {board.san(move):8} {count}")
+        else:
+            db.compact()
+            print(f"{len(db)} games, {len(db.segments)} segment(s)")
+
+
+if __name__ == "__main__":
+    main()
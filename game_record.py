@@ -0,0 +1,265 @@
+"""Compact binary storage for many games.
+
+Each ply is a 16-bit code (from square, to square, promotion piece) kept in
+one shared ``array('H')``. Each game has a 36-byte header struct whose tag
+values point into an interned string table, so player names, events and
+dates repeated across thousands of games are stored once. A collection
+serialises to a single blob and converts back to PGN without loss for the
+mainline and all header tags (comments and variations are not kept).
+
+    python game_record.py pack game_records.pgn games.cgr
+    python game_record.py unpack games.cgr out.pgn
+"""
+import struct
+import sys
+from array import array
+
+import chess
+import chess.pgn
+
+# code = from | to << 6 | promotion << 12, promotion 0 = none, 1..4 = N, B, R, Q
+_PROMOTION_CODES = {None: 0, chess.KNIGHT: 1, chess.BISHOP: 2, chess.ROOK: 3, chess.QUEEN: 4}
+_PROMOTION_PIECES = [None, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN]
+
+RESULTS = ["*", "1-0", "0-1", "1/2-1/2"]
+_RESULT_CODES = {result: i for i, result in enumerate(RESULTS)}
+# Tags stored in the header; anything else goes into the "extra" string
+HEADER_TAGS = ["Event", "Site", "Date", "Round", "White", "Black"]
+
+# ply count, result, flags, then string ids for HEADER_TAGS, FEN and extra tags
+HEADER = struct.Struct("<HBB" + "I" * (len(HEADER_TAGS) + 2))
+FLAG_FEN = 1
+
+BLOB_MAGIC = b"CGR1"
+BLOB_HEADER = struct.Struct("<4sIQI")  # magic, games, moves, strings
+NO_STRING = 0xFFFFFFFF
+
+
+def encode_move(move):
+    return move.from_square | move.to_square << 6 | _PROMOTION_CODES[move.promotion] << 12
+
+
+def decode_move(code):
+    return chess.Move(code & 63, code >> 6 & 63, _PROMOTION_PIECES[code >> 12])
+
+
+def encode_moves(moves):
+    return array("H", [encode_move(move) for move in moves])
+
+
+def pack_header(ply_count, headers, fen, intern):
+    """Pack one game header; ``intern`` maps a tag value (or None) to its string id."""
+    headers = dict(headers or {})
+    result = _RESULT_CODES.get(headers.pop("Result", "*"), 0)
+    fen = fen or headers.pop("FEN", None)
+    headers.pop("SetUp", None)
+    tag_ids = [intern(headers.pop(tag, None)) for tag in HEADER_TAGS]
+    extra = "\n".join(f"{key}\t{value}" for key, value in headers.items()) or None
+    flags = FLAG_FEN if fen else 0
+    return HEADER.pack(ply_count, result, flags, *tag_ids, intern(fen), intern(extra))
+
+
+def unpack_header(buffer, offset, string):
+    """Tag dict (in PGN order) of the header at ``offset``; ``string`` maps a string id back to its value."""
+    ply_count, result, flags, *ids = HEADER.unpack_from(buffer, offset)
+    headers = {}
+    for tag, string_id in zip(HEADER_TAGS, ids):
+        value = string(string_id)
+        if value is not None:
+            headers[tag] = value
+    headers["Result"] = RESULTS[result]
+    if flags & FLAG_FEN:
+        headers["SetUp"] = "1"
+        headers["FEN"] = string(ids[len(HEADER_TAGS)])
+    extra = string(ids[len(HEADER_TAGS) + 1])
+    if extra:
+        for line in extra.split("\n"):
+            key, _, value = line.partition("\t")
+            headers[key] = value
+    return headers
+
+
+def build_pgn_game(headers, codes):
+    game = chess.pgn.Game()
+    game.headers.clear()
+    for key, value in headers.items():
+        if key == "FEN":
+            game.setup(chess.Board(value))  # Also writes SetUp, right after the roster like python-chess does
+        elif key != "SetUp":
+            game.headers[key] = value
+    node = game
+    for code in codes:
+        node = node.add_variation(decode_move(code))
+    return game
+
+
+def _native(data, typecode):
+    """Little-endian on disk, native in memory."""
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _little_endian(values):
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class GameCollection:
+    """Many games in three flat buffers: headers, move codes and strings."""
+
+    def __init__(self):
+        self.headers = bytearray()
+        self.moves = array("H")
+        self.offsets = array("Q", [0])  # offsets[i]:offsets[i + 1] are game i's move codes
+        self.strings = []
+        self._string_ids = {}
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _intern(self, value):
+        if value is None:
+            return NO_STRING
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = self._string_ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+    def _string(self, string_id):
+        return None if string_id == NO_STRING else self.strings[string_id]
+
+    def append(self, moves, headers=None, fen=None):
+        """Add one game from a move list (or ready-made codes) and a tag dict; returns its index."""
+        codes = moves if isinstance(moves, array) else encode_moves(moves)
+        self.headers += pack_header(len(codes), headers, fen, self._intern)
+        self.moves.extend(codes)
+        self.offsets.append(len(self.moves))
+        return len(self) - 1
+
+    def extend(self, other):
+        """Append every game of another collection."""
+        for index in range(len(other)):
+            self.append(other.move_codes(index), other.header(index))
+
+    def add_pgn_game(self, game):
+        """Add a chess.pgn.Game (mainline and headers)."""
+        headers = dict(game.headers)
+        fen = headers.pop("FEN", None)
+        return self.append(list(game.mainline_moves()), headers, fen)
+
+    def add_chess_game(self, chess_game, headers=None):
+        """Add a ChessGame's played moves."""
+        root = chess_game.board.root()
+        fen = None if root.fen() == chess.STARTING_FEN else root.fen()
+        return self.append(chess_game.move_history, headers, fen)
+
+    def move_codes(self, index):
+        return self.moves[self.offsets[index]:self.offsets[index + 1]]
+
+    def header(self, index):
+        """Tag dict of game ``index``, in PGN order."""
+        return unpack_header(self.headers, index * HEADER.size, self._string)
+
+    def ply_count(self, index):
+        return self.offsets[index + 1] - self.offsets[index]
+
+    def result(self, index):
+        return RESULTS[self.headers[index * HEADER.size + 2]]
+
+    def start_board(self, index):
+        flags = self.headers[index * HEADER.size + 3]
+        if flags & FLAG_FEN:
+            fen_id = struct.unpack_from("<I", self.headers, index * HEADER.size + 4 + 4 * len(HEADER_TAGS))[0]
+            return chess.Board(self.strings[fen_id])
+        return chess.Board()
+
+    def pgn_game(self, index):
+        return build_pgn_game(self.header(index), self.move_codes(index))
+
+    def to_pgn(self, index):
+        return str(self.pgn_game(index))
+
+    def write_pgn(self, stream):
+        for index in range(len(self)):
+            print(self.pgn_game(index), file=stream, end="\n\n")
+
+    def to_bytes(self):
+        encoded = [value.encode("utf-8") for value in self.strings]
+        lengths = array("I", [len(value) for value in encoded])
+        return b"".join([
+            BLOB_HEADER.pack(BLOB_MAGIC, len(self), len(self.moves), len(self.strings)),
+            bytes(self.headers),
+            _little_endian(self.moves),
+            _little_endian(lengths),
+            b"".join(encoded),
+        ])
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = memoryview(data)
+        magic, games, moves, strings = BLOB_HEADER.unpack_from(data)
+        if magic != BLOB_MAGIC:
+            raise ValueError("not a game record blob")
+        collection = cls()
+        pos = BLOB_HEADER.size
+        collection.headers = bytearray(data[pos:pos + games * HEADER.size])
+        pos += games * HEADER.size
+        collection.moves = _native(data[pos:pos + moves * 2], "H")
+        pos += moves * 2
+        lengths = _native(data[pos:pos + strings * 4], "I")
+        pos += strings * 4
+        for length in lengths:
+            collection._intern(str(data[pos:pos + length], "utf-8"))
+            pos += length
+        offset = 0
+        for index in range(games):
+            offset += struct.unpack_from("<H", collection.headers, index * HEADER.size)[0]
+            collection.offsets.append(offset)
+        return collection
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+def pack_pgn(pgn_path, out_path):
+    collection = GameCollection()
+    with open(pgn_path, encoding="utf-8", errors="replace") as f:
+        while True:
+            game = chess.pgn.read_game(f)
+            if game is None:
+                break
+            collection.add_pgn_game(game)
+    collection.save(out_path)
+    return collection
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description="Convert between PGN and compact game records")
+    parser.add_argument("command", choices=["pack", "unpack"])
+    parser.add_argument("input")
+    parser.add_argument("output")
+    args = parser.parse_args()
+    if args.command == "pack":
+        collection = pack_pgn(args.input, args.output)
+        print(f"{len(collection)} games, {len(collection.moves)} plies: "
+              f"{os.path.getsize(args.input)} -> {os.path.getsize(args.output)} bytes")
+    else:
+        collection = GameCollection.load(args.input)
+        with open(args.output, "w", encoding="utf-8") as f:
+            collection.write_pgn(f)
+        print(f"{len(collection)} games -> {args.output}")
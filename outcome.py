@@ -0,0 +1,109 @@
+import chess
+import chess.polyglot
+
+_hasher = chess.polyglot.ZobristHasher(chess.polyglot.POLYGLOT_RANDOM_ARRAY)
+_array = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+
+
+def _square_hash(board, square):
+    piece = board.piece_at(square)
+    if piece is None:
+        return 0
+    # Polyglot piece index: black pawn 0, white pawn 1, black knight 2, ...
+    return _array[64 * ((piece.piece_type - 1) * 2 + piece.color) + square]
+
+
+def _state_hash(board):
+    return _hasher.hash_castling(board) ^ _hasher.hash_ep_square(board) ^ _hasher.hash_turn(board)
+
+
+def _touched_squares(board, move):
+    """Squares whose contents ``move`` changes, looked up before it is pushed."""
+    if board.is_castling(move):
+        # King and rook both move along the back rank
+        rank = chess.square_rank(move.from_square)
+        return [chess.square(file, rank) for file in range(8)]
+    if board.is_en_passant(move):
+        return [move.from_square, move.to_square,
+                chess.square(chess.square_file(move.to_square), chess.square_rank(move.from_square))]
+    return [move.from_square, move.to_square]
+
+
+class OutcomeTracker:
+    """Game-over bookkeeping kept up to date move by move.
+
+    Holds the polyglot Zobrist key of every position on the current line and
+    a count per key, so repetitions are a dict lookup. The piece part of the
+    key is updated from the two to eight squares a move touches; castling,
+    en passant and turn are re-hashed from a handful of bits. Together with
+    the board's own halfmove clock and the caller's legal-move count,
+    ``outcome`` answers in O(1) instead of replaying the move stack.
+    """
+
+    def __init__(self, board):
+        self.reset(board)
+
+    def reset(self, board):
+        piece_hash = _hasher.hash_board(board)
+        self._piece_hashes = [piece_hash]
+        self.hashes = [piece_hash ^ _state_hash(board)]
+        self.counts = {self.hashes[0]: 1}
+        self._base_plies = len(board.move_stack)
+
+    def push(self, board, move):
+        """Push ``move`` on ``board`` and update the keys."""
+        squares = _touched_squares(board, move)
+        piece_hash = self._piece_hashes[-1]
+        for square in squares:
+            piece_hash ^= _square_hash(board, square)
+        board.push(move)
+        for square in squares:
+            piece_hash ^= _square_hash(board, square)
+        key = piece_hash ^ _state_hash(board)
+        self._piece_hashes.append(piece_hash)
+        self.hashes.append(key)
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    def pop(self, board):
+        move = board.pop()
+        self._forget_last()
+        return move
+
+    def _forget_last(self):
+        self._piece_hashes.pop()
+        key = self.hashes.pop()
+        count = self.counts[key] - 1
+        if count:
+            self.counts[key] = count
+        else:
+            del self.counts[key]
+
+    def truncate(self, plies):
+        """Drop the keys past ``plies`` (after the board was restored to an earlier position)."""
+        while len(self.hashes) - 1 + self._base_plies > plies:
+            self._forget_last()
+
+    def in_sync(self, board):
+        return len(self.hashes) - 1 + self._base_plies == len(board.move_stack)
+
+    @property
+    def key(self):
+        return self.hashes[-1]
+
+    def repetitions(self):
+        """How often the current position has occurred on this line, itself included."""
+        return self.counts[self.hashes[-1]]
+
+    def outcome(self, board, legal_move_count):
+        """Same terminations as ``board.outcome()`` (automatic draws only), or None while the game goes on."""
+        if legal_move_count == 0:
+            if board.is_check():
+                return chess.Outcome(chess.Termination.CHECKMATE, not board.turn)
+            return chess.Outcome(chess.Termination.STALEMATE, None)
+        if board.is_insufficient_material():
+            return chess.Outcome(chess.Termination.INSUFFICIENT_MATERIAL, None)
+        if board.halfmove_clock >= 150:
+            return chess.Outcome(chess.Termination.SEVENTYFIVE_MOVES, None)
+        if self.repetitions() >= 5:
+            return chess.Outcome(chess.Termination.FIVEFOLD_REPETITION, None)
+        return None
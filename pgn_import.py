@@ -0,0 +1,260 @@
+"""Parallel PGN importer.
+
+    python pgn_import.py archive.pgn other.pgn --db game_db
+    python pgn_import.py archive.pgn --out archive.cgr --workers 8
+
+The parent process never parses PGN: it only seeks ahead about
+``chunk_size`` bytes at a time and looks for the next game boundary (a
+blank line followed by a tag line). Workers read and parse their own byte
+ranges with a visitor that skips variations and builds no game tree, and
+send back a packed GameCollection together with the position keys for the
+database index. At most two chunks per worker are in flight, so memory
+stays flat however large the archive is, and games are stored in file
+order.
+"""
+import argparse
+import io
+import multiprocessing
+import multiprocessing.util
+import os
+import re
+import sys
+import time
+from array import array
+from collections import deque
+
+import chess
+import chess.pgn
+
+from game_db import GameDatabase
+from game_record import GameCollection
+from outcome import _hasher, _square_hash, _state_hash, _touched_squares
+
+CHUNK_SIZE = 4 << 20
+_BOUNDARY = re.compile(rb"\n\r?\n\[")
+_SCAN_WINDOW = 1 << 16
+
+
+class _GameVisitor(chess.pgn.BaseVisitor):
+    """Collects the headers and mainline moves of one game."""
+
+    def begin_game(self):
+        self.headers = {}
+        self.moves = []
+        self.keys = []
+        self.errors = 0
+        self.has_board = False
+
+    def visit_header(self, tagname, tagvalue):
+        self.headers[tagname] = tagvalue
+
+    def visit_board(self, board):
+        self.has_board = True
+
+    def visit_move(self, board, move):
+        self.moves.append(move)
+
+    def begin_variation(self):
+        return chess.pgn.SKIP
+
+    def handle_error(self, error):
+        # Keep the moves up to the error, like read_game does
+        self.errors += 1
+
+    def result(self):
+        return self
+
+
+class _IndexedGameVisitor(_GameVisitor):
+    """Also computes the position keys for the database index.
+
+    Same incremental update as OutcomeTracker.push, split around read_game's
+    own push: visit_move sees the board before the move, visit_board after it.
+    """
+
+    def visit_board(self, board):
+        if not self.has_board:
+            self.has_board = True
+            self._squares = None
+            self._piece_hash = _hasher.hash_board(board)
+            self.keys.append(self._piece_hash ^ _state_hash(board))
+        elif self._squares is not None:
+            for square in self._squares:
+                self._piece_hash ^= _square_hash(board, square)
+            self.keys.append(self._piece_hash ^ _state_hash(board))
+            self._squares = None
+
+    def visit_move(self, board, move):
+        self._squares = _touched_squares(board, move)
+        for square in self._squares:
+            self._piece_hash ^= _square_hash(board, square)
+        self.moves.append(move)
+
+
+def find_chunks(path, chunk_size=CHUNK_SIZE):
+    """Yield (start, end) byte ranges of ``path`` that each hold whole games."""
+    size = os.path.getsize(path)
+    start = 0
+    with open(path, "rb") as f:
+        while start < size:
+            end = start + chunk_size
+            while end < size:
+                f.seek(end)
+                window = f.read(_SCAN_WINDOW)
+                match = _BOUNDARY.search(window)
+                if match:
+                    end += match.end() - 1
+                    break
+                if len(window) < _SCAN_WINDOW:
+                    end = size
+                    break
+                end += len(window) - 3  # The boundary may straddle two windows
+            end = min(end, size)
+            yield start, end
+            start = end
+
+
+def parse_chunk(job):
+    """Parse the games in one byte range; returns (collection blob, position keys, bytes, errors)."""
+    path, start, end, with_keys = job
+    visitor = _IndexedGameVisitor if with_keys else _GameVisitor
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    stream = io.StringIO(data.decode("utf-8", errors="replace"), newline=None)
+    collection = GameCollection()
+    keys = array("Q")
+    errors = 0
+    while True:
+        game = chess.pgn.read_game(stream, Visitor=visitor)
+        if game is None:
+            break
+        if not game.has_board:
+            errors += 1  # Unreadable FEN, nothing to store
+            continue
+        errors += game.errors
+        headers = dict(game.headers)
+        collection.append(game.moves, headers, headers.pop("FEN", None))
+        keys.extend(game.keys)
+    return collection.to_bytes(), keys, end - start, errors
+
+
+class Progress:
+    """Throttled one-line progress report on stderr."""
+
+    def __init__(self, total_bytes, interval=0.5, stream=sys.stderr):
+        self.total_bytes = total_bytes
+        self.interval = interval
+        self.stream = stream
+        self.bytes = 0
+        self.games = 0
+        self.errors = 0
+        self.start = time.perf_counter()
+        self._last = 0.0
+
+    def update(self, size, games, errors, force=False):
+        self.bytes += size
+        self.games += games
+        self.errors += errors
+        now = time.perf_counter()
+        if force or now - self._last >= self.interval:
+            self._last = now
+            elapsed = max(now - self.start, 1e-9)
+            self.stream.write(f"\r{self.bytes / 2**20:,.0f}/{self.total_bytes / 2**20:,.0f} MB  "
+                              f"{self.games:,} games  {self.games / elapsed:,.0f} games/s  "
+                              f"{self.bytes / 2**20 / elapsed:,.1f} MB/s  {self.errors} errors")
+            self.stream.flush()
+
+    def finish(self):
+        self.update(0, 0, 0, force=True)
+        self.stream.write("\n")
+
+
+def run_ordered(pool, func, jobs, on_result, window):
+    """Run ``func`` over ``jobs`` in ``pool`` and pass each (job, result) to ``on_result`` in job order.
+
+    At most ``window`` jobs are in flight, so a lazy ``jobs`` iterator is
+    never drained ahead of the workers. The pool is closed and joined when
+    done, or terminated if anything (including Ctrl+C) goes wrong.
+    """
+    try:
+        in_flight = deque()
+        for job in jobs:
+            in_flight.append((job, pool.apply_async(func, (job,))))
+            if len(in_flight) >= window:
+                job, result = in_flight.popleft()
+                on_result(job, result.get())
+        while in_flight:
+            job, result = in_flight.popleft()
+            on_result(job, result.get())
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+
+def close_at_worker_exit(*closers):
+    """Call ``closers`` when a pool worker exits, e.g. from a Pool initializer."""
+    # Pool workers leave through os._exit, so atexit never runs; multiprocessing's exit hooks do
+    for close in closers:
+        multiprocessing.util.Finalize(None, close, exitpriority=10)
+
+
+def import_pgn(paths, sink, workers=None, chunk_size=CHUNK_SIZE, progress=True):
+    """Parse PGN files in parallel and append every game to ``sink`` in file order.
+
+    ``sink`` is a GameDatabase (games plus position index) or a
+    GameCollection. Returns the number of games imported.
+    """
+    workers = workers or os.cpu_count() or 1
+    with_keys = isinstance(sink, GameDatabase)
+    jobs = ((path, start, end, with_keys) for path in paths for start, end in find_chunks(path, chunk_size))
+    report = Progress(sum(os.path.getsize(path) for path in paths)) if progress else None
+    imported = 0
+
+    def store(job, result):
+        nonlocal imported
+        blob, keys, size, errors = result
+        collection = GameCollection.from_bytes(blob)
+        if with_keys:
+            sink.add_collection(collection, keys)
+        else:
+            sink.extend(collection)
+        imported += len(collection)
+        if report:
+            report.update(size, len(collection), errors)
+
+    run_ordered(multiprocessing.Pool(workers), parse_chunk, jobs, store, 2 * workers)
+    if report:
+        report.finish()
+    return imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import PGN archives in parallel")
+    parser.add_argument("pgn", nargs="+")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--db", default="game_db", help="game database directory (default: game_db)")
+    target.add_argument("--out", help="write a compact .cgr game collection instead")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE >> 20, help="MB of PGN per task")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    chunk_size = args.chunk_size << 20
+    if args.out:
+        collection = GameCollection()
+        count = import_pgn(args.pgn, collection, args.workers, chunk_size)
+        collection.save(args.out)
+        target = args.out
+    else:
+        with GameDatabase(args.db) as db:
+            count = import_pgn(args.pgn, db, args.workers, chunk_size)
+        target = args.db
+    print(f"{count} games in {time.perf_counter() - start:.1f} s -> {target}")
+
+
+if __name__ == "__main__":
+    main()
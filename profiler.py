@@ -0,0 +1,187 @@
+import json
+import statistics
+import time
+from collections import defaultdict, deque
+
+import pygame
+
+GRAPH_FRAMES = 180  # Frames shown in the overlay graph and its averages
+EXPORT_FRAMES = 20000  # Frames kept for export (a few minutes of play)
+LATENCY_SAMPLES = 200
+REFRESH_INTERVAL = 0.25  # Seconds between overlay redraws
+GRAPH_MS = 50  # Frame time at the top of the graph
+BUDGET_MS = 1000 / 60
+SIZE = (250, 200)
+BACKGROUND = (15, 15, 15)
+BAR = (80, 200, 120)
+SLOW_BAR = (230, 90, 60)
+BUDGET_LINE = (200, 200, 60)
+TEXT = (230, 230, 230)
+
+
+class FrameProfiler:
+    """Frame-time and engine-latency recorder behind the F3 overlay.
+
+    The game loop calls ``begin_frame`` at the top of every frame and
+    ``lap(phase)`` after each part of it. A lap is the time since the
+    previous lap, so the phases add up to the frame; whatever was not lapped
+    shows up as "other". ``request(name)`` and ``result(name)`` bracket an
+    engine call (the first result after a request counts), and
+    ``queue(name, depth)`` records how much work waits for an engine.
+
+    Every method returns at once while the profiler is disabled, so leaving
+    the calls in the loop costs a few attribute reads per frame. The overlay
+    panel is re-rendered every REFRESH_INTERVAL and blitted in between.
+    """
+
+    def __init__(self, graph_frames=GRAPH_FRAMES, export_frames=EXPORT_FRAMES):
+        self.enabled = False
+        self.graph_frames = graph_frames
+        self.frames = deque(maxlen=export_frames)  # (start seconds, total ms, ((phase, ms), ...))
+        self.latencies = defaultdict(lambda: deque(maxlen=LATENCY_SAMPLES))
+        self.queue_depths = {}
+        self.rect = None
+        self._pending = {}
+        self._laps = []
+        self._frame_start = None
+        self._lap_start = 0.0
+        self._surface = None
+        self._rendered_at = 0.0
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        # The frame in progress started while disabled, so it is not counted
+        self._frame_start = None
+        self._pending.clear()
+        return self.enabled
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self._frame_start is not None:
+            self.frames.append((self._frame_start, (now - self._frame_start) * 1000, tuple(self._laps)))
+        self._frame_start = self._lap_start = now
+        self._laps = []
+
+    def lap(self, phase):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self._laps.append((phase, (now - self._lap_start) * 1000))
+        self._lap_start = now
+
+    def request(self, name):
+        if self.enabled:
+            self._pending.setdefault(name, time.perf_counter())
+
+    def result(self, name):
+        if self.enabled:
+            start = self._pending.pop(name, None)
+            if start is not None:
+                self.latencies[name].append((time.perf_counter() - start) * 1000)
+
+    def cancel(self, name):
+        self._pending.pop(name, None)
+
+    def queue(self, name, depth):
+        if self.enabled:
+            self.queue_depths[name] = depth
+
+    def phase_averages(self, frames):
+        """Mean ms per frame of each phase over ``frames``, plus "other" for the unlapped rest."""
+        totals = defaultdict(float)
+        for _, total, laps in frames:
+            lapped = 0.0
+            for phase, ms in laps:
+                totals[phase] += ms
+                lapped += ms
+            totals["other"] += total - lapped
+        return {phase: total / len(frames) for phase, total in totals.items()} if frames else {}
+
+    # --- Overlay ---
+
+    def draw(self, surface, pos, font):
+        """Blit the overlay at ``pos`` and return its rect; re-rendered at most every REFRESH_INTERVAL."""
+        now = time.perf_counter()
+        if self._surface is None or now - self._rendered_at >= REFRESH_INTERVAL:
+            self._rendered_at = now
+            self._render(font)
+        self.rect = surface.blit(self._surface, pos)
+        return self.rect
+
+    def _render(self, font):
+        if self._surface is None:
+            self._surface = pygame.Surface(SIZE)
+        panel = self._surface
+        width, height = SIZE
+        panel.fill(BACKGROUND)
+        recent = list(self.frames)[-self.graph_frames:]
+
+        # Frame-time bars, newest on the right, with the 60 fps budget as a line
+        graph_height = 50
+        bar_width = width / self.graph_frames
+        for i, (_, total, _) in enumerate(recent):
+            bar = min(graph_height, round(total * graph_height / GRAPH_MS))
+            x = int(width - (len(recent) - i) * bar_width)
+            pygame.draw.rect(panel, SLOW_BAR if total > BUDGET_MS else BAR,
+                             (x, graph_height - bar, max(1, int(bar_width)), bar))
+        budget_y = graph_height - round(BUDGET_MS * graph_height / GRAPH_MS)
+        pygame.draw.line(panel, BUDGET_LINE, (0, budget_y), (width - 1, budget_y))
+
+        lines = []
+        if recent:
+            totals = sorted(total for _, total, _ in recent)
+            p95 = totals[min(len(totals) - 1, int(len(totals) * 0.95))]
+            lines.append(f"frame {statistics.fmean(totals):.1f} ms  p95 {p95:.1f}  max {totals[-1]:.1f}")
+            averages = self.phase_averages(recent)
+            for phase, ms in sorted(averages.items(), key=lambda item: -item[1])[:6]:
+                lines.append(f"  {phase:<14}{ms:7.2f} ms")
+        else:
+            lines.append("collecting frames...")
+        for name, samples in sorted(self.latencies.items()):
+            if samples:
+                lines.append(f"{name}: last {samples[-1]:.0f} ms  avg {statistics.fmean(samples):.0f} ms")
+        for name, depth in sorted(self.queue_depths.items()):
+            waiting = " (waiting)" if name in self._pending else ""
+            lines.append(f"{name} queue: {depth}{waiting}")
+
+        y = graph_height + 4
+        for line in lines:
+            if y + font.get_linesize() > height:
+                break
+            panel.blit(font.render(line, True, TEXT), (4, y))
+            y += font.get_linesize()
+        pygame.draw.rect(panel, (120, 120, 120), panel.get_rect(), 1)
+
+    # --- Export ---
+
+    def export(self, path):
+        """Write everything recorded so far as JSON for offline comparison; returns the path."""
+        frames = list(self.frames)
+        origin = frames[0][0] if frames else 0.0
+        totals = sorted(total for _, total, _ in frames)
+
+        def percentile(fraction):
+            return round(totals[min(len(totals) - 1, int(len(totals) * fraction))], 3) if totals else None
+
+        data = {
+            "exported": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "summary": {
+                "frames": len(frames),
+                "p50_ms": percentile(0.50),
+                "p95_ms": percentile(0.95),
+                "p99_ms": percentile(0.99),
+                "phases_ms": {phase: round(ms, 4) for phase, ms in self.phase_averages(frames).items()},
+                "latency_ms": {name: {"count": len(samples), "mean": round(statistics.fmean(samples), 2),
+                                      "max": round(max(samples), 2)}
+                               for name, samples in self.latencies.items() if samples},
+            },
+            "frames": [{"t": round(start - origin, 4), "ms": round(total, 3),
+                        "phases": {phase: round(ms, 3) for phase, ms in laps}}
+                       for start, total, laps in frames],
+            "latency_ms": {name: [round(ms, 2) for ms in samples] for name, samples in self.latencies.items()},
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        return path
@@ -0,0 +1,320 @@
+"""Tactical puzzle miner.
+
+    python puzzle_miner.py game_records.pgn --out puzzles.csv.gz --workers 8
+
+Each worker process owns one engine and mines its own byte ranges of the
+PGN files (split the same way as pgn_import). A game is scanned for eval
+swings first: moves that drop the mover's winning chances by at least
+``eval_timeline.BLUNDER``. Evals come from the game's own [%eval] comments
+when they are at least ``--scan-depth`` deep, from a per-worker position
+cache, or from a shallow search. Only the position after such a move is
+searched deeply, and it becomes a puzzle if the best reply is clearly
+better than the second best (MultiPV when the engine supports it,
+otherwise by searching every legal move). The solution is extended with
+the engine's line while each solver move stays unique.
+
+The output is CSV (gzip-compressed when the name ends in .gz), one puzzle
+per line: id, FEN, solution in UCI, theme tags and the source game. The id
+is the position's Zobrist key, so a position found in several games is
+written once.
+"""
+import argparse
+import csv
+import gzip
+import io
+import multiprocessing
+import os
+import sys
+import time
+from collections import OrderedDict
+
+import chess
+import chess.engine
+import chess.pgn
+import chess.polyglot
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from Engine.engine import Engine
+from eval_timeline import BLUNDER, terminal_score, winning_chances
+from pgn_import import Progress, close_at_worker_exit, find_chunks, run_ordered
+
+SCAN_DEPTH = 6
+VERIFY_DEPTH = 9
+OPENING_PLIES = 10  # Book moves are not worth a search
+MIN_ADVANTAGE = 0.35  # Solver's winning chances after the best move (about +2 pawns)
+UNIQUE_MARGIN = 0.3  # Best move must beat the second best by this much
+MAX_SOLVER_MOVES = 3
+MAX_MATE_MOVES = 5
+CACHE_ENTRIES = 200000
+CHUNK_SIZE = 1 << 20  # Smaller than pgn_import's: a chunk here is minutes of engine time
+PIECE_VALUES = {chess.PAWN: 1, chess.KNIGHT: 3, chess.BISHOP: 3, chess.ROOK: 5, chess.QUEEN: 9, chess.KING: 0}
+FIELDS = ["PuzzleId", "FEN", "Moves", "Themes", "Source"]
+
+
+def material(board, color):
+    return sum(PIECE_VALUES[piece] * len(board.pieces(piece, color)) for piece in PIECE_VALUES)
+
+
+def puzzle_themes(board, line, score):
+    """Theme tags for the puzzle ``line`` from ``board``; ``score`` is the solver's eval of the first move."""
+    themes = []
+    solver = board.turn
+    if score.is_mate() and score > chess.engine.Cp(0):
+        themes += ["mate", f"mateIn{max(score.mate(), 1)}"]
+    else:
+        themes.append("crushing" if winning_chances(score) >= 0.6 else "advantage")
+    solver_moves = (len(line) + 1) // 2
+    themes.append({1: "oneMove", 2: "short"}.get(solver_moves, "long"))
+
+    first = line[0]
+    if board.gives_check(first):
+        themes.append("check")
+    if first.promotion:
+        themes.append("promotion")
+    if board.is_capture(first) and not board.is_attacked_by(not solver, first.to_square):
+        themes.append("hangingPiece")
+
+    # Walk the line: a fork is a solver piece attacking two bigger or undefended targets,
+    # a sacrifice leaves the solver down material at the end of the line
+    start = material(board, solver) - material(board, not solver)
+    pieces = chess.popcount(board.occupied & ~board.pawns & ~board.kings)
+    phase = "endgame" if pieces <= 6 else "opening" if board.fullmove_number <= 12 else "middlegame"
+    board = board.copy(stack=False)
+    for ply, move in enumerate(line):
+        board.push(move)
+        if ply % 2 == 1:
+            continue
+        piece = board.piece_at(move.to_square)
+        value = PIECE_VALUES[piece.piece_type] or 100
+        targets = 0
+        for square in board.attacks(move.to_square):
+            target = board.piece_at(square)
+            if target is None or target.color == solver or target.piece_type == chess.PAWN:
+                continue
+            if target.piece_type == chess.KING or PIECE_VALUES[target.piece_type] > value \
+                    or not board.is_attacked_by(not solver, square):
+                targets += 1
+        if targets >= 2 and "fork" not in themes:
+            themes.append("fork")
+    if material(board, solver) - material(board, not solver) <= start - 2:
+        themes.append("sacrifice")
+    themes.append(phase)
+    return themes
+
+
+class Miner:
+    """One engine plus an LRU cache of (depth, relative score, pv) by Zobrist key."""
+
+    def __init__(self, engine, scan_depth=SCAN_DEPTH, verify_depth=VERIFY_DEPTH):
+        self.engine = engine
+        self.scan_depth = scan_depth
+        self.verify_depth = verify_depth
+        self.cache = OrderedDict()
+        self.searches = 0
+        self.cache_hits = 0
+
+    def evaluate(self, board, depth):
+        """(relative score, pv) of ``board`` searched at least ``depth`` deep, or None on engine failure."""
+        score = terminal_score(board)
+        if score is not None:
+            return score, []
+        key = chess.polyglot.zobrist_hash(board)
+        entry = self.cache.get(key)
+        if entry is not None and entry[0] >= depth:
+            self.cache.move_to_end(key)
+            self.cache_hits += 1
+            return entry[1], entry[2]
+        result = self.engine.analyse(board, depth=depth)
+        self.searches += 1
+        if result is None or result["score"] is None:
+            return None
+        self.cache[key] = (depth, result["score"], result["pv"])
+        if len(self.cache) > CACHE_ENTRIES:
+            self.cache.popitem(last=False)
+        return result["score"], result["pv"]
+
+    def top_two(self, board):
+        """The two best moves as [(relative score, pv)], best first; one entry if only one move is legal."""
+        lines = self.engine.analyse_multipv(board, self.verify_depth, 2)
+        if lines is not None:
+            self.searches += 1
+            return [(line["score"], line["pv"]) for line in lines if line["pv"]]
+        # No MultiPV: score every move with a shallow search of the position after it,
+        # then settle the two best at full depth
+        shallow = []
+        for move in board.legal_moves:
+            board.push(move)
+            result = self.evaluate(board, max(1, self.verify_depth - 4))
+            board.pop()
+            if result is not None:
+                shallow.append((-result[0], move))
+        shallow.sort(key=lambda entry: entry[0], reverse=True)
+        lines = []
+        for _, move in shallow[:2]:
+            board.push(move)
+            result = self.evaluate(board, self.verify_depth - 1)
+            board.pop()
+            if result is not None:
+                lines.append((-result[0], [move] + result[1]))
+        lines.sort(key=lambda line: line[0], reverse=True)
+        return lines
+
+    def solution(self, board):
+        """(solution moves, solver's score) if ``board`` has a unique winning line, else None."""
+        board = board.copy()
+        line = []
+        first_score = None
+        while True:
+            lines = self.top_two(board)
+            if not lines:
+                break
+            score, pv = lines[0]
+            mating = score.is_mate() and score > chess.engine.Cp(0)
+            # Any mate in one solves the position, so several of them are fine
+            unique = (len(lines) == 1 or score >= chess.engine.Mate(1) or
+                      winning_chances(score) - winning_chances(lines[1][0]) >= UNIQUE_MARGIN)
+            if first_score is None:
+                if not unique or winning_chances(score) < MIN_ADVANTAGE:
+                    return None
+                first_score = score
+            elif not unique:
+                line.pop()  # End on the solver's last unique move, not on the reply
+                break
+            line.append(pv[0])
+            board.push(pv[0])
+            solver_moves = (len(line) + 1) // 2
+            limit = MAX_MATE_MOVES if mating else MAX_SOLVER_MOVES
+            if board.is_game_over() or len(pv) < 2 or solver_moves >= limit:
+                break
+            line.append(pv[1])
+            board.push(pv[1])
+        return (line, first_score) if line else None
+
+    def mine_game(self, game):
+        """Yield (ply, board, solution, score) for every tactic found in ``game``."""
+        board = game.board()
+        previous = None  # Winning chances of the side to move before the last move
+        for ply, node in enumerate(game.mainline(), 1):
+            mover = board.turn
+            board.push(node.move)
+            if ply < OPENING_PLIES:
+                continue
+            # Shallower [%eval]s (bot_vs_stockfish writes depth 0 for Stockfish) are searched again
+            depth = node.eval_depth()
+            if node.eval() is not None and depth is not None and depth >= self.scan_depth:
+                score = node.eval().pov(board.turn)
+            else:
+                result = self.evaluate(board, self.scan_depth)
+                if result is None:
+                    previous = None
+                    continue
+                score = result[0]
+            chances = winning_chances(score)
+            # ``previous`` was the mover's chances; now the opponent is to move
+            if previous is not None and previous + chances >= BLUNDER and chances >= MIN_ADVANTAGE \
+                    and not board.is_game_over():
+                found = self.solution(board)
+                if found is not None:
+                    yield ply, board.copy(stack=False), found[0], found[1]
+            previous = chances
+
+
+_miner = None
+
+
+def _init_worker(engine_args, scan_depth, verify_depth):
+    global _miner
+    engine = Engine(*engine_args)
+    _miner = Miner(engine, scan_depth, verify_depth)
+    close_at_worker_exit(engine.close)
+
+
+def mine_chunk(job):
+    """Mine the games in one byte range; returns (puzzles, games, bytes, errors, searches, cache hits)."""
+    path, start, end = job
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    stream = io.StringIO(data.decode("utf-8", errors="replace"), newline=None)
+    puzzles = []
+    games = errors = 0
+    searches, hits = _miner.searches, _miner.cache_hits
+    while True:
+        game = chess.pgn.read_game(stream)
+        if game is None:
+            break
+        errors += len(game.errors)
+        for ply, board, line, score in _miner.mine_game(game):
+            puzzles.append((chess.polyglot.zobrist_hash(board), board.fen(), " ".join(move.uci() for move in line),
+                            " ".join(puzzle_themes(board, line, score)), games, ply))
+        games += 1
+    return puzzles, games, end - start, errors, _miner.searches - searches, _miner.cache_hits - hits
+
+
+def open_output(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def mine(paths, out, workers=None, engine_args=(), scan_depth=SCAN_DEPTH, verify_depth=VERIFY_DEPTH,
+         chunk_size=CHUNK_SIZE, progress=True):
+    """Mine puzzles from PGN files into the CSV writer ``out``; returns the number written."""
+    workers = workers or os.cpu_count() or 1
+    jobs = ((path, start, end) for path in paths for start, end in find_chunks(path, chunk_size))
+    report = Progress(sum(os.path.getsize(path) for path in paths)) if progress else None
+    seen = set()
+    game_offset = {path: 0 for path in paths}
+    written = searches = hits = 0
+
+    def store(job, result):
+        nonlocal written, searches, hits
+        puzzles, games, size, errors, job_searches, job_hits = result
+        path = job[0]
+        for key, fen, moves, themes, game, ply in puzzles:
+            if key in seen:
+                continue
+            seen.add(key)
+            out.writerow([f"{key:016x}", fen, moves, themes,
+                          f"{os.path.basename(path)}:{game_offset[path] + game + 1}:{ply}"])
+            written += 1
+        game_offset[path] += games
+        searches += job_searches
+        hits += job_hits
+        if report:
+            report.update(size, games, errors)
+
+    # A worker whose initializer fails is respawned forever, so start the engine once here to fail fast
+    Engine(*engine_args).close()
+    pool = multiprocessing.Pool(workers, _init_worker, (engine_args, scan_depth, verify_depth))
+    # Chunks finish in order, so game numbers in the Source column stay right
+    run_ordered(pool, mine_chunk, jobs, store, 2 * workers)
+    if report:
+        report.finish()
+        print(f"{searches:,} searches, {hits:,} cache hits", file=sys.stderr)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mine tactical puzzles from PGN games")
+    parser.add_argument("pgn", nargs="+")
+    parser.add_argument("--out", default="puzzles.csv.gz", help="CSV output, gzip-compressed if it ends in .gz")
+    parser.add_argument("--workers", type=int, default=None, help="engine processes (default: CPU count)")
+    parser.add_argument("--scan-depth", type=int, default=SCAN_DEPTH, help="depth for finding eval swings")
+    parser.add_argument("--verify-depth", type=int, default=VERIFY_DEPTH, help="depth for checking solutions")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE >> 20, help="MB of PGN per task")
+    parser.add_argument("--engine", default=None, help="UCI engine executable (default: the bundled engine)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    engine_args = (args.engine,) if args.engine else ()
+    with open_output(args.out) as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        count = mine(args.pgn, writer, args.workers, engine_args, args.scan_depth, args.verify_depth,
+                     args.chunk_size << 20)
+    print(f"{count} puzzles in {time.perf_counter() - start:.1f} s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Headless batch renderer: FEN/PGN collections -> PNG board images.
+
+    python render_images.py games.pgn --out thumbs --size 40 --arrows
+    python render_images.py positions.fen --out thumbs --workers 8
+
+No window is opened: the display is never initialised and boards are drawn
+on plain surfaces (the SDL dummy driver is set in case a dependency needs
+one). Every worker process reuses one BoardRenderer, so consecutive plies of
+a game only repaint the squares that changed, and the piece sprites come
+from the shared on-disk atlas cache (built once up front).
+
+FEN files hold one position per line: a full FEN or a 4-field EPD,
+optionally followed by the move that led to it. Lines that do not parse
+are reported on stderr and skipped.
+"""
+import argparse
+import multiprocessing
+import os
+import struct
+import sys
+import time
+import zlib
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import chess
+import chess.pgn
+import pygame
+
+import assets
+from board_renderer import MIN_LABEL_SQUARE_SIZE, BoardRenderer, draw_move_arrow, label_inset
+
+BOARD_COLORS = [(255, 255, 255), (0, 100, 0)]  # Same look as game.py
+LABEL_COLOR = (0, 0, 0)
+
+# Per-process state, set by _init_worker
+_renderer = None
+_arrows = False
+
+
+def parse_position_line(line):
+    """(fen, last_move_uci or None) from a FEN or EPD line, or None for a blank line.
+
+    A FEN has six fields; an EPD stops after the en passant square. Whatever
+    follows the position is taken as the move.
+    """
+    fields = line.split()
+    if not fields:
+        return None
+    size = 6 if len(fields) >= 6 and fields[4].isdigit() and fields[5].isdigit() else 4
+    return " ".join(fields[:size]), fields[size] if len(fields) > size else None
+
+
+def read_jobs(path, out_dir, last_only=False):
+    """Yield (fen, last_move_uci, png_path, source) for every position in a PGN or FEN file ("-" = stdin).
+
+    ``source`` says where the position came from, for error messages.
+    """
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8", errors="replace")
+    try:
+        if path.lower().endswith(".pgn"):
+            game_index = 0
+            while True:
+                game = chess.pgn.read_game(stream)
+                if game is None:
+                    break
+                board = game.board()
+                source = f"{path}: game {game_index + 1}"
+                jobs = [(board.fen(), None, os.path.join(out_dir, f"{game_index:05d}_000.png"), source)]
+                for ply, move in enumerate(game.mainline_moves(), 1):
+                    board.push(move)
+                    jobs.append((board.fen(), move.uci(), os.path.join(out_dir, f"{game_index:05d}_{ply:03d}.png"),
+                                 f"{source}, ply {ply}"))
+                yield from jobs[-1:] if last_only else jobs
+                game_index += 1
+        else:
+            for line_index, line in enumerate(stream):
+                position = parse_position_line(line)
+                if position is not None:
+                    fen, move = position
+                    yield (fen, move, os.path.join(out_dir, f"{line_index:06d}.png"),
+                           f"{path}:{line_index + 1}: {line.strip()}")
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def _png_chunk(tag, data):
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+
+def save_png(surface, path, level=1):
+    """Write ``surface`` as an RGB PNG.
+
+    pygame.image.save always uses the default zlib level; for flat board
+    images level 1 is about twice as fast and barely larger.
+    """
+    width, height = surface.get_size()
+    raw = pygame.image.tobytes(surface, "RGB")
+    stride = width * 3
+    # Filter type 0 (None) in front of every scanline
+    scanlines = b"".join(b"\0" + raw[i:i + stride] for i in range(0, len(raw), stride))
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(_png_chunk(b"IDAT", zlib.compress(scanlines, level)))
+        f.write(_png_chunk(b"IEND", b""))
+
+
+def _init_worker(square_size, labels, arrows):
+    global _renderer, _arrows
+    label_font = None
+    if labels and square_size >= MIN_LABEL_SQUARE_SIZE:
+        label_font = assets.load_font("arial", max(10, square_size * 14 // 80))
+    _renderer = BoardRenderer(square_size, assets.piece_images(square_size), label_font, BOARD_COLORS, LABEL_COLOR,
+                              file_label_inset=label_inset(label_font))
+    _arrows = arrows
+
+
+def render_batch(jobs):
+    """Render a chunk of (fen, last_move_uci, path, source) jobs; returns (images written, jobs skipped)."""
+    skipped = 0
+    for fen, move, path, source in jobs:
+        try:
+            board = chess.Board(fen)
+            last_move = chess.Move.from_uci(move) if move else None
+        except ValueError as e:
+            print(f"Skipping {source}: {e}", file=sys.stderr)
+            skipped += 1
+            continue
+        highlights = (last_move.from_square, last_move.to_square) if last_move else ()
+        _renderer.update(board, highlights=highlights)
+        image = _renderer.surface
+        if _arrows and last_move:
+            image = image.copy()
+            draw_move_arrow(image, _renderer, last_move)
+        save_png(image, path)
+    return len(jobs) - skipped, skipped
+
+
+def _chunks(jobs, size):
+    chunk = []
+    for job in jobs:
+        chunk.append(job)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def render_all(path, out_dir, square_size=40, workers=None, labels=False, arrows=False, last_only=False,
+               chunk_size=64):
+    os.makedirs(out_dir, exist_ok=True)
+    # Build the atlas once here so the workers only ever read it
+    assets.load_atlas(square_size)
+
+    start = time.perf_counter()
+    done = skipped = 0
+    pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(square_size, labels, arrows))
+    try:
+        for count, bad in pool.imap_unordered(render_batch, _chunks(read_jobs(path, out_dir, last_only), chunk_size)):
+            done += count
+            skipped += bad
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    elapsed = time.perf_counter() - start
+    print(f"{done} images in {elapsed:.1f} s ({done / max(elapsed, 1e-9):.0f} images/s) -> {out_dir}"
+          + (f", {skipped} skipped" if skipped else ""))
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render FEN/PGN positions to PNG without opening a window")
+    parser.add_argument("input", help="PGN file, FEN file (one per line) or - for FENs on stdin")
+    parser.add_argument("--out", default="board_images", help="output directory")
+    parser.add_argument("--size", type=int, default=40, help="square size in pixels")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--labels", action="store_true", help="draw file/rank coordinates")
+    parser.add_argument("--arrows", action="store_true", help="draw an arrow for the move that led to each position")
+    parser.add_argument("--last-only", action="store_true", help="only the final position of each PGN game")
+    args = parser.parse_args()
+    render_all(args.input, args.out, args.size, args.workers, args.labels, args.arrows, args.last_only)
+
+
+if __name__ == "__main__":
+    main()
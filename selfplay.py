@@ -0,0 +1,302 @@
+"""Headless self-play data generator.
+
+    python selfplay.py --games 10000 --workers 8 --nodes 20000 --out selfplay_data
+
+Every worker process owns one engine and plays whole games against itself
+from randomised openings (a few random plies, re-rolled if the engine
+thinks they left one side clearly better). Each move is one fixed-node
+search; engines that ignore node limits, like the bundled one, are held by
+``--depth`` instead. Workers talk UCI over the pipes themselves (UciPipe)
+rather than through Engine/python-chess, whose thread hand-offs cost about
+half a millisecond per search: too much next to a few thousand nodes.
+Games end normally, by adjudication once the side to move has been at
++-RESIGN_CP for RESIGN_PLIES plies in a row, or as a draw after MAX_PLIES.
+
+Every position is written once its game has finished, as a fixed-width
+RECORD to the worker's own shard files (a new file every SHARD_RECORDS
+records), so nothing is funnelled through the parent process. A record
+holds:
+
+    occupied      uint64   occupancy bitboard
+    pieces        16 bytes one nibble per occupied square, in square order:
+                           piece type (1-6), +8 for black
+    flags         uint8    bit 0: black to move, bits 1-4: castling KQkq
+    ep_square     uint8    legal en passant square, or 255
+    halfmove      uint8    halfmove clock, capped at 255
+    result        int8     game result for white: 1, 0 or -1
+    score         int16    search score for the side to move (eval_timeline encoding)
+    move          uint16   move played (game_record encoding)
+    ply           uint16
+
+``read_shard`` yields (board, score, move, result) back from a shard.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import struct
+import sys
+import time
+
+import chess
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from Engine.engine import UciPipe, engine_path
+from eval_timeline import decode_score, encode_score
+from game_record import decode_move, encode_move
+from pgn_import import close_at_worker_exit, run_ordered
+
+RECORD = struct.Struct("<Q16sBBBbhHH")
+SHARD_RECORDS = 1 << 20
+NODES = 20000
+DEPTH = 8
+RANDOM_PLIES = 8
+OPENING_BALANCE = 150  # Re-roll random openings the engine scores beyond this (centipawns)
+RESIGN_CP = 1000
+RESIGN_PLIES = 6
+MAX_PLIES = 300
+GAMES_PER_TASK = 4
+_CASTLING = (chess.BB_H1, chess.BB_A1, chess.BB_H8, chess.BB_A8)
+
+
+def pack_board(board):
+    """(occupied, pieces, flags, ep_square, halfmove) fields of RECORD for ``board``."""
+    pieces = bytearray(16)
+    black = board.occupied_co[chess.BLACK]
+    for i, square in enumerate(chess.scan_forward(board.occupied)):
+        code = board.piece_type_at(square) | (8 if black & chess.BB_SQUARES[square] else 0)
+        pieces[i >> 1] |= code << (4 * (i & 1))
+    flags = 0 if board.turn == chess.WHITE else 1
+    for bit, rook in enumerate(_CASTLING):
+        if board.castling_rights & rook:
+            flags |= 2 << bit
+    ep_square = board.ep_square if board.has_legal_en_passant() else 255
+    return board.occupied, bytes(pieces), flags, ep_square, min(board.halfmove_clock, 255)
+
+
+def unpack_board(occupied, pieces, flags, ep_square, halfmove):
+    board = chess.Board(None)
+    for i, square in enumerate(chess.scan_forward(occupied)):
+        code = pieces[i >> 1] >> (4 * (i & 1)) & 15
+        board.set_piece_at(square, chess.Piece(code & 7, not code & 8))
+    board.turn = not flags & 1
+    board.castling_rights = 0
+    for bit, rook in enumerate(_CASTLING):
+        if flags & 2 << bit:
+            board.castling_rights |= rook
+    board.ep_square = None if ep_square == 255 else ep_square
+    board.halfmove_clock = halfmove
+    return board
+
+
+def read_shard(path):
+    """Yield (board, relative score, move, white's result) for every whole record in a shard."""
+    with open(path, "rb") as f:
+        data = f.read()
+    for offset in range(0, len(data) - RECORD.size + 1, RECORD.size):
+        occupied, pieces, flags, ep_square, halfmove, result, score, move, ply = RECORD.unpack_from(data, offset)
+        board = unpack_board(occupied, pieces, flags, ep_square, halfmove)
+        board.fullmove_number = ply // 2 + 1
+        yield board, decode_score(score), decode_move(move), result
+
+
+class ShardWriter:
+    """Appends whole games to numbered shard files of at most SHARD_RECORDS records."""
+
+    def __init__(self, directory, prefix):
+        self.directory = directory
+        self.prefix = prefix
+        self.index = 0
+        self.records = 0
+        self._file = None
+
+    def write(self, data):
+        if self._file is None or self.records >= SHARD_RECORDS:
+            self.close()
+            path = os.path.join(self.directory, f"{self.prefix}_{self.index:04d}.bin")
+            self.index += 1
+            self.records = 0
+            self._file = open(path, "ab")
+        self._file.write(data)
+        self.records += len(data) // RECORD.size
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class SelfPlayer:
+    """Plays and records games with one engine; timings show how much of the work is the engine's."""
+
+    def __init__(self, engine, writer, nodes=NODES, depth=DEPTH):
+        self.engine = engine
+        self.writer = writer
+        self.nodes = nodes
+        self.depth = depth
+        self.engine_time = 0.0
+
+    def search(self, board):
+        start = time.perf_counter()
+        try:
+            return self.engine.search(board, self.nodes, self.depth)
+        except (OSError, EOFError, ValueError):
+            return None
+        finally:
+            self.engine_time += time.perf_counter() - start
+
+    def opening(self, rng):
+        """A board after RANDOM_PLIES random moves that the engine considers roughly balanced."""
+        while True:
+            board = chess.Board()
+            for _ in range(RANDOM_PLIES):
+                moves = list(board.legal_moves)
+                if not moves:
+                    break
+                board.push(rng.choice(moves))
+            if board.is_game_over():
+                continue
+            found = self.search(board)
+            if found is not None and abs(found[0].score(mate_score=100000)) <= OPENING_BALANCE:
+                return board
+
+    def play(self, rng):
+        """Play one game and write its positions; returns (positions, white's result)."""
+        self.engine.new_game()
+        board = self.opening(rng)
+        positions = []  # Packed fields, score and move of every searched position
+        result = 0
+        while True:
+            outcome = board.outcome()
+            if outcome is not None:
+                result = 0 if outcome.winner is None else (1 if outcome.winner == chess.WHITE else -1)
+                break
+            if board.ply() >= MAX_PLIES:
+                break
+            found = self.search(board)
+            if found is None:
+                break  # Engine failure: keep what was played, scored as a draw
+            score, move = found
+            positions.append((pack_board(board), encode_score(score), encode_move(move), board.ply()))
+            board.push(move)
+            if self._adjudicated(positions):
+                # The last score belongs to the side that just moved
+                mover_white = board.turn == chess.BLACK
+                result = 1 if mover_white == (positions[-1][1] > 0) else -1
+                break
+        data = bytearray(RECORD.size * len(positions))
+        for i, (fields, score, move, ply) in enumerate(positions):
+            RECORD.pack_into(data, i * RECORD.size, *fields, result, score, move, ply)
+        self.writer.write(data)
+        return len(positions), result
+
+    def _adjudicated(self, positions):
+        # Scores alternate sides, so one side winning shows up as +big, -big, +big, ...
+        if len(positions) < RESIGN_PLIES:
+            return False
+        recent = [positions[-1 - i][1] for i in range(RESIGN_PLIES)]
+        return all(abs(score) >= RESIGN_CP and ((score > 0) == (recent[0] > 0)) == (i % 2 == 0)
+                   for i, score in enumerate(recent))
+
+
+_player = None
+
+
+def _init_worker(engine_args, out_dir, prefix, nodes, depth):
+    global _player
+    engine = UciPipe(engine_path(*engine_args))
+    writer = ShardWriter(out_dir, f"{prefix}_{os.getpid()}")
+    _player = SelfPlayer(engine, writer, nodes, depth)
+    close_at_worker_exit(writer.close, engine.close)
+
+
+def play_games(job):
+    """Play ``count`` games seeded from ``seed``; returns (games, positions, [W, D, L], engine s, total s)."""
+    seed, count = job
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    engine_time = _player.engine_time
+    positions = 0
+    results = [0, 0, 0]
+    for _ in range(count):
+        plies, result = _player.play(rng)
+        positions += plies
+        results[1 - result] += 1
+    return count, positions, results, _player.engine_time - engine_time, time.perf_counter() - start
+
+
+class Counters:
+    """Throughput report on stderr: games, positions per second and the engine's share of worker time."""
+
+    def __init__(self, interval=1.0, stream=sys.stderr):
+        self.interval = interval
+        self.stream = stream
+        self.games = 0
+        self.positions = 0
+        self.results = [0, 0, 0]
+        self.engine_time = 0.0
+        self.worker_time = 0.0
+        self.start = time.perf_counter()
+        self._last = 0.0
+
+    def update(self, games, positions, results, engine_time, worker_time, force=False):
+        self.games += games
+        self.positions += positions
+        self.results = [a + b for a, b in zip(self.results, results)]
+        self.engine_time += engine_time
+        self.worker_time += worker_time
+        now = time.perf_counter()
+        if self.stream and (force or now - self._last >= self.interval):
+            self._last = now
+            elapsed = max(now - self.start, 1e-9)
+            share = self.engine_time / self.worker_time if self.worker_time else 0.0
+            self.stream.write(f"\r{self.games:,} games  {self.positions:,} positions  "
+                              f"{self.positions / elapsed:,.0f} pos/s  "
+                              f"+{self.results[0]} ={self.results[1]} -{self.results[2]}  engine {share:.0%}")
+            self.stream.flush()
+
+    def finish(self):
+        self.update(0, 0, [0, 0, 0], 0.0, 0.0, force=True)
+        if self.stream:
+            self.stream.write("\n")
+
+
+def generate(games, out_dir, workers=None, engine_args=(), nodes=NODES, depth=DEPTH, seed=None, progress=True):
+    """Play ``games`` self-play games into shards under ``out_dir``; returns the Counters."""
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(out_dir, exist_ok=True)
+    seed = random.randrange(1 << 32) if seed is None else seed
+    prefix = f"selfplay_{seed:08x}"
+    jobs = ((seed * 1000003 + first, min(GAMES_PER_TASK, games - first))
+            for first in range(0, games, GAMES_PER_TASK))
+    counters = Counters(stream=sys.stderr if progress else None)
+
+    # A worker whose initializer fails is respawned forever, so check the engine once here to fail fast
+    UciPipe(engine_path(*engine_args)).close()
+    pool = multiprocessing.Pool(workers, _init_worker, (engine_args, out_dir, prefix, nodes, depth))
+    run_ordered(pool, play_games, jobs, lambda job, result: counters.update(*result), 2 * workers)
+    counters.finish()
+    return counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate self-play training data")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--out", default="selfplay_data", help="directory for the .bin shards")
+    parser.add_argument("--workers", type=int, default=None, help="engine processes (default: CPU count)")
+    parser.add_argument("--nodes", type=int, default=NODES, help="node limit per move")
+    parser.add_argument("--depth", type=int, default=DEPTH,
+                        help="depth limit per move, for engines that ignore node limits (0: none)")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the random openings")
+    parser.add_argument("--engine", default=None, help="UCI engine executable (default: the bundled engine)")
+    args = parser.parse_args()
+
+    engine_args = (args.engine,) if args.engine else ()
+    counters = generate(args.games, args.out, args.workers, engine_args, args.nodes, args.depth or None, args.seed)
+    elapsed = time.perf_counter() - counters.start
+    print(f"{counters.positions:,} positions from {counters.games:,} games in {elapsed:.1f} s "
+          f"({counters.positions / max(elapsed, 1e-9):,.0f} pos/s) -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
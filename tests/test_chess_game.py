@@ -0,0 +1,102 @@
+import random
+
+import chess
+import chess.polyglot
+
+from chess_game import KEYFRAME_INTERVAL, ChessGame
+
+
+def play_random(game, plies, seed):
+    """Play ``plies`` random moves through ChessGame.move; returns the board after every ply."""
+    rng = random.Random(seed)
+    boards = [game.board.copy()]
+    for _ in range(plies):
+        if game.board.is_game_over():
+            break
+        move = rng.choice(list(game.board.legal_moves))
+        assert game.move(move.from_square, move.to_square, move.promotion)["valid"]
+        boards.append(game.board.copy())
+    return boards
+
+
+def check_position(game, expected):
+    assert game.board == expected
+    assert game.board.move_stack == expected.move_stack
+    assert game.move_history == expected.move_stack
+    assert game.legal_move_count() == expected.legal_moves.count()
+    assert game.outcome_tracker.key == chess.polyglot.zobrist_hash(expected)
+    assert game.outcome() == expected.outcome()
+
+
+def test_undo_redo_walk_the_whole_line():
+    game = ChessGame()
+    boards = play_random(game, 3 * KEYFRAME_INTERVAL + 5, seed=1)
+    last = len(boards) - 1
+    assert last > 2 * KEYFRAME_INTERVAL
+    for ply in range(last, 0, -1):
+        check_position(game, boards[ply])
+        game.undo()
+    check_position(game, boards[0])
+    assert not game.can_undo() and game.last_ply == last
+    for ply in range(1, last + 1):
+        game.redo()
+        check_position(game, boards[ply])
+    assert not game.can_redo()
+
+
+def test_goto_across_keyframes():
+    game = ChessGame()
+    boards = play_random(game, 3 * KEYFRAME_INTERVAL + 5, seed=2)
+    last = len(boards) - 1
+    targets = [0, last, 1, KEYFRAME_INTERVAL, KEYFRAME_INTERVAL - 1, 2 * KEYFRAME_INTERVAL + 3, 5, last - 1,
+               KEYFRAME_INTERVAL + 1, last + 10, -3]
+    for target in targets:
+        game.goto(target)
+        ply = max(0, min(target, last))
+        assert game.ply == ply and game.last_ply == last
+        check_position(game, boards[ply])
+
+
+def test_board_at_leaves_the_cursor_alone():
+    game = ChessGame()
+    boards = play_random(game, 2 * KEYFRAME_INTERVAL + 9, seed=3)
+    game.goto(KEYFRAME_INTERVAL + 4)
+    for ply in range(len(boards)):
+        board = game.board_at(ply)
+        assert board == boards[ply]
+        assert board.move_stack == boards[ply].move_stack
+    check_position(game, boards[KEYFRAME_INTERVAL + 4])
+
+
+def test_new_move_drops_the_redo_branch():
+    game = ChessGame()
+    boards = play_random(game, 2 * KEYFRAME_INTERVAL + 9, seed=4)
+    fork = KEYFRAME_INTERVAL - 2
+    game.goto(fork)
+    # Replaying the move that was undone keeps the branch
+    replayed = boards[fork + 1].peek()
+    assert game.move(replayed.from_square, replayed.to_square, replayed.promotion)["valid"]
+    assert game.last_ply == len(boards) - 1
+
+    game.undo()
+    other = next(move for move in game.board.legal_moves if move != replayed)
+    assert game.move(other.from_square, other.to_square, other.promotion)["valid"]
+    assert game.last_ply == game.ply == fork + 1
+    assert not game.can_redo()
+
+    # Keyframes of the old branch must not be reused for the new one
+    branch = boards[:fork + 1] + play_random(game, 2 * KEYFRAME_INTERVAL, seed=5)
+    for ply in (len(branch) - 1, KEYFRAME_INTERVAL, 2 * KEYFRAME_INTERVAL + 1, 3, fork + 1, len(branch) - 2):
+        assert game.board_at(ply) == branch[ply]
+        game.goto(ply)
+        check_position(game, branch[ply])
+
+
+def test_reset():
+    game = ChessGame()
+    play_random(game, KEYFRAME_INTERVAL + 3, seed=6)
+    game.undo()
+    game.reset()
+    check_position(game, chess.Board())
+    assert game.last_ply == 0
+    assert len(game.evals) == 0
@@ -0,0 +1,52 @@
+import chess
+from chess.engine import Cp, Mate, MateGiven, PovScore
+
+from eval_timeline import CP_LIMIT, UNKNOWN, EvalTimeline, decode_score, encode_score
+
+
+def test_centipawns_round_trip():
+    for cp in (-CP_LIMIT, -12345, -1, 0, 1, 37, CP_LIMIT):
+        assert decode_score(encode_score(Cp(cp))) == Cp(cp)
+
+
+def test_centipawns_are_clamped():
+    assert decode_score(encode_score(Cp(CP_LIMIT + 500))) == Cp(CP_LIMIT)
+    assert decode_score(encode_score(Cp(-CP_LIMIT - 500))) == Cp(-CP_LIMIT)
+
+
+def test_mates_round_trip():
+    for mate in (1, 2, 17, 9999, -1, -2, -17, -9999):
+        assert decode_score(encode_score(Mate(mate))) == Mate(mate)
+    assert decode_score(encode_score(MateGiven)) == MateGiven
+    assert decode_score(encode_score(Mate(-0))) == Mate(-0)
+
+
+def test_encoding_keeps_order_and_fits_int16():
+    scores = [Mate(-1), Mate(-5), Cp(-CP_LIMIT), Cp(-3), Cp(0), Cp(3), Cp(CP_LIMIT), Mate(5), Mate(1), MateGiven]
+    values = [encode_score(score) for score in scores]
+    assert values == sorted(values)
+    assert all(-0x8000 < value < 0x8000 for value in values)
+    assert UNKNOWN not in values
+
+
+def test_timeline_keeps_deeper_scores():
+    timeline = EvalTimeline()
+    assert timeline.set(3, PovScore(Cp(40), chess.BLACK), 12)
+    assert timeline.get(3) == (Cp(-40), 12)
+    assert timeline.get(0) is None
+    assert timeline.missing(3) == 0
+    assert not timeline.set(3, Cp(10), 8)
+    assert timeline.set(3, Mate(2), 14)
+    assert timeline.get(3) == (Mate(2), 14)
+
+
+def test_timeline_truncate():
+    timeline = EvalTimeline()
+    for ply in range(6):
+        timeline.set(ply, Cp(ply), 10)
+    generation = timeline.generation
+    timeline.truncate(2)
+    assert len(timeline) == 3
+    assert timeline.generation == generation + 1
+    assert timeline.missing(5) == 3
+    assert timeline.missing(5, skip=3) == 4
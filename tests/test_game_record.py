@@ -0,0 +1,109 @@
+import random
+
+import chess
+import chess.pgn
+import pytest
+
+from game_record import BLOB_HEADER, HEADER, RESULTS, GameCollection, decode_move, encode_move
+
+PROMOTION_FEN = "r3k2r/1P4P1/8/8/8/8/1p4p1/R3K2R w KQkq - 0 1"
+
+
+def random_moves(seed, plies=80, fen=chess.STARTING_FEN):
+    rng = random.Random(seed)
+    board = chess.Board(fen)
+    moves = []
+    while len(moves) < plies and not board.is_game_over():
+        move = rng.choice(list(board.legal_moves))
+        board.push(move)
+        moves.append(move)
+    return moves
+
+
+def test_header_layout():
+    # ply count, result, flags, six tag ids, FEN id, extra-tags id
+    assert HEADER.size == 36
+    assert BLOB_HEADER.size == 20
+
+
+@pytest.mark.parametrize("fen", [chess.STARTING_FEN, PROMOTION_FEN])
+def test_move_codes_round_trip(fen):
+    board = chess.Board(fen)
+    for move in board.legal_moves:
+        code = encode_move(move)
+        assert 0 <= code < 1 << 16
+        assert decode_move(code) == move
+
+
+def test_every_promotion_piece_round_trips():
+    for promotion in (None, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN):
+        move = chess.Move(chess.B7, chess.A8, promotion)
+        assert decode_move(encode_move(move)) == move
+
+
+def build_collection():
+    collection = GameCollection()
+    for seed, result in enumerate(RESULTS):
+        collection.append(random_moves(seed), {"White": f"w{seed}", "Black": "b", "Result": result})
+    collection.append(random_moves(7, fen=PROMOTION_FEN), {"Event": "Promotions", "Result": "*"}, PROMOTION_FEN)
+    collection.append([], {"Event": "Empty", "Annotator": "x", "TimeControl": "40/7200"})
+    return collection
+
+
+def test_collection_bytes_round_trip():
+    collection = build_collection()
+    copy = GameCollection.from_bytes(collection.to_bytes())
+    assert len(copy) == len(collection)
+    for index in range(len(collection)):
+        assert copy.header(index) == collection.header(index)
+        assert list(copy.move_codes(index)) == list(collection.move_codes(index))
+        assert copy.ply_count(index) == collection.ply_count(index)
+        assert copy.result(index) == collection.result(index)
+        assert copy.start_board(index) == collection.start_board(index)
+        assert copy.to_pgn(index) == collection.to_pgn(index)
+    assert copy.to_bytes() == collection.to_bytes()
+
+
+def test_headers_and_start_position():
+    collection = build_collection()
+    assert collection.result(1) == "1-0"
+    assert collection.header(1)["White"] == "w1"
+    assert collection.start_board(4).fen() == PROMOTION_FEN
+    assert collection.header(4)["FEN"] == PROMOTION_FEN
+    assert collection.header(5)["TimeControl"] == "40/7200"
+    assert collection.ply_count(5) == 0
+
+
+def test_moves_replay_from_start_board():
+    collection = build_collection()
+    for index in range(len(collection)):
+        board = collection.start_board(index)
+        for code in collection.move_codes(index):
+            move = decode_move(code)
+            assert move in board.legal_moves
+            board.push(move)
+
+
+def test_pgn_game_round_trip():
+    game = chess.pgn.Game()
+    game.headers["White"] = "Alice"
+    game.headers["Result"] = "0-1"
+    game.add_line(random_moves(11))
+    collection = GameCollection()
+    collection.add_pgn_game(game)
+    copy = collection.pgn_game(0)
+    assert list(copy.mainline_moves()) == list(game.mainline_moves())
+    assert copy.headers["White"] == "Alice"
+    assert copy.headers["Result"] == "0-1"
+
+
+def test_save_and_load(tmp_path):
+    collection = build_collection()
+    path = tmp_path / "games.cgr"
+    collection.save(path)
+    assert GameCollection.load(path).to_bytes() == collection.to_bytes()
+
+
+def test_rejects_foreign_data():
+    with pytest.raises(ValueError):
+        GameCollection.from_bytes(b"XXXX" + bytes(BLOB_HEADER.size))
@@ -0,0 +1,75 @@
+import random
+
+import chess
+import chess.polyglot
+import pytest
+
+from outcome import OutcomeTracker
+
+
+def check(tracker, board):
+    assert tracker.in_sync(board)
+    assert tracker.key == chess.polyglot.zobrist_hash(board)
+    assert tracker.outcome(board, board.legal_moves.count()) == board.outcome()
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_board_outcome_in_random_games(seed):
+    rng = random.Random(seed)
+    board = chess.Board()
+    tracker = OutcomeTracker(board)
+    check(tracker, board)
+    while board.outcome() is None:
+        tracker.push(board, rng.choice(list(board.legal_moves)))
+        check(tracker, board)
+
+
+def test_castling_and_en_passant_keys():
+    board = chess.Board("r3k2r/8/8/8/3p4/8/4P3/R3K2R w KQkq - 0 1")
+    tracker = OutcomeTracker(board)
+    for uci in ["e2e4", "d4e3", "e1g1", "e8c8", "a1a8"]:
+        tracker.push(board, chess.Move.from_uci(uci))
+        check(tracker, board)
+
+
+def test_fivefold_repetition():
+    board = chess.Board()
+    tracker = OutcomeTracker(board)
+    shuffle = ["g1f3", "g8f6", "f3g1", "f6g8"]
+    for _ in range(4):
+        for uci in shuffle:
+            check(tracker, board)
+            tracker.push(board, chess.Move.from_uci(uci))
+    assert tracker.repetitions() == 5
+    assert tracker.outcome(board, board.legal_moves.count()).termination == chess.Termination.FIVEFOLD_REPETITION
+    check(tracker, board)
+
+
+def test_seventyfive_moves_and_mates():
+    for fen in ["8/8/8/4k3/8/8/8/4KQ2 w - - 150 120",  # 75-move rule
+                "7k/5Q2/6K1/8/8/8/8/8 b - - 0 1",  # stalemate
+                "7k/6Q1/6K1/8/8/8/8/8 b - - 0 1",  # checkmate
+                "8/8/4k3/8/8/4K3/8/5B2 w - - 0 1"]:  # insufficient material
+        board = chess.Board(fen)
+        assert board.outcome() is not None
+        check(OutcomeTracker(board), board)
+
+
+def test_pop_and_truncate_restore_counts():
+    rng = random.Random(1)
+    board = chess.Board()
+    tracker = OutcomeTracker(board)
+    keys = [tracker.key]
+    for _ in range(30):
+        tracker.push(board, rng.choice(list(board.legal_moves)))
+        keys.append(tracker.key)
+    for _ in range(10):
+        tracker.pop(board)
+        check(tracker, board)
+    assert tracker.key == keys[20]
+    for _ in range(10):
+        board.pop()
+    tracker.truncate(len(board.move_stack))
+    check(tracker, board)
+    assert tracker.hashes == keys[:11]
+    assert sum(tracker.counts.values()) == 11
@@ -0,0 +1,77 @@
+import random
+
+import chess
+import chess.engine
+
+from eval_timeline import encode_score
+from game_record import encode_move
+from selfplay import RECORD, ShardWriter, pack_board, read_shard, unpack_board
+
+FENS = [
+    chess.STARTING_FEN,
+    "r3k2r/pppq1ppp/2n2n2/3pp3/3PP3/2N2N2/PPPQ1PPP/R3K2R b Kq - 4 9",
+    "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3",  # en passant possible
+    "rnbqkbnr/ppp1pppp/8/8/3pP3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 3",  # e3 is set but nothing can take
+    "8/8/4k3/8/8/4K3/8/8 w - - 99 140",
+]
+
+
+def test_record_layout():
+    # occupied, 16 nibble-packed pieces, flags, ep square, halfmove, result, score, move, ply
+    assert RECORD.size == 34
+
+
+def test_pack_board_round_trip():
+    for fen in FENS:
+        board = chess.Board(fen)
+        unpacked = unpack_board(*pack_board(board))
+        assert unpacked.board_fen() == board.board_fen()
+        assert unpacked.turn == board.turn
+        assert unpacked.castling_rights == board.castling_rights
+        assert unpacked.ep_square == (board.ep_square if board.has_legal_en_passant() else None)
+        assert unpacked.halfmove_clock == board.halfmove_clock
+
+
+def test_pack_board_round_trip_in_random_games():
+    rng = random.Random(3)
+    for _ in range(5):
+        board = chess.Board()
+        while not board.is_game_over() and board.ply() < 200:
+            board.push(rng.choice(list(board.legal_moves)))
+            unpacked = unpack_board(*pack_board(board))
+            assert unpacked.board_fen() == board.board_fen()
+            assert unpacked.castling_rights == board.castling_rights
+            assert set(unpacked.legal_moves) == set(board.legal_moves)
+
+
+def test_shard_round_trip(tmp_path):
+    rng = random.Random(5)
+    board = chess.Board()
+    expected = []
+    while not board.is_game_over() and board.ply() < 60:
+        move = rng.choice(list(board.legal_moves))
+        score = chess.engine.Cp(rng.randint(-500, 500))
+        expected.append((board.copy(), score, move))
+        board.push(move)
+    data = bytearray(RECORD.size * len(expected))
+    for i, (position, score, move) in enumerate(expected):
+        RECORD.pack_into(data, i * RECORD.size, *pack_board(position), -1, encode_score(score), encode_move(move),
+                         position.ply())
+
+    writer = ShardWriter(str(tmp_path), "test")
+    writer.write(data)
+    writer.close()
+    shards = sorted(tmp_path.iterdir())
+    assert [shard.name for shard in shards] == ["test_0000.bin"]
+    # A torn record at the end of a shard is ignored
+    with open(shards[0], "ab") as f:
+        f.write(b"\0" * (RECORD.size - 1))
+
+    records = list(read_shard(shards[0]))
+    assert len(records) == len(expected)
+    for (board, score, move, result), (position, expected_score, expected_move) in zip(records, expected):
+        # FENs only name an en passant square when a capture there is legal, as RECORD does
+        assert board.fen() == position.fen()
+        assert score == expected_score
+        assert move == expected_move
+        assert result == -1
@@ -0,0 +1,71 @@
+from collections import OrderedDict
+
+
+class TextCache:
+    """Bounded LRU cache of rendered text surfaces keyed by (font, text, colour)."""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._surfaces = OrderedDict()
+
+    def render(self, font, text, color):
+        key = (font, text, tuple(color))
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            return surface
+        surface = font.render(text, True, color)
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.max_entries:
+            self._surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self._surfaces.clear()
+
+
+class MoveHistoryPanel:
+    """Move history as pre-rendered (white, black) rows.
+
+    ``sync`` only looks at the tail of the history, so a frame without a new
+    move is O(1) and a push or pop renders or drops a single move.
+    """
+
+    def __init__(self, text_cache, font, color):
+        self.text_cache = text_cache
+        self.font = font
+        self.color = color
+        self.rows = []
+        self._moves = []
+
+    def sync(self, move_history):
+        # Drop moves that were undone (or replaced after an undo), then add new ones
+        while self._moves and (len(self._moves) > len(move_history) or
+                               self._moves[-1] != move_history[len(self._moves) - 1]):
+            self._pop()
+        for move in move_history[len(self._moves):]:
+            self._push(move)
+
+    def _push(self, move):
+        label = self.text_cache.render(self.font, move.uci(), self.color)
+        if len(self._moves) % 2 == 0:
+            self.rows.append((label, None))
+        else:
+            self.rows[-1] = (self.rows[-1][0], label)
+        self._moves.append(move)
+
+    def _pop(self):
+        self._moves.pop()
+        if len(self._moves) % 2 == 0:
+            self.rows.pop()
+        else:
+            self.rows[-1] = (self.rows[-1][0], None)
+
+    def draw(self, surface, x, y, width, max_rows, row_height=20):
+        """Blit the last ``max_rows`` rows, black moves right-aligned; return the y below them."""
+        for white_label, black_label in self.rows[max(0, len(self.rows) - max_rows):]:
+            surface.blit(white_label, (x, y))
+            if black_label:
+                surface.blit(black_label, (x + width - black_label.get_width(), y))
+            y += row_height
+        return y
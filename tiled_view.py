@@ -0,0 +1,59 @@
+import math
+
+import pygame
+
+import assets
+from board_renderer import MIN_LABEL_SQUARE_SIZE, BoardRenderer, label_inset
+
+
+class TiledBoardView:
+    """Spectator grid that fits ``count`` boards into ``area``.
+
+    All tiles share one sprite atlas and one baked board layer for their
+    square size. ``changed`` only looks at the ply count and message of a
+    game, so idle tiles cost nothing and the running matches are never asked
+    for FENs or legal moves.
+    """
+
+    def __init__(self, count, area, colors, label_font=None, label_color=(0, 0, 0)):
+        self.count = count
+        self.colors = colors
+        self.label_font = label_font
+        self.label_color = label_color
+        self.layout(area)
+
+    def layout(self, area):
+        """Recompute the grid for a new area; every tile is repainted on the next frame."""
+        self.area = pygame.Rect(area)
+        self.columns = math.ceil(math.sqrt(self.count))
+        self.rows = math.ceil(self.count / self.columns)
+        tile_size = min(self.area.width // self.columns, self.area.height // self.rows)
+        self.margin = max(2, tile_size // 32)
+        self.square_size = max(1, (tile_size - 2 * self.margin) // 8)
+        self.board_size = self.square_size * 8
+
+        label_font = self.label_font if self.square_size >= MIN_LABEL_SQUARE_SIZE else None
+        inset = label_inset(label_font)
+        images = assets.piece_images(self.square_size)
+        self.tiles = []
+        self.renderers = []
+        for i in range(self.count):
+            row, col = divmod(i, self.columns)
+            x = self.area.x + col * tile_size + (tile_size - self.board_size) // 2
+            y = self.area.y + row * tile_size + (tile_size - self.board_size) // 2
+            self.tiles.append(pygame.Rect(x, y, self.board_size, self.board_size))
+            self.renderers.append(BoardRenderer(self.square_size, images, label_font, self.colors,
+                                                self.label_color, file_label_inset=inset))
+        self._seen = [None] * self.count
+
+    def changed(self, index, game, message=""):
+        """True the first time a tile is seen with a new ply count or message."""
+        key = (len(game.board.move_stack), message)
+        if key == self._seen[index]:
+            return False
+        self._seen[index] = key
+        return True
+
+    def draw_frames(self, surface, color, width=2):
+        for rect in self.tiles:
+            pygame.draw.rect(surface, color, rect.inflate(2 * width, 2 * width))